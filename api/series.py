@@ -0,0 +1,89 @@
+# api/series.py
+"""
+Series de tiempo para los gráficos del dashboard.
+
+Cada serie se resuelve con una sola consulta agrupada (Trunc por día,
+semana, mes o año) y los períodos sin datos se completan en Python. Los
+períodos son calendario reales: semanas de lunes a domingo, meses del 1
+al último día, años de enero a diciembre, en la zona horaria del proyecto.
+"""
+from datetime import datetime, time, timedelta
+from django.db.models import DateField, DateTimeField
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+UNIDADES = ('dia', 'semana', 'mes', 'anio')
+
+_KIND = {'dia': 'day', 'semana': 'week', 'mes': 'month', 'anio': 'year'}
+
+
+def inicio_periodo(fecha, unidad):
+    """Primer día del período que contiene a `fecha`"""
+    if unidad == 'dia':
+        return fecha
+    if unidad == 'semana':
+        return fecha - timedelta(days=fecha.weekday())
+    if unidad == 'mes':
+        return fecha.replace(day=1)
+    if unidad == 'anio':
+        return fecha.replace(month=1, day=1)
+    raise ValueError(f'Unidad de período inválida: {unidad}')
+
+
+def desplazar(inicio, unidad, cantidad):
+    """Inicio del período que está `cantidad` períodos después (o antes, si es negativo)"""
+    if unidad == 'dia':
+        return inicio + timedelta(days=cantidad)
+    if unidad == 'semana':
+        return inicio + timedelta(weeks=cantidad)
+    if unidad == 'mes':
+        meses = inicio.year * 12 + inicio.month - 1 + cantidad
+        return inicio.replace(year=meses // 12, month=meses % 12 + 1, day=1)
+    if unidad == 'anio':
+        return inicio.replace(year=inicio.year + cantidad)
+    raise ValueError(f'Unidad de período inválida: {unidad}')
+
+
+def periodos(unidad, cantidad, hoy=None):
+    """Inicios de los últimos `cantidad` períodos, del más antiguo al actual"""
+    actual = inicio_periodo(hoy or timezone.localdate(), unidad)
+    return [desplazar(actual, unidad, -i) for i in range(cantidad - 1, -1, -1)]
+
+
+def serie(queryset, campo_fecha, unidad, cantidad, metricas, hoy=None):
+    """
+    Agrupa el queryset por período de `campo_fecha` y calcula `metricas`
+    (dict nombre -> agregado, p. ej. Count('pk', filter=Q(...)) o Sum('monto')).
+
+    Devuelve una lista de (inicio_del_periodo, {metrica: valor}) con los
+    últimos `cantidad` períodos; los vacíos llevan 0.
+    """
+    inicios = periodos(unidad, cantidad, hoy)
+    desde = inicios[0]
+    hasta = desplazar(inicios[-1], unidad, 1)
+
+    campo = queryset.model._meta.get_field(campo_fecha)
+    if isinstance(campo, DateTimeField):
+        desde = timezone.make_aware(datetime.combine(desde, time.min))
+        hasta = timezone.make_aware(datetime.combine(hasta, time.min))
+
+    filas = (
+        queryset
+        .filter(**{f'{campo_fecha}__gte': desde, f'{campo_fecha}__lt': hasta})
+        .annotate(periodo=Trunc(campo_fecha, _KIND[unidad], output_field=DateField()))
+        .order_by()
+        .values('periodo')
+        .annotate(**metricas)
+    )
+    por_periodo = {}
+    for fila in filas:
+        periodo = fila.pop('periodo')
+        if isinstance(periodo, datetime):
+            periodo = periodo.date()
+        por_periodo[periodo] = fila
+
+    vacio = dict.fromkeys(metricas, 0)
+    return [
+        (inicio, {k: (v if v is not None else 0) for k, v in por_periodo.get(inicio, vacio).items()})
+        for inicio in inicios
+    ]
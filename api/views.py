@@ -1,15 +1,21 @@
 # api/views.py - ARCHIVO COMPLETO
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from django.core.cache import cache
 from django.db.models import Count, Sum, Q
 from django.db.models.functions import TruncMonth
+from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+from . import series
+from caja.models import Pagos
+from home import catalogos, estadisticas
+
 # Importar tus modelos
 from home.models import (
-    Pacientes, Turnos, Tratamientos, CobrosConsulta, 
-    Cajas, FichasMedicas, DetallesConsulta, EstadosTurno,
+    Pacientes, Turnos, Tratamientos, 
+    Cajas, FichasMedicas, EstadosTurno,
     Egresos, Ingresos
 )
 
@@ -19,9 +25,7 @@ def dashboard_stats(request):
     """
     Estadísticas generales para las cajas del dashboard
     """
-    hoy = datetime.now().date()
-    mes_actual = datetime.now().month
-    anio_actual = datetime.now().year
+    hoy = timezone.localdate()
     
     total_pacientes = Pacientes.objects.filter(
         Q(eliminado=0) | Q(eliminado__isnull=True)
@@ -32,17 +36,19 @@ def dashboard_stats(request):
         fecha_turno=hoy
     ).count()
     
-    ingresos_mes = CobrosConsulta.objects.filter(
-        Q(eliminado=0) | Q(eliminado__isnull=True),
-        fecha_hora_cobro__month=mes_actual,
-        fecha_hora_cobro__year=anio_actual
-    ).aggregate(total=Sum('monto_pagado'))['total'] or 0
+    ingresos_mes = estadisticas.suma('cobros', hoy.replace(day=1), hoy)['monto']
     
+    # Conteo distinct sobre los turnos de seis meses: cambia poco y es caro,
+    # se recalcula cada 5 minutos (un solo proceso a la vez, ver home/cache.py)
     fecha_limite = hoy - timedelta(days=180)
-    pacientes_activos = Pacientes.objects.filter(
-        Q(eliminado=0) | Q(eliminado__isnull=True),
-        turnos__fecha_turno__gte=fecha_limite
-    ).distinct().count()
+    pacientes_activos = cache.get_or_set(
+        f'dashboard:pacientes_activos:{hoy.isoformat()}',
+        lambda: Pacientes.objects.filter(
+            Q(eliminado=0) | Q(eliminado__isnull=True),
+            turnos__fecha_turno__gte=fecha_limite
+        ).distinct().count(),
+        timeout=300
+    )
     
     stats = {
         'total_pacientes': total_pacientes,
@@ -54,48 +60,50 @@ def dashboard_stats(request):
     return Response(stats)
 
 
+MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+         'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+MESES_CORTOS = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun',
+                'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+# unidad de la serie y cantidad de períodos para cada filtro de los gráficos
+PERIODOS_CITAS = {'mes': ('mes', 6), 'semana': ('semana', 4), 'dia': ('dia', 7)}
+PERIODOS_CAJA = {
+    'mes': ('mes', 12), 'semana': ('semana', 8), 'dia': ('dia', 7),
+    'año': ('anio', 3), 'anio': ('anio', 3),
+}
+
+
+def _etiqueta(inicio, unidad, indice):
+    if unidad == 'mes':
+        return MESES_CORTOS[inicio.month - 1]
+    if unidad == 'semana':
+        return f"Sem {indice + 1}"
+    if unidad == 'dia':
+        return inicio.strftime('%d/%m')
+    return str(inicio.year)
+
+
+def _serie_citas(unidad, cantidad):
+    """Citas totales, completadas y canceladas por período (una consulta)"""
+    turnos = Turnos.objects.filter(Q(eliminado=0) | Q(eliminado__isnull=True))
+    return series.serie(turnos, 'fecha_turno', unidad, cantidad, {
+        'citas': Count('pk'),
+        'completadas': Count('pk', filter=Q(id_turno_estado__estado_turno='Completado')),
+        'canceladas': Count('pk', filter=Q(id_turno_estado__estado_turno='Cancelado')),
+    })
+
+
 @api_view(['GET'])
 def citas_por_mes(request):
     """
     Datos para gráfico de líneas: evolución de citas en los últimos 6 meses
     """
-    hoy = datetime.now().date()
-    meses = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 
-             'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-    
-    data = []
-    
-    for i in range(6):
-        fecha_mes = hoy - timedelta(days=30 * i)
-        mes_num = fecha_mes.month
-        anio = fecha_mes.year
-        
-        total_citas = Turnos.objects.filter(
-            Q(eliminado=0) | Q(eliminado__isnull=True),
-            fecha_turno__month=mes_num,
-            fecha_turno__year=anio
-        ).count()
-        
-        completadas = Turnos.objects.filter(
-            Q(eliminado=0) | Q(eliminado__isnull=True),
-            fecha_turno__month=mes_num,
-            fecha_turno__year=anio,
-            id_turno_estado__estado_turno='Completado'
-        ).count()
-        
-        canceladas = Turnos.objects.filter(
-            Q(eliminado=0) | Q(eliminado__isnull=True),
-            fecha_turno__month=mes_num,
-            fecha_turno__year=anio,
-            id_turno_estado__estado_turno='Cancelado'
-        ).count()
-        
-        data.insert(0, {
-            'mes': meses[mes_num - 1],
-            'citas': total_citas,
-            'completadas': completadas,
-            'canceladas': canceladas
-        })
+    data = [{
+        'mes': MESES[inicio.month - 1],
+        'citas': valores['citas'],
+        'completadas': valores['completadas'],
+        'canceladas': valores['canceladas']
+    } for inicio, valores in _serie_citas('mes', 6)]
     
     return Response({'data': data})
 
@@ -103,30 +111,20 @@ def citas_por_mes(request):
 @api_view(['GET'])
 def movimientos_caja(request):
     """
-    Datos para gráfico de caja: ingresos y egresos
+    Datos para gráfico de caja: ingresos (cobros) y egresos por período
     """
     periodo = request.GET.get('periodo', 'mes')
-    
-    hoy = datetime.now().date()
     data = []
-    meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 
-             'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
     
     try:
-        # MODO DEBUG
-        total_cobros = CobrosConsulta.objects.filter(
-            Q(eliminado=0) | Q(eliminado__isnull=True)
-        ).count()
-        
-        total_egresos = Egresos.objects.count()
-        
-        print(f"🔍 DEBUG - Total cobros en BD: {total_cobros}")
-        print(f"🔍 DEBUG - Total egresos en BD: {total_egresos}")
+        # Lo recibido en cada período son los pagos (no cambian una vez hechos)
+        pagos = Pagos.objects.filter(
+            Q(id_cobro_consulta__eliminado=0) | Q(id_cobro_consulta__eliminado__isnull=True)
+        )
         
         # Si no hay datos, devolver ejemplo
-        if total_cobros == 0 and total_egresos == 0:
-            print("⚠️ No hay datos en la base de datos - Devolviendo datos de ejemplo")
-            for i, mes in enumerate(['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']):
+        if not pagos.exists() and not Egresos.objects.exists():
+            for i, mes in enumerate(MESES_CORTOS):
                 data.append({
                     'periodo': mes,
                     'ingresos': float((i + 1) * 5000 + (i % 3) * 2000),
@@ -135,97 +133,24 @@ def movimientos_caja(request):
                 })
             return Response({'data': data})
         
-        if periodo == 'mes':
-            for i in range(12):
-                fecha_mes = hoy - timedelta(days=30 * i)
-                mes_num = fecha_mes.month
-                anio = fecha_mes.year
-                
-                print(f"📅 Buscando datos para: {meses[mes_num-1]} {anio}")
-                
-                ingresos = CobrosConsulta.objects.filter(
-                    Q(eliminado=0) | Q(eliminado__isnull=True),
-                    fecha_hora_cobro__month=mes_num,
-                    fecha_hora_cobro__year=anio
-                ).aggregate(total=Sum('monto_pagado'))['total'] or 0
-                
-                egresos = Egresos.objects.filter(
-                    fecha_hora_egreso__month=mes_num,
-                    fecha_hora_egreso__year=anio
-                ).aggregate(total=Sum('monto_egreso'))['total'] or 0
-                
-                print(f"💰 Ingresos: ${ingresos}, Egresos: ${egresos}")
-                
-                data.insert(0, {
-                    'periodo': f"{meses[mes_num - 1]}",
-                    'ingresos': float(ingresos),
-                    'egresos': float(egresos),
-                    'balance': float(ingresos - egresos)
-                })
-        
-        elif periodo == 'semana':
-            for i in range(8):
-                fecha_inicio = hoy - timedelta(days=7 * (i + 1))
-                fecha_fin = hoy - timedelta(days=7 * i)
-                
-                ingresos = CobrosConsulta.objects.filter(
-                    Q(eliminado=0) | Q(eliminado__isnull=True),
-                    fecha_hora_cobro__date__gte=fecha_inicio,
-                    fecha_hora_cobro__date__lte=fecha_fin
-                ).aggregate(total=Sum('monto_pagado'))['total'] or 0
-                
-                egresos = Egresos.objects.filter(
-                    fecha_hora_egreso__date__gte=fecha_inicio,
-                    fecha_hora_egreso__date__lte=fecha_fin
-                ).aggregate(total=Sum('monto_egreso'))['total'] or 0
-                
-                data.insert(0, {
-                    'periodo': f"Sem {8-i}",
-                    'ingresos': float(ingresos),
-                    'egresos': float(egresos),
-                    'balance': float(ingresos - egresos)
-                })
+        if periodo not in PERIODOS_CAJA:
+            return Response({'data': data})
+        unidad, cantidad = PERIODOS_CAJA[periodo]
         
-        elif periodo == 'dia':
-            for i in range(7):
-                fecha = hoy - timedelta(days=6 - i)
-                
-                ingresos = CobrosConsulta.objects.filter(
-                    Q(eliminado=0) | Q(eliminado__isnull=True),
-                    fecha_hora_cobro__date=fecha
-                ).aggregate(total=Sum('monto_pagado'))['total'] or 0
-                
-                egresos = Egresos.objects.filter(
-                    fecha_hora_egreso__date=fecha
-                ).aggregate(total=Sum('monto_egreso'))['total'] or 0
-                
-                data.append({
-                    'periodo': fecha.strftime('%d/%m'),
-                    'ingresos': float(ingresos),
-                    'egresos': float(egresos),
-                    'balance': float(ingresos - egresos)
-                })
+        ingresos = series.serie(pagos, 'fecha_hora_pago', unidad, cantidad, {
+            'total': Sum('monto')
+        })
+        egresos = series.serie(Egresos.objects.all(), 'fecha_hora_egreso', unidad, cantidad, {
+            'total': Sum('monto_egreso')
+        })
         
-        elif periodo == 'año':
-            anio_actual = hoy.year
-            for i in range(3):
-                anio = anio_actual - (2 - i)
-                
-                ingresos = CobrosConsulta.objects.filter(
-                    Q(eliminado=0) | Q(eliminado__isnull=True),
-                    fecha_hora_cobro__year=anio
-                ).aggregate(total=Sum('monto_pagado'))['total'] or 0
-                
-                egresos = Egresos.objects.filter(
-                    fecha_hora_egreso__year=anio
-                ).aggregate(total=Sum('monto_egreso'))['total'] or 0
-                
-                data.append({
-                    'periodo': str(anio),
-                    'ingresos': float(ingresos),
-                    'egresos': float(egresos),
-                    'balance': float(ingresos - egresos)
-                })
+        for i, ((inicio, ingreso), (_, egreso)) in enumerate(zip(ingresos, egresos)):
+            data.append({
+                'periodo': _etiqueta(inicio, unidad, i),
+                'ingresos': float(ingreso['total']),
+                'egresos': float(egreso['total']),
+                'balance': float(ingreso['total'] - egreso['total'])
+            })
     
     except Exception as e:
         print(f"❌ Error en movimientos_caja: {e}")
@@ -242,104 +167,16 @@ def citas_filtradas(request):
     Citas con filtros dinámicos por periodo
     """
     periodo = request.GET.get('periodo', 'mes')
-    hoy = datetime.now().date()
-    data = []
+    if periodo not in PERIODOS_CITAS:
+        return Response({'data': []})
+    unidad, cantidad = PERIODOS_CITAS[periodo]
     
-    if periodo == 'mes':
-        meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 
-                 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-        
-        for i in range(6):
-            fecha_mes = hoy - timedelta(days=30 * i)
-            mes_num = fecha_mes.month
-            anio = fecha_mes.year
-            
-            total_citas = Turnos.objects.filter(
-                Q(eliminado=0) | Q(eliminado__isnull=True),
-                fecha_turno__month=mes_num,
-                fecha_turno__year=anio
-            ).count()
-            
-            completadas = Turnos.objects.filter(
-                Q(eliminado=0) | Q(eliminado__isnull=True),
-                fecha_turno__month=mes_num,
-                fecha_turno__year=anio,
-                id_turno_estado__estado_turno='Completado'
-            ).count()
-            
-            canceladas = Turnos.objects.filter(
-                Q(eliminado=0) | Q(eliminado__isnull=True),
-                fecha_turno__month=mes_num,
-                fecha_turno__year=anio,
-                id_turno_estado__estado_turno='Cancelado'
-            ).count()
-            
-            data.insert(0, {
-                'periodo': meses[mes_num - 1],
-                'citas': total_citas,
-                'completadas': completadas,
-                'canceladas': canceladas
-            })
-    
-    elif periodo == 'semana':
-        for i in range(4):
-            fecha_inicio = hoy - timedelta(days=7 * (i + 1))
-            fecha_fin = hoy - timedelta(days=7 * i)
-            
-            total_citas = Turnos.objects.filter(
-                Q(eliminado=0) | Q(eliminado__isnull=True),
-                fecha_turno__gte=fecha_inicio,
-                fecha_turno__lte=fecha_fin
-            ).count()
-            
-            completadas = Turnos.objects.filter(
-                Q(eliminado=0) | Q(eliminado__isnull=True),
-                fecha_turno__gte=fecha_inicio,
-                fecha_turno__lte=fecha_fin,
-                id_turno_estado__estado_turno='Completado'
-            ).count()
-            
-            canceladas = Turnos.objects.filter(
-                Q(eliminado=0) | Q(eliminado__isnull=True),
-                fecha_turno__gte=fecha_inicio,
-                fecha_turno__lte=fecha_fin,
-                id_turno_estado__estado_turno='Cancelado'
-            ).count()
-            
-            data.insert(0, {
-                'periodo': f"Sem {4-i}",
-                'citas': total_citas,
-                'completadas': completadas,
-                'canceladas': canceladas
-            })
-    
-    elif periodo == 'dia':
-        for i in range(7):
-            fecha = hoy - timedelta(days=6 - i)
-            
-            total_citas = Turnos.objects.filter(
-                Q(eliminado=0) | Q(eliminado__isnull=True),
-                fecha_turno=fecha
-            ).count()
-            
-            completadas = Turnos.objects.filter(
-                Q(eliminado=0) | Q(eliminado__isnull=True),
-                fecha_turno=fecha,
-                id_turno_estado__estado_turno='Completado'
-            ).count()
-            
-            canceladas = Turnos.objects.filter(
-                Q(eliminado=0) | Q(eliminado__isnull=True),
-                fecha_turno=fecha,
-                id_turno_estado__estado_turno='Cancelado'
-            ).count()
-            
-            data.append({
-                'periodo': fecha.strftime('%d/%m'),
-                'citas': total_citas,
-                'completadas': completadas,
-                'canceladas': canceladas
-            })
+    data = [{
+        'periodo': _etiqueta(inicio, unidad, i),
+        'citas': valores['citas'],
+        'completadas': valores['completadas'],
+        'canceladas': valores['canceladas']
+    } for i, (inicio, valores) in enumerate(_serie_citas(unidad, cantidad))]
     
     return Response({'data': data})
 
@@ -351,32 +188,24 @@ def pacientes_por_edad(request):
     """
     hoy = datetime.now().date()
     
-    pacientes = Pacientes.objects.filter(
-        Q(eliminado=0) | Q(eliminado__isnull=True)
-    ).values('fecha_nacimiento')
-    
-    rangos = {
-        '0-18': 0,
-        '19-30': 0,
-        '31-50': 0,
-        '51-70': 0,
-        '70+': 0
-    }
+    # edad = días // 365, así que "edad <= N" equivale a nacer después de
+    # hoy - (N + 1) * 365 días. Se cuenta todo en una sola consulta.
+    def nacidos_despues(edad):
+        return hoy - timedelta(days=(edad + 1) * 365)
     
-    for p in pacientes:
-        if p['fecha_nacimiento']:
-            edad = (hoy - p['fecha_nacimiento']).days // 365
-            
-            if edad <= 18:
-                rangos['0-18'] += 1
-            elif edad <= 30:
-                rangos['19-30'] += 1
-            elif edad <= 50:
-                rangos['31-50'] += 1
-            elif edad <= 70:
-                rangos['51-70'] += 1
-            else:
-                rangos['70+'] += 1
+    rangos = Pacientes.objects.filter(
+        Q(eliminado=0) | Q(eliminado__isnull=True),
+        fecha_nacimiento__isnull=False
+    ).aggregate(**{
+        '0-18': Count('pk', filter=Q(fecha_nacimiento__gt=nacidos_despues(18))),
+        '19-30': Count('pk', filter=Q(fecha_nacimiento__lte=nacidos_despues(18),
+                                      fecha_nacimiento__gt=nacidos_despues(30))),
+        '31-50': Count('pk', filter=Q(fecha_nacimiento__lte=nacidos_despues(30),
+                                      fecha_nacimiento__gt=nacidos_despues(50))),
+        '51-70': Count('pk', filter=Q(fecha_nacimiento__lte=nacidos_despues(50),
+                                      fecha_nacimiento__gt=nacidos_despues(70))),
+        '70+': Count('pk', filter=Q(fecha_nacimiento__lte=nacidos_despues(70))),
+    })
     
     data = [
         {'rango': rango, 'cantidad': cantidad}
@@ -391,21 +220,22 @@ def tratamientos_populares(request):
     """
     Datos para gráfico de pastel: top 5 tratamientos más realizados
     """
-    tratamientos_top = DetallesConsulta.objects.filter(
-        Q(eliminado=0) | Q(eliminado__isnull=True)
-    ).values(
-        'id_tratamiento__nombre_tratamiento'
-    ).annotate(
-        total=Count('id_tratamiento')
-    ).order_by('-total')[:5]
+    por_tratamiento = estadisticas.totales(
+        'tratamientos', estadisticas.primer_dia(), timezone.localdate()
+    )
+    tratamientos_top = sorted(
+        ((int(clave), valores['cantidad'])
+         for clave, valores in por_tratamiento.items() if clave != 'None'),
+        key=lambda item: -item[1]
+    )[:5]
     
-    data = [
-        {
-            'nombre': item['id_tratamiento__nombre_tratamiento'] or 'Sin nombre',
-            'cantidad': item['total']
-        }
-        for item in tratamientos_top
-    ]
+    data = []
+    for id_tratamiento, cantidad in tratamientos_top:
+        tratamiento = catalogos.tratamientos.get(id_tratamiento)
+        data.append({
+            'nombre': (tratamiento.nombre_tratamiento if tratamiento else None) or 'Sin nombre',
+            'cantidad': cantidad
+        })
     
     if not data:
         data = [
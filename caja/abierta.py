@@ -0,0 +1,128 @@
+"""
+Estado de la caja abierta.
+
+Como mucho hay una caja abierta: abrir() y cerrar() actualizan la fila
+única de CajaAbierta con un UPDATE condicional en la misma transacción que
+la caja, así de dos aperturas simultáneas solo una tiene éxito.
+
+actual() no consulta la base en el caso común: el id de la caja abierta
+está en el caché de Django, en SOLO_COMPARTIDA (ver home/cache.py) para que
+todos los procesos vean enseguida una apertura o un cierre, y cada proceso
+guarda la instancia de Cajas. abrir() y cerrar() publican el id nuevo al
+confirmar la transacción; no dependen del caché, deciden sobre la fila.
+
+Entre actual() y el final del request la caja puede cerrarse: quien
+registra un pago en ella llama a bloquear() dentro de su transacción.
+
+La instancia devuelta se comparte entre requests: no debe modificarse.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from home.models import Cajas
+from . import saldos
+from .models import CajaAbierta
+
+CLAVE = 'caja:abierta'
+# Valor publicado cuando no hay caja abierta (None es "no está en el caché")
+NINGUNA = 0
+
+_caja = None
+
+
+class CajaYaAbierta(Exception):
+    def __init__(self, caja):
+        super().__init__('Ya existe una caja abierta. Debe cerrarla antes de abrir una nueva.')
+        self.caja = caja
+
+
+def _publicar(id_caja):
+    transaction.on_commit(lambda: cache.set(CLAVE, id_caja, None))
+
+
+def actual():
+    """Caja abierta (con su empleado) o None"""
+    global _caja
+    id_caja = cache.get(CLAVE)
+    if id_caja is None:
+        id_caja = CajaAbierta.objects.filter(pk=1).values_list('id_caja', flat=True).first() or NINGUNA
+        # add: no pisar lo que haya publicado un abrir() o cerrar() mientras tanto
+        cache.add(CLAVE, id_caja, None)
+    if id_caja == NINGUNA:
+        return None
+
+    caja = _caja
+    if caja is None or caja.pk != id_caja:
+        caja = Cajas.objects.select_related('id_empleado').filter(pk=id_caja).first()
+        if caja is None:
+            descartar()
+            return None
+        _caja = caja
+    return caja
+
+
+def bloquear(caja):
+    """
+    Bloquea la fila de CajaAbierta hasta el final de la transacción y dice
+    si `caja` sigue abierta: un cerrar() simultáneo espera a que termine el
+    pago, o el pago ve la caja ya cerrada.
+    """
+    return CajaAbierta.objects.select_for_update().filter(pk=1, id_caja=caja.pk).exists()
+
+
+def abrir(empleado, monto_apertura):
+    """Abre una caja nueva con su saldo en cero; CajaYaAbierta si ya hay una"""
+    with transaction.atomic():
+        caja = Cajas.objects.create(
+            id_empleado=empleado,
+            fecha_hora_apertura=timezone.now(),
+            monto_apertura=monto_apertura,
+            estado_caja=1
+        )
+        # UPDATE condicional: bloquea la fila, y una apertura simultánea
+        # espera a esta transacción y después no encuentra la fila libre
+        if not CajaAbierta.objects.filter(pk=1, id_caja__isnull=True).update(id_caja=caja):
+            fila, creada = CajaAbierta.objects.select_related('id_caja').get_or_create(
+                pk=1, defaults={'id_caja': caja}
+            )
+            if not creada:
+                raise CajaYaAbierta(fila.id_caja)
+        saldos.iniciar(caja)
+        _publicar(caja.pk)
+    return caja
+
+
+def cerrar(caja, monto_cierre):
+    """
+    Cierra la caja y libera la fila. Cajas.DoesNotExist si otro request la
+    cerró primero.
+    """
+    cierre = timezone.now()
+    with transaction.atomic():
+        cerradas = Cajas.objects.filter(pk=caja.pk, estado_caja=1).update(
+            fecha_hora_cierre=cierre, monto_cierre=monto_cierre, estado_caja=0
+        )
+        if not cerradas:
+            raise Cajas.DoesNotExist('La caja ya está cerrada')
+        if CajaAbierta.objects.filter(pk=1, id_caja=caja.pk).update(id_caja=None):
+            _publicar(NINGUNA)
+    caja.fecha_hora_cierre = cierre
+    caja.monto_cierre = monto_cierre
+    caja.estado_caja = 0
+    return caja
+
+
+def fijar(caja):
+    """
+    Apunta la fila a `caja` (o a ninguna) sin validar; para cargas de datos
+    que insertan cajas directamente.
+    """
+    CajaAbierta.objects.update_or_create(pk=1, defaults={'id_caja': caja})
+    transaction.on_commit(descartar)
+
+
+def descartar():
+    """Olvida el estado publicado; el próximo actual() lo lee de la base"""
+    global _caja
+    cache.delete(CLAVE)
+    _caja = None
@@ -0,0 +1,85 @@
+from decimal import Decimal
+from django.db.models import (
+    Count, DecimalField, OuterRef, Q, Subquery, Sum, Value
+)
+from django.db.models.functions import Coalesce
+from home.models import Cajas, Ingresos, Egresos
+from .models import Pagos
+
+MONTO = DecimalField(max_digits=12, decimal_places=2)
+
+# Pagos de cobros no eliminados
+PAGO_ACTIVO = Q(id_cobro_consulta__eliminado__isnull=True) | Q(id_cobro_consulta__eliminado=0)
+
+
+def _total_por_caja(queryset, campo):
+    """
+    Subconsulta correlacionada que suma `campo` para la caja de la fila externa.
+    Devuelve 0 cuando la caja no tiene movimientos.
+    """
+    suma = (
+        queryset
+        .filter(id_caja=OuterRef('pk'))
+        .order_by()
+        .values('id_caja')
+        .annotate(total=Sum(campo))
+        .values('total')
+    )
+    return Coalesce(Subquery(suma, output_field=MONTO), Value(Decimal('0.00')), output_field=MONTO)
+
+
+def cajas_con_totales(cajas=None):
+    """
+    Anota cada caja con total_ingresos, total_egresos y total_cobros.
+
+    Los tres totales se resuelven como subconsultas dentro de la misma
+    consulta de cajas, así el costo no depende de la cantidad de cajas. Los
+    cobros son los pagos recibidos en la caja (tabla pagos).
+    """
+    if cajas is None:
+        cajas = Cajas.objects.all()
+
+    return cajas.select_related('id_empleado__user').annotate(
+        total_ingresos=_total_por_caja(Ingresos.objects.all(), 'monto_ingreso'),
+        total_egresos=_total_por_caja(Egresos.objects.all(), 'monto_egreso'),
+        total_cobros=_total_por_caja(Pagos.objects.filter(PAGO_ACTIVO), 'monto'),
+    )
+
+
+def totales_globales(cajas):
+    """Suma los totales de todas las cajas del queryset en una sola consulta"""
+    resumen = cajas_con_totales(cajas).order_by().aggregate(
+        suma_ingresos=Coalesce(Sum('total_ingresos'), Value(Decimal('0.00')), output_field=MONTO),
+        suma_egresos=Coalesce(Sum('total_egresos'), Value(Decimal('0.00')), output_field=MONTO),
+        suma_cobros=Coalesce(Sum('total_cobros'), Value(Decimal('0.00')), output_field=MONTO),
+    )
+    return {
+        'total_ingresos': resumen['suma_ingresos'],
+        'total_egresos': resumen['suma_egresos'],
+        'total_cobros': resumen['suma_cobros'],
+    }
+
+
+def cobros_por_metodo(caja):
+    """Cantidad y monto de los pagos recibidos en la caja por método de cobro"""
+    return list(
+        Pagos.objects.filter(PAGO_ACTIVO, id_caja=caja.pk)
+        .values('id_metodo_cobro')
+        .annotate(cantidad=Count('pk'), total=Sum('monto'))
+        .order_by('id_metodo_cobro')
+    )
+
+
+def filtrar_cajas(cajas, fecha_desde=None, fecha_hasta=None, id_empleado=None, estado=None):
+    """Aplica los filtros del dashboard (fechas de apertura, empleado y estado)"""
+    if fecha_desde:
+        cajas = cajas.filter(fecha_hora_apertura__date__gte=fecha_desde)
+    if fecha_hasta:
+        cajas = cajas.filter(fecha_hora_apertura__date__lte=fecha_hasta)
+    if id_empleado:
+        cajas = cajas.filter(id_empleado=id_empleado)
+    if estado == 'abierta':
+        cajas = cajas.filter(estado_caja=1)
+    elif estado == 'cerrada':
+        cajas = cajas.filter(Q(estado_caja=0) | Q(estado_caja__isnull=True))
+    return cajas
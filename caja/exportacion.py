@@ -0,0 +1,256 @@
+"""
+Exportación contable de los movimientos de caja de un período: ingresos,
+egresos y pagos de cobros, en CSV o XLSX.
+
+Cada tipo de movimiento se lee por fecha de a bloques (home.paginacion.recorrer)
+y los tres se combinan en orden cronológico con heapq.merge; el archivo se
+genera de a partes (se puede enviar con StreamingHttpResponse), así la
+memoria no depende del largo del período.
+
+El XLSX se arma sin dependencias: un ZIP con el XML mínimo de una planilla
+(celdas de texto en línea y números), escrito a medida que llegan las filas.
+"""
+import csv
+import heapq
+import io
+import re
+import time
+import zipfile
+from collections import namedtuple
+from datetime import datetime, time as hora, timedelta
+from xml.sax.saxutils import escape
+from django.utils import timezone
+from home import catalogos
+from home.models import Egresos, Ingresos, MetodosCobro
+from home.paginacion import recorrer
+from .agregaciones import PAGO_ACTIVO
+from .models import Pagos
+
+FORMATOS = ('csv', 'xlsx')
+TIPOS_CONTENIDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+TAM_BLOQUE = 2000
+
+PAGADORES = {'paciente': 'paciente', 'obra_social': 'obra social'}
+
+COLUMNAS = ('Fecha y hora', 'Tipo', 'Id', 'Caja', 'Descripción', 'Método de cobro', 'Monto')
+
+Movimiento = namedtuple('Movimiento', 'fecha tipo id id_caja descripcion metodo monto')
+
+
+def _rango(desde, hasta):
+    """[desde 00:00, hasta + 1 día 00:00) en la zona horaria del proyecto"""
+    inicio = timezone.make_aware(datetime.combine(desde, hora.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), hora.min))
+    return inicio, fin
+
+
+def _filtrar(queryset, campo_fecha, inicio, fin, id_caja):
+    queryset = queryset.filter(**{f'{campo_fecha}__gte': inicio, f'{campo_fecha}__lt': fin})
+    if id_caja:
+        queryset = queryset.filter(id_caja=id_caja)
+    return queryset
+
+
+def _ingresos(inicio, fin, id_caja):
+    filas = _filtrar(Ingresos.objects.all(), 'fecha_hora_ingreso', inicio, fin, id_caja).values(
+        'id_ingreso', 'fecha_hora_ingreso', 'id_caja', 'descripcion_ingreso', 'monto_ingreso'
+    )
+    for f in recorrer(filas, ['fecha_hora_ingreso'], TAM_BLOQUE):
+        yield Movimiento(
+            f['fecha_hora_ingreso'], 'Ingreso', f['id_ingreso'], f['id_caja'],
+            f['descripcion_ingreso'] or '', '', f['monto_ingreso']
+        )
+
+
+def _egresos(inicio, fin, id_caja):
+    filas = _filtrar(Egresos.objects.all(), 'fecha_hora_egreso', inicio, fin, id_caja).values(
+        'id_egreso', 'fecha_hora_egreso', 'id_caja', 'descripcion_egreso', 'monto_egreso'
+    )
+    for f in recorrer(filas, ['fecha_hora_egreso'], TAM_BLOQUE):
+        yield Movimiento(
+            f['fecha_hora_egreso'], 'Egreso', f['id_egreso'], f['id_caja'],
+            f['descripcion_egreso'] or '', '', -f['monto_egreso']
+        )
+
+
+def _nombre_metodo(id_metodo_cobro):
+    try:
+        return catalogos.metodos_cobro.obtener(id_metodo_cobro).tipo_cobro
+    except MetodosCobro.DoesNotExist:
+        return str(id_metodo_cobro)
+
+
+def _cobros(inicio, fin, id_caja):
+    filas = _filtrar(Pagos.objects.filter(PAGO_ACTIVO), 'fecha_hora_pago', inicio, fin, id_caja).values(
+        'id_pago', 'fecha_hora_pago', 'id_caja', 'id_cobro_consulta', 'pagador', 'id_metodo_cobro', 'monto'
+    )
+    for f in recorrer(filas, ['fecha_hora_pago'], TAM_BLOQUE):
+        yield Movimiento(
+            f['fecha_hora_pago'], 'Cobro', f['id_pago'], f['id_caja'],
+            f"Cobro {f['id_cobro_consulta']} ({PAGADORES[f['pagador']]})",
+            _nombre_metodo(f['id_metodo_cobro']), f['monto']
+        )
+
+
+def movimientos(desde, hasta, id_caja=None):
+    """Ingresos, egresos (con monto negativo) y pagos del período, en orden cronológico"""
+    inicio, fin = _rango(desde, hasta)
+    return heapq.merge(
+        _ingresos(inicio, fin, id_caja),
+        _egresos(inicio, fin, id_caja),
+        _cobros(inicio, fin, id_caja),
+        key=lambda m: m.fecha
+    )
+
+
+def _celdas(movimiento):
+    return (
+        timezone.localtime(movimiento.fecha).strftime('%Y-%m-%d %H:%M:%S'),
+        movimiento.tipo,
+        movimiento.id,
+        movimiento.id_caja,
+        movimiento.descripcion,
+        movimiento.metodo,
+        movimiento.monto,
+    )
+
+
+# Caracteres de control que no se admiten en el XML de la planilla
+_NO_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _celda_xlsx(valor):
+    if isinstance(valor, str):
+        return f'<c t="inlineStr"><is><t>{escape(_NO_XML.sub("", valor))}</t></is></c>'
+    return f'<c><v>{valor}</v></c>'
+
+
+def _fila_xlsx(valores):
+    return '<row>' + ''.join(_celda_xlsx(v) for v in valores) + '</row>'
+
+
+XLSX_ESTATICOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Movimientos" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+class _Salida:
+    """Destino no posicionable para zipfile: acumula lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+class Exportacion:
+    """
+    Exportación de los movimientos de un período (y opcionalmente de una
+    caja). `cantidad` y `segundos` quedan disponibles después de consumir
+    csv() o xlsx().
+    """
+
+    def __init__(self, desde, hasta, id_caja=None):
+        self.desde = desde
+        self.hasta = hasta
+        self.id_caja = id_caja
+        self.cantidad = 0
+        self.segundos = 0.0
+
+    def _filas(self):
+        for movimiento in movimientos(self.desde, self.hasta, self.id_caja):
+            self.cantidad += 1
+            yield _celdas(movimiento)
+
+    def generar(self, formato):
+        return self.csv() if formato == 'csv' else self.xlsx()
+
+    def csv(self):
+        """Genera el CSV (UTF-8 con BOM, para que Excel respete los acentos) de a partes"""
+        inicio = time.perf_counter()
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        buffer.write('\ufeff')
+        escritor.writerow(COLUMNAS)
+        for i, fila in enumerate(self._filas(), 1):
+            escritor.writerow(fila)
+            if i % TAM_BLOQUE == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+        self.segundos = time.perf_counter() - inicio
+
+    def xlsx(self):
+        """Genera el XLSX de a partes: la hoja se comprime a medida que se escriben las filas"""
+        inicio = time.perf_counter()
+        salida = _Salida()
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo:
+            for nombre, contenido in XLSX_ESTATICOS.items():
+                archivo.writestr(nombre, contenido)
+            with archivo.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+                hoja.write((
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    '<sheetData>' + _fila_xlsx(COLUMNAS)
+                ).encode())
+                filas = []
+                for fila in self._filas():
+                    filas.append(_fila_xlsx(fila))
+                    if len(filas) >= TAM_BLOQUE:
+                        hoja.write(''.join(filas).encode())
+                        filas.clear()
+                        yield salida.vaciar()
+                hoja.write((''.join(filas) + '</sheetData></worksheet>').encode())
+        yield salida.vaciar()
+        self.segundos = time.perf_counter() - inicio
+
+    @property
+    def filas_por_segundo(self):
+        return self.cantidad / self.segundos if self.segundos else 0.0
@@ -0,0 +1,317 @@
+"""
+Liquidaciones mensuales por obra social.
+
+Para cada obra social y mes (por fecha de la ficha): fichas, prestaciones
+por código de tratamiento, lo adeudado (parte de obra social de los cobros)
+y lo recibido (la suma de los pagos hechos por la obra social, ver
+caja/pagos.py). Cada parte es una consulta agrupada sobre fichas, detalles,
+cobros y pagos de todo el rango.
+
+Los meses cerrados (anteriores al actual) se congelan en Liquidaciones,
+LiquidacionesPrestaciones y PeriodosLiquidados la primera vez que se
+consultan (o con el comando liquidar_obras_sociales), y desde entonces se
+leen de ahí sin volver a recorrer los datos. El mes en curso se calcula
+siempre sobre los datos crudos.
+
+Un mes congelado no cambia aunque cambien sus fichas o cobros (por
+ejemplo, la obra social paga un cobro del mes pasado). Para corregirlo hay
+que reliquidarlo a propósito (reliquidar() o liquidar_obras_sociales
+--reliquidar): se recalcula y cada diferencia queda en
+CorreccionesLiquidacion con los valores anteriores, los nuevos y el motivo.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, DecimalField, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+from home.models import DetallesConsulta, FichasMedicas
+from .models import (
+    CorreccionesLiquidacion, Liquidaciones, LiquidacionesPrestaciones, Pagos, PeriodosLiquidados
+)
+
+ACTIVO = Q(eliminado__isnull=True) | Q(eliminado=0)
+FICHA_ACTIVA = Q(id_ficha_medica__eliminado__isnull=True) | Q(id_ficha_medica__eliminado=0)
+COBRO_ACTIVO = Q(id_cobro_consulta__eliminado__isnull=True) | Q(id_cobro_consulta__eliminado=0)
+CERO = Decimal('0.00')
+MONTO = DecimalField(max_digits=12, decimal_places=2)
+
+# Pagos de la obra social del cobro del detalle (índice cobro + pagador)
+RECIBIDO_OS = Coalesce(
+    Subquery(
+        Pagos.objects.filter(id_cobro_consulta=OuterRef('id_cobro_consulta'), pagador=Pagos.OBRA_SOCIAL)
+        .values('id_cobro_consulta').annotate(total=Sum('monto')).values('total'),
+        output_field=MONTO
+    ),
+    Value(CERO),
+    output_field=MONTO
+)
+# Campos comparados al reliquidar
+TOTALES = ('fichas', 'prestaciones', 'monto_adeudado', 'monto_recibido')
+
+
+def mes(fecha):
+    """Período (primer día del mes) de una fecha"""
+    return fecha.replace(day=1)
+
+
+def _siguiente(periodo):
+    return (periodo + timedelta(days=32)).replace(day=1)
+
+
+def _anterior(periodo):
+    return (periodo - timedelta(days=1)).replace(day=1)
+
+
+def _meses(desde, hasta):
+    periodo = desde
+    while periodo <= hasta:
+        yield periodo
+        periodo = _siguiente(periodo)
+
+
+def _fichas(inicio, fin, id_obra_social):
+    filas = FichasMedicas.objects.filter(ACTIVO, fecha_creacion__gte=inicio, fecha_creacion__lt=fin)
+    if id_obra_social:
+        filas = filas.filter(id_paciente_os__id_obra_social=id_obra_social)
+    return (
+        filas.annotate(periodo=TruncMonth('fecha_creacion'))
+        .values('periodo', 'id_paciente_os__id_obra_social', 'id_paciente_os__id_obra_social__nombre_os')
+        .annotate(cantidad=Count('pk'))
+        .order_by()
+    )
+
+
+def _detalles(inicio, fin, id_obra_social):
+    detalles = DetallesConsulta.objects.filter(
+        FICHA_ACTIVA,
+        id_ficha_medica__fecha_creacion__gte=inicio,
+        id_ficha_medica__fecha_creacion__lt=fin
+    )
+    if id_obra_social:
+        detalles = detalles.filter(id_ficha_medica__id_paciente_os__id_obra_social=id_obra_social)
+    return detalles
+
+
+def _prestaciones(inicio, fin, id_obra_social):
+    return (
+        _detalles(inicio, fin, id_obra_social).filter(ACTIVO)
+        .annotate(periodo=TruncMonth('id_ficha_medica__fecha_creacion'))
+        .values(
+            'periodo', 'id_ficha_medica__id_paciente_os__id_obra_social',
+            'id_tratamiento', 'id_tratamiento__codigo', 'id_tratamiento__nombre_tratamiento'
+        )
+        .annotate(cantidad=Count('pk'))
+        .order_by()
+    )
+
+
+def _montos(inicio, fin, id_obra_social):
+    # Cada cobro es de una sola ficha: se suma desde un detalle por cobro
+    # para no contar sus montos una vez por prestación
+    detalles = _detalles(inicio, fin, id_obra_social)
+    uno_por_cobro = detalles.values('id_cobro_consulta').annotate(primero=Min('pk')).values('primero')
+    return (
+        detalles.filter(COBRO_ACTIVO, pk__in=uno_por_cobro)
+        .annotate(periodo=TruncMonth('id_ficha_medica__fecha_creacion'), recibido_cobro=RECIBIDO_OS)
+        .values('periodo', 'id_ficha_medica__id_paciente_os__id_obra_social')
+        .annotate(adeudado=Sum('id_cobro_consulta__monto_obra_social'), recibido=Sum('recibido_cobro'))
+        .order_by()
+    )
+
+
+def calcular(desde, hasta, id_obra_social=None):
+    """
+    {(periodo, id_obra_social): liquidación} de los meses [desde, hasta]
+    calculadas sobre los datos crudos.
+    """
+    inicio, fin = mes(desde), _siguiente(mes(hasta))
+    liquidaciones = {}
+    for f in _fichas(inicio, fin, id_obra_social):
+        clave = (f['periodo'], f['id_paciente_os__id_obra_social'])
+        liquidaciones[clave] = {
+            'periodo': f['periodo'],
+            'id_obra_social': f['id_paciente_os__id_obra_social'],
+            'nombre_os': f['id_paciente_os__id_obra_social__nombre_os'],
+            'fichas': f['cantidad'],
+            'prestaciones': 0,
+            'monto_adeudado': CERO,
+            'monto_recibido': CERO,
+            'detalle': [],
+        }
+
+    for f in _prestaciones(inicio, fin, id_obra_social):
+        liquidacion = liquidaciones.get((f['periodo'], f['id_ficha_medica__id_paciente_os__id_obra_social']))
+        if liquidacion is None:
+            continue
+        liquidacion['prestaciones'] += f['cantidad']
+        liquidacion['detalle'].append({
+            'id_tratamiento': f['id_tratamiento'],
+            'codigo': f['id_tratamiento__codigo'],
+            'nombre_tratamiento': f['id_tratamiento__nombre_tratamiento'],
+            'cantidad': f['cantidad'],
+        })
+
+    for f in _montos(inicio, fin, id_obra_social):
+        liquidacion = liquidaciones.get((f['periodo'], f['id_ficha_medica__id_paciente_os__id_obra_social']))
+        if liquidacion is None:
+            continue
+        liquidacion['monto_adeudado'] += f['adeudado'] or CERO
+        liquidacion['monto_recibido'] += f['recibido'] or CERO
+
+    return liquidaciones
+
+
+def _filas(calculadas):
+    """Filas de Liquidaciones y LiquidacionesPrestaciones de las liquidaciones calculadas"""
+    liquidaciones = [
+        Liquidaciones(
+            periodo=l['periodo'], id_obra_social_id=l['id_obra_social'], nombre_os=l['nombre_os'],
+            fichas=l['fichas'], prestaciones=l['prestaciones'],
+            monto_adeudado=l['monto_adeudado'], monto_recibido=l['monto_recibido']
+        )
+        for l in calculadas
+    ]
+    prestaciones = [
+        LiquidacionesPrestaciones(
+            periodo=l['periodo'], id_obra_social_id=l['id_obra_social'], id_tratamiento=d['id_tratamiento'],
+            codigo=d['codigo'], nombre_tratamiento=d['nombre_tratamiento'], cantidad=d['cantidad']
+        )
+        for l in calculadas
+        for d in l['detalle']
+    ]
+    return liquidaciones, prestaciones
+
+
+def congelar(desde, hasta):
+    """
+    Congela los meses cerrados de [desde, hasta] que todavía no lo están;
+    los ya congelados no se tocan. Devuelve la cantidad de liquidaciones
+    congeladas.
+    """
+    desde, hasta = mes(desde), min(mes(hasta), _anterior(mes(timezone.localdate())))
+    if desde > hasta:
+        return 0
+    hechos = set(
+        PeriodosLiquidados.objects.filter(periodo__gte=desde, periodo__lte=hasta)
+        .values_list('periodo', flat=True)
+    )
+    faltantes = [p for p in _meses(desde, hasta) if p not in hechos]
+    if not faltantes:
+        return 0
+
+    calculadas = calcular(faltantes[0], faltantes[-1]).values()
+    with transaction.atomic():
+        # Si otro proceso congeló el mes mientras se calculaba, queda el suyo
+        nuevos = {p for p in faltantes if PeriodosLiquidados.objects.get_or_create(periodo=p)[1]}
+        liquidaciones, prestaciones = _filas([l for l in calculadas if l['periodo'] in nuevos])
+        Liquidaciones.objects.bulk_create(liquidaciones, batch_size=2000)
+        LiquidacionesPrestaciones.objects.bulk_create(prestaciones, batch_size=2000)
+    return len(liquidaciones)
+
+
+def _correcciones(periodo, anteriores, nuevas, motivo, ahora):
+    """Una corrección por cada obra social cuyos totales cambiaron"""
+    vacia = dict.fromkeys(TOTALES, 0)
+    correcciones = []
+    for id_obra_social in anteriores.keys() | nuevas.keys():
+        anterior = anteriores.get(id_obra_social, vacia)
+        nueva = nuevas.get(id_obra_social, vacia)
+        if all(anterior[campo] == nueva[campo] for campo in TOTALES):
+            continue
+        correcciones.append(CorreccionesLiquidacion(
+            periodo=periodo,
+            id_obra_social_id=id_obra_social,
+            nombre_os=nueva.get('nombre_os') or anterior['nombre_os'],
+            **{f'{campo}_anterior': anterior[campo] for campo in TOTALES},
+            **{campo: nueva[campo] for campo in TOTALES},
+            motivo=motivo,
+            fecha_hora=ahora
+        ))
+    return correcciones
+
+
+def reliquidar(periodo, motivo):
+    """
+    Recalcula un mes ya congelado con los datos actuales y reemplaza su
+    liquidación, guardando en CorreccionesLiquidacion lo que cambió. Un mes
+    cerrado que no estaba congelado solo se congela. Devuelve las
+    correcciones registradas.
+    """
+    periodo = mes(periodo)
+    if periodo >= mes(timezone.localdate()):
+        raise ValueError('Solo se pueden reliquidar meses cerrados')
+    if not motivo:
+        raise ValueError('Falta el motivo de la reliquidación')
+
+    with transaction.atomic():
+        congelado = PeriodosLiquidados.objects.select_for_update().filter(periodo=periodo).first()
+        if congelado is None:
+            congelar(periodo, periodo)
+            return []
+
+        nuevas = {l['id_obra_social']: l for l in calcular(periodo, periodo).values()}
+        anteriores = {
+            l['id_obra_social']: l
+            for l in Liquidaciones.objects.filter(periodo=periodo).values('id_obra_social', 'nombre_os', *TOTALES)
+        }
+        correcciones = _correcciones(periodo, anteriores, nuevas, motivo, timezone.now())
+        liquidaciones, prestaciones = _filas(nuevas.values())
+        LiquidacionesPrestaciones.objects.filter(periodo=periodo).delete()
+        Liquidaciones.objects.filter(periodo=periodo).delete()
+        Liquidaciones.objects.bulk_create(liquidaciones, batch_size=2000)
+        LiquidacionesPrestaciones.objects.bulk_create(prestaciones, batch_size=2000)
+        CorreccionesLiquidacion.objects.bulk_create(correcciones)
+        congelado.save()
+    return correcciones
+
+
+def primer_periodo():
+    """Mes de la ficha más antigua"""
+    primera = FichasMedicas.objects.aggregate(minima=Min('fecha_creacion'))['minima']
+    return mes(primera or timezone.localdate())
+
+
+def _congeladas(periodo, id_obra_social):
+    liquidaciones = Liquidaciones.objects.filter(periodo=periodo)
+    prestaciones = LiquidacionesPrestaciones.objects.filter(periodo=periodo)
+    if id_obra_social:
+        liquidaciones = liquidaciones.filter(id_obra_social=id_obra_social)
+        prestaciones = prestaciones.filter(id_obra_social=id_obra_social)
+
+    por_obra_social = {}
+    for l in liquidaciones.values(
+        'periodo', 'id_obra_social', 'nombre_os', 'fichas', 'prestaciones', 'monto_adeudado', 'monto_recibido'
+    ):
+        l['detalle'] = []
+        por_obra_social[l['id_obra_social']] = l
+    for p in prestaciones.values('id_obra_social', 'id_tratamiento', 'codigo', 'nombre_tratamiento', 'cantidad'):
+        liquidacion = por_obra_social.get(p.pop('id_obra_social'))
+        if liquidacion is not None:
+            liquidacion['detalle'].append(p)
+    return list(por_obra_social.values())
+
+
+def del_mes(periodo, id_obra_social=None):
+    """
+    Liquidaciones de las obras sociales con fichas en el mes de `periodo`,
+    ordenadas por nombre y con el saldo pendiente de cada una.
+    """
+    periodo = mes(periodo)
+    actual = mes(timezone.localdate())
+    if periodo > actual:
+        return []
+
+    congelada = periodo < actual
+    if congelada:
+        congelar(periodo, periodo)
+        liquidaciones = _congeladas(periodo, id_obra_social)
+    else:
+        liquidaciones = list(calcular(periodo, periodo, id_obra_social).values())
+
+    for liquidacion in liquidaciones:
+        liquidacion['saldo'] = liquidacion['monto_adeudado'] - liquidacion['monto_recibido']
+        liquidacion['congelada'] = congelada
+        liquidacion['detalle'].sort(key=lambda d: d['codigo'])
+    liquidaciones.sort(key=lambda l: (l['nombre_os'], l['id_obra_social']))
+    return liquidaciones
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from caja import liquidaciones
+
+
+def _periodo(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Período inválido: {valor} (formato AAAA-MM)') from None
+
+
+class Command(BaseCommand):
+    help = (
+        'Congela las liquidaciones por obra social (fichas, prestaciones, '
+        'montos adeudados y recibidos) de los meses cerrados que todavía no '
+        'lo están. Con --reliquidar recalcula también los meses ya congelados '
+        'y registra cada diferencia como corrección con el motivo indicado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_periodo, help='Primer mes (por defecto, el de la ficha más antigua)')
+        parser.add_argument('--hasta', type=_periodo, help='Último mes (por defecto, el mes pasado)')
+        parser.add_argument(
+            '--reliquidar', action='store_true',
+            help='Recalcular los meses ya congelados del rango, registrando las correcciones'
+        )
+        parser.add_argument('--motivo', help='Motivo de la reliquidación (obligatorio con --reliquidar)')
+
+    def handle(self, *args, **options):
+        mes_pasado = liquidaciones.mes(liquidaciones.mes(timezone.localdate()) - timedelta(days=1))
+        desde = liquidaciones.mes(options['desde'] or liquidaciones.primer_periodo())
+        hasta = min(options['hasta'] or mes_pasado, mes_pasado)
+        if desde > hasta:
+            raise CommandError('No hay meses cerrados en el rango indicado')
+
+        if not options['reliquidar']:
+            filas = liquidaciones.congelar(desde, hasta)
+            self.stdout.write(self.style.SUCCESS(
+                f'Meses {desde:%Y-%m} a {hasta:%Y-%m} liquidados, {filas} liquidaciones nuevas de obras sociales.'
+            ))
+            return
+
+        if not options['motivo']:
+            raise CommandError('--reliquidar requiere --motivo')
+        correcciones = 0
+        periodo = desde
+        while periodo <= hasta:
+            for c in liquidaciones.reliquidar(periodo, options['motivo']):
+                correcciones += 1
+                self.stdout.write(
+                    f'{c.periodo:%Y-%m} {c.nombre_os}: adeudado {c.monto_adeudado_anterior} -> {c.monto_adeudado}, '
+                    f'recibido {c.monto_recibido_anterior} -> {c.monto_recibido}'
+                )
+            periodo = liquidaciones.mes(periodo + timedelta(days=32))
+        self.stdout.write(self.style.SUCCESS(
+            f'Meses {desde:%Y-%m} a {hasta:%Y-%m} reliquidados, {correcciones} correcciones registradas.'
+        ))
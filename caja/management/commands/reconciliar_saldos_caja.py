@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from home.models import Cajas
+from caja.agregaciones import cajas_con_totales
+from caja.models import SaldosCaja
+
+CAMPOS = ('total_ingresos', 'total_egresos', 'total_cobros')
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye el saldo acumulado de las cajas a partir de sus ingresos, '
+        'egresos y cobros, e informa las diferencias encontradas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id-caja', type=int, help='Reconciliar solo esta caja')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informar diferencias, sin modificar los saldos'
+        )
+
+    def handle(self, *args, **options):
+        cajas = Cajas.objects.all()
+        if options['id_caja']:
+            cajas = cajas.filter(id_caja=options['id_caja'])
+
+        saldos = {s.pk: s for s in SaldosCaja.objects.filter(id_caja__in=cajas.values('pk'))}
+
+        revisadas = 0
+        nuevas = []
+        corregidas = []
+        for caja in cajas_con_totales(cajas).order_by('id_caja').iterator(chunk_size=1000):
+            revisadas += 1
+            esperado = {campo: getattr(caja, campo) for campo in CAMPOS}
+            saldo = saldos.get(caja.pk)
+
+            if saldo is None:
+                nuevas.append(SaldosCaja(id_caja_id=caja.pk, **esperado))
+                continue
+
+            diferencias = {
+                campo: (getattr(saldo, campo), esperado[campo])
+                for campo in CAMPOS
+                if getattr(saldo, campo) != esperado[campo]
+            }
+            if diferencias:
+                detalle = ', '.join(
+                    f'{campo}: {actual} -> {correcto}'
+                    for campo, (actual, correcto) in diferencias.items()
+                )
+                self.stdout.write(self.style.WARNING(f'Caja {caja.pk}: {detalle}'))
+                for campo, valor in esperado.items():
+                    setattr(saldo, campo, valor)
+                corregidas.append(saldo)
+
+        if not options['dry_run']:
+            with transaction.atomic():
+                SaldosCaja.objects.bulk_create(nuevas, batch_size=1000)
+                SaldosCaja.objects.bulk_update(corregidas, CAMPOS, batch_size=1000)
+
+        accion = 'a corregir' if options['dry_run'] else 'corregidas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{revisadas} cajas revisadas, {len(corregidas)} con diferencias {accion}, '
+            f'{len(nuevas)} sin saldo {"a crear" if options["dry_run"] else "creadas"}.'
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('home', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldosCaja',
+            fields=[
+                ('id_caja', models.OneToOneField(db_column='id_caja', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, serialize=False, to='home.cajas')),
+                ('total_ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_egresos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_cobros', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'saldos_caja',
+            },
+        ),
+    ]
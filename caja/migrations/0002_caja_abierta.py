@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def crear_fila(apps, schema_editor):
+    """La fila apunta a la caja abierta más reciente, si hay alguna"""
+    Cajas = apps.get_model('home', 'Cajas')
+    CajaAbierta = apps.get_model('caja', 'CajaAbierta')
+    caja = Cajas.objects.filter(estado_caja=1).order_by('-fecha_hora_apertura').first()
+    CajaAbierta.objects.create(id=1, id_caja=caja)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0001_initial'),
+        ('home', '0003_estadisticas_diarias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CajaAbierta',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('id_caja', models.OneToOneField(blank=True, db_column='id_caja', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='home.cajas')),
+            ],
+            options={
+                'db_table': 'caja_abierta',
+                'constraints': [models.CheckConstraint(condition=models.Q(('id', 1)), name='caja_abierta_fila_unica')],
+            },
+        ),
+        migrations.RunPython(crear_fila, migrations.RunPython.noop),
+    ]
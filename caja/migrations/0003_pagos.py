@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Hasta un pago del paciente y uno de la obra social por cada cobro con
+# monto pagado, en la caja del cobro y con la fecha del cobro (o la de
+# apertura de la caja si no la tiene). Los cobros viejos solo guardan el
+# total pagado, así que el reparto es una estimación: lo pagado cubre
+# primero la parte del paciente y el resto se toma como pago de la obra
+# social (el mismo criterio que mostraba la ficha). Un cobro en el que la
+# obra social pagó antes que el paciente queda registrado al revés. Los
+# modelos históricos de home no tienen las claves foráneas, por eso va en SQL.
+PAGOS_EXISTENTES = """
+    INSERT INTO pagos (id_cobro_consulta, id_caja, pagador, id_metodo_cobro, monto, fecha_hora_pago)
+    SELECT c.id_cobro_consulta, c.id_caja, 'paciente', c.id_metodo_cobro,
+           CASE WHEN c.monto_pagado < c.monto_paciente THEN c.monto_pagado ELSE c.monto_paciente END,
+           COALESCE(c.fecha_hora_cobro, j.fecha_hora_apertura)
+    FROM cobros_consulta c
+    JOIN cajas j ON j.id_caja = c.id_caja
+    WHERE c.monto_pagado > 0 AND c.monto_paciente > 0
+"""
+PAGOS_EXISTENTES_OBRA_SOCIAL = """
+    INSERT INTO pagos (id_cobro_consulta, id_caja, pagador, id_metodo_cobro, monto, fecha_hora_pago)
+    SELECT c.id_cobro_consulta, c.id_caja, 'obra_social', c.id_metodo_cobro,
+           c.monto_pagado - c.monto_paciente,
+           COALESCE(c.fecha_hora_cobro, j.fecha_hora_apertura)
+    FROM cobros_consulta c
+    JOIN cajas j ON j.id_caja = c.id_caja
+    WHERE c.monto_pagado > c.monto_paciente
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0002_caja_abierta'),
+        ('home', '0003_estadisticas_diarias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pagos',
+            fields=[
+                ('id_pago', models.BigAutoField(primary_key=True, serialize=False)),
+                ('pagador', models.CharField(max_length=12)),
+                ('id_metodo_cobro', models.BigIntegerField()),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fecha_hora_pago', models.DateTimeField()),
+                ('id_caja', models.ForeignKey(db_column='id_caja', on_delete=django.db.models.deletion.DO_NOTHING, related_name='pagos', to='home.cajas')),
+                ('id_cobro_consulta', models.ForeignKey(db_column='id_cobro_consulta', on_delete=django.db.models.deletion.DO_NOTHING, related_name='pagos', to='home.cobrosconsulta')),
+            ],
+            options={
+                'db_table': 'pagos',
+                'indexes': [models.Index(fields=['id_caja', 'id_metodo_cobro'], name='pagos_caja_metodo_idx'), models.Index(fields=['fecha_hora_pago'], name='pagos_fecha_idx'), models.Index(fields=['id_cobro_consulta', 'pagador'], name='pagos_cobro_pagador_idx')],
+            },
+        ),
+        migrations.RunSQL(PAGOS_EXISTENTES, migrations.RunSQL.noop),
+        migrations.RunSQL(PAGOS_EXISTENTES_OBRA_SOCIAL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0003_pagos'),
+        ('home', '0004_indices_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodosLiquidados',
+            fields=[
+                ('periodo', models.DateField(primary_key=True, serialize=False)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'periodos_liquidados',
+            },
+        ),
+        migrations.CreateModel(
+            name='Liquidaciones',
+            fields=[
+                ('id_liquidacion', models.BigAutoField(primary_key=True, serialize=False)),
+                ('periodo', models.DateField()),
+                ('nombre_os', models.CharField(max_length=40)),
+                ('fichas', models.IntegerField(default=0)),
+                ('prestaciones', models.IntegerField(default=0)),
+                ('monto_adeudado', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('monto_recibido', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('id_obra_social', models.ForeignKey(db_column='id_obra_social', on_delete=django.db.models.deletion.DO_NOTHING, related_name='liquidaciones', to='home.obrassociales')),
+            ],
+            options={
+                'db_table': 'liquidaciones',
+                'unique_together': {('periodo', 'id_obra_social')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LiquidacionesPrestaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField()),
+                ('id_tratamiento', models.BigIntegerField()),
+                ('codigo', models.CharField(max_length=20)),
+                ('nombre_tratamiento', models.CharField(max_length=30)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('id_obra_social', models.ForeignKey(db_column='id_obra_social', on_delete=django.db.models.deletion.DO_NOTHING, related_name='liquidaciones_prestaciones', to='home.obrassociales')),
+            ],
+            options={
+                'db_table': 'liquidaciones_prestaciones',
+                'unique_together': {('periodo', 'id_obra_social', 'id_tratamiento')},
+            },
+        ),
+    ]
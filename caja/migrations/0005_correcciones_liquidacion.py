@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0004_liquidaciones'),
+        ('home', '0004_indices_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreccionesLiquidacion',
+            fields=[
+                ('id_correccion', models.BigAutoField(primary_key=True, serialize=False)),
+                ('periodo', models.DateField()),
+                ('nombre_os', models.CharField(max_length=40)),
+                ('fichas_anterior', models.IntegerField(default=0)),
+                ('fichas', models.IntegerField(default=0)),
+                ('prestaciones_anterior', models.IntegerField(default=0)),
+                ('prestaciones', models.IntegerField(default=0)),
+                ('monto_adeudado_anterior', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('monto_adeudado', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('monto_recibido_anterior', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('monto_recibido', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('motivo', models.CharField(max_length=200)),
+                ('fecha_hora', models.DateTimeField()),
+                ('id_obra_social', models.ForeignKey(db_column='id_obra_social', on_delete=django.db.models.deletion.DO_NOTHING, related_name='correcciones_liquidacion', to='home.obrassociales')),
+            ],
+            options={
+                'db_table': 'correcciones_liquidacion',
+                'indexes': [models.Index(fields=['periodo', 'id_obra_social'], name='correcciones_periodo_os_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,144 @@
+from django.db import models
+
+
+class SaldosCaja(models.Model):
+    """
+    Totales acumulados de cada caja. Se actualizan en la misma transacción
+    que registra el ingreso, egreso o pago, para no tener que sumar los
+    movimientos cada vez que se consulta el saldo.
+    """
+    id_caja = models.OneToOneField('home.Cajas', models.DO_NOTHING, primary_key=True, db_column='id_caja')
+    total_ingresos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_egresos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_cobros = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'saldos_caja'
+
+
+class CajaAbierta(models.Model):
+    """
+    Fila única que apunta a la caja abierta. Abrir una caja solo ocupa la
+    fila si está libre (UPDATE condicional), así dos aperturas simultáneas
+    no pueden dejar dos cajas abiertas (ver caja/abierta.py).
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    id_caja = models.OneToOneField(
+        'home.Cajas', models.DO_NOTHING, blank=True, null=True, db_column='id_caja'
+    )
+
+    class Meta:
+        db_table = 'caja_abierta'
+        constraints = [
+            models.CheckConstraint(condition=models.Q(id=1), name='caja_abierta_fila_unica'),
+        ]
+
+
+class Pagos(models.Model):
+    """
+    Pagos recibidos en cada caja. Solo se insertan (ver caja/pagos.py):
+    monto_pagado del cobro es la suma de sus pagos y los totales de cobros
+    de las cajas se suman desde acá. `pagador` es PACIENTE u OBRA_SOCIAL.
+    """
+    PACIENTE = 'paciente'
+    OBRA_SOCIAL = 'obra_social'
+
+    id_pago = models.BigAutoField(primary_key=True)
+    id_cobro_consulta = models.ForeignKey(
+        'home.CobrosConsulta', models.DO_NOTHING, db_column='id_cobro_consulta', related_name='pagos'
+    )
+    id_caja = models.ForeignKey('home.Cajas', models.DO_NOTHING, db_column='id_caja', related_name='pagos')
+    pagador = models.CharField(max_length=12)
+    id_metodo_cobro = models.BigIntegerField()
+    monto = models.DecimalField(max_digits=10, decimal_places=2)
+    fecha_hora_pago = models.DateTimeField()
+
+    class Meta:
+        db_table = 'pagos'
+        indexes = [
+            models.Index(fields=['id_caja', 'id_metodo_cobro'], name='pagos_caja_metodo_idx'),
+            models.Index(fields=['fecha_hora_pago'], name='pagos_fecha_idx'),
+            models.Index(fields=['id_cobro_consulta', 'pagador'], name='pagos_cobro_pagador_idx'),
+        ]
+
+
+class Liquidaciones(models.Model):
+    """
+    Liquidación congelada de una obra social para un mes (ver
+    caja/liquidaciones.py). `periodo` es el primer día del mes. Lo adeudado
+    es la parte de obra social de los cobros y lo recibido, la suma de los
+    pagos hechos por la obra social.
+    """
+    id_liquidacion = models.BigAutoField(primary_key=True)
+    periodo = models.DateField()
+    id_obra_social = models.ForeignKey(
+        'home.ObrasSociales', models.DO_NOTHING, db_column='id_obra_social', related_name='liquidaciones'
+    )
+    nombre_os = models.CharField(max_length=40)
+    fichas = models.IntegerField(default=0)
+    prestaciones = models.IntegerField(default=0)
+    monto_adeudado = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    monto_recibido = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'liquidaciones'
+        unique_together = (('periodo', 'id_obra_social'),)
+
+
+class LiquidacionesPrestaciones(models.Model):
+    """Prestaciones de cada liquidación por tratamiento, con el código vigente al liquidar"""
+    periodo = models.DateField()
+    id_obra_social = models.ForeignKey(
+        'home.ObrasSociales', models.DO_NOTHING, db_column='id_obra_social',
+        related_name='liquidaciones_prestaciones'
+    )
+    id_tratamiento = models.BigIntegerField()
+    codigo = models.CharField(max_length=20)
+    nombre_tratamiento = models.CharField(max_length=30)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'liquidaciones_prestaciones'
+        unique_together = (('periodo', 'id_obra_social', 'id_tratamiento'),)
+
+
+class PeriodosLiquidados(models.Model):
+    """Meses cuyas liquidaciones ya están congeladas en Liquidaciones"""
+    periodo = models.DateField(primary_key=True)
+    fecha_calculo = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'periodos_liquidados'
+
+
+class CorreccionesLiquidacion(models.Model):
+    """
+    Cambios de una liquidación congelada al reliquidar su mes
+    (liquidaciones.reliquidar): los valores anteriores, los nuevos y el
+    motivo. Una obra social que aparece o desaparece del mes tiene ceros en
+    el lado que falta.
+    """
+    id_correccion = models.BigAutoField(primary_key=True)
+    periodo = models.DateField()
+    id_obra_social = models.ForeignKey(
+        'home.ObrasSociales', models.DO_NOTHING, db_column='id_obra_social',
+        related_name='correcciones_liquidacion'
+    )
+    nombre_os = models.CharField(max_length=40)
+    fichas_anterior = models.IntegerField(default=0)
+    fichas = models.IntegerField(default=0)
+    prestaciones_anterior = models.IntegerField(default=0)
+    prestaciones = models.IntegerField(default=0)
+    monto_adeudado_anterior = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    monto_adeudado = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    monto_recibido_anterior = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    monto_recibido = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    motivo = models.CharField(max_length=200)
+    fecha_hora = models.DateTimeField()
+
+    class Meta:
+        db_table = 'correcciones_liquidacion'
+        indexes = [
+            models.Index(fields=['periodo', 'id_obra_social'], name='correcciones_periodo_os_idx'),
+        ]
@@ -0,0 +1,120 @@
+"""
+Pagos de los cobros.
+
+Cada pago es una fila nueva de Pagos, con el monto, quién pagó (el
+paciente o la obra social), el método y la caja que lo recibió; nunca se
+modifica ni se borra. Lo pagado por cada uno es la suma de sus pagos: de
+ahí salen la deuda del paciente (pacientes.deudas) y lo recibido de cada
+obra social (caja.liquidaciones).
+
+El cobro se toma con SELECT ... FOR UPDATE y monto_pagado se actualiza con
+F() en el mismo UPDATE que el estado, así dos pagos simultáneos del mismo
+cobro no pisan el monto del otro.
+"""
+from decimal import Decimal
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from home import catalogos
+from pacientes import deudas
+from . import saldos
+from .models import Pagos
+
+CERO = Decimal('0.00')
+MONTO = DecimalField(max_digits=12, decimal_places=2)
+
+PACIENTE = Pagos.PACIENTE
+OBRA_SOCIAL = Pagos.OBRA_SOCIAL
+PAGADORES = (PACIENTE, OBRA_SOCIAL)
+
+
+def estado_segun_monto(pagado, total):
+    if pagado == 0:
+        return catalogos.estados_pago.obtener_por_nombre('pendiente')
+    if pagado < total:
+        return catalogos.estados_pago.obtener_por_nombre('parcial')
+    return catalogos.estados_pago.obtener_por_nombre('pagado')
+
+
+def pagado_por(cobro):
+    """{pagador: monto} pagado hasta ahora del cobro, sumando sus pagos"""
+    pagado = dict.fromkeys(PAGADORES, CERO)
+    pagado.update(
+        Pagos.objects.filter(id_cobro_consulta=cobro.pk)
+        .values('pagador').annotate(total=Sum('monto')).order_by()
+        .values_list('pagador', 'total')
+    )
+    return pagado
+
+
+def pagado_subconsulta(pagador, cobro='id_cobro_consulta'):
+    """
+    Suma de los pagos de `pagador` del cobro al que apunta el campo `cobro`
+    de la fila externa, como subconsulta para annotate (0 si no hay pagos)
+    """
+    return Coalesce(
+        Subquery(
+            Pagos.objects.filter(id_cobro_consulta=OuterRef(cobro), pagador=pagador)
+            .values('id_cobro_consulta').annotate(total=Sum('monto')).values('total'),
+            output_field=MONTO
+        ),
+        Value(CERO),
+        output_field=MONTO
+    )
+
+
+def registrar(cobro, caja, monto_paciente=CERO, monto_obra_social=CERO, id_metodo_cobro=None):
+    """
+    Registra los pagos del paciente y de la obra social del cobro recibidos
+    en `caja` (un pago por cada parte distinta de cero) y actualiza el
+    cobro, el saldo de la caja y la deuda del paciente. Cada parte se limita
+    a lo que le falta pagar a ese pagador; el excedente no se registra.
+    Debe llamarse dentro de transaction.atomic() con el cobro leído con
+    select_for_update(). Devuelve el monto aplicado.
+    """
+    pagado = pagado_por(cobro)
+    partes = {
+        PACIENTE: (monto_paciente, cobro.monto_paciente),
+        OBRA_SOCIAL: (monto_obra_social, cobro.monto_obra_social),
+    }
+    aplicados = {
+        pagador: max(min(Decimal(monto), Decimal(total) - pagado[pagador]), CERO)
+        for pagador, (monto, total) in partes.items()
+    }
+    aplicado = sum(aplicados.values(), CERO)
+    total = cobro.monto_paciente + cobro.monto_obra_social
+    nuevo_pagado = cobro.monto_pagado + aplicado
+    ahora = timezone.now()
+
+    if id_metodo_cobro is not None:
+        cobro.id_metodo_cobro = id_metodo_cobro
+    cobro.id_estado_pago = estado_segun_monto(nuevo_pagado, total)
+    if nuevo_pagado >= total and not cobro.fecha_hora_cobro:
+        cobro.fecha_hora_cobro = ahora
+
+    nuevos = [
+        Pagos(
+            id_cobro_consulta=cobro,
+            id_caja=caja,
+            pagador=pagador,
+            id_metodo_cobro=cobro.id_metodo_cobro,
+            monto=monto,
+            fecha_hora_pago=ahora
+        )
+        for pagador, monto in aplicados.items() if monto
+    ]
+    if nuevos:
+        Pagos.objects.bulk_create(nuevos)
+        saldos.registrar(caja, cobros=aplicado)
+
+    cobro.monto_pagado = F('monto_pagado') + aplicado
+    cobro.save(update_fields=['monto_pagado', 'id_metodo_cobro', 'id_estado_pago', 'fecha_hora_cobro'])
+    # Con la fila bloqueada el valor guardado es el calculado
+    cobro.monto_pagado = nuevo_pagado
+    for pagador, monto in aplicados.items():
+        pagado[pagador] += monto
+    # Para mostrar el reparto sin volver a sumar los pagos (CobroDetailSerializer)
+    cobro.pagado_paciente = pagado[PACIENTE]
+    cobro.pagado_obra_social = pagado[OBRA_SOCIAL]
+    deudas.actualizar(cobro, pagado[PACIENTE])
+    return aplicado
@@ -0,0 +1,103 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from home.models import Cajas
+from .agregaciones import cajas_con_totales
+from .models import SaldosCaja
+
+
+def totales_desde_movimientos(caja):
+    """Recalcula los totales de una caja sumando sus movimientos (consulta completa)"""
+    caja = cajas_con_totales(Cajas.objects.filter(pk=caja.pk)).get()
+    return {
+        'total_ingresos': caja.total_ingresos,
+        'total_egresos': caja.total_egresos,
+        'total_cobros': caja.total_cobros,
+    }
+
+
+def _obtener_o_crear(caja):
+    """
+    Devuelve el saldo de la caja. Las cajas abiertas antes de existir el
+    saldo acumulado lo construyen una sola vez desde sus movimientos.
+    """
+    try:
+        return SaldosCaja.objects.get(id_caja=caja.pk)
+    except SaldosCaja.DoesNotExist:
+        saldo, _ = SaldosCaja.objects.get_or_create(
+            id_caja=caja,
+            defaults=totales_desde_movimientos(caja)
+        )
+        return saldo
+
+
+def iniciar(caja):
+    """Crea el saldo en cero para una caja recién abierta"""
+    return SaldosCaja.objects.create(id_caja=caja)
+
+
+def bloquear(caja):
+    """
+    Toma el saldo de la caja con SELECT ... FOR UPDATE. Debe llamarse dentro
+    de transaction.atomic() y antes de insertar el movimiento, así dos
+    egresos simultáneos no validan contra el mismo saldo.
+    """
+    _obtener_o_crear(caja)
+    return SaldosCaja.objects.select_for_update().get(id_caja=caja.pk)
+
+
+def registrar(caja, ingresos=0, egresos=0, cobros=0):
+    """Suma los importes a los totales de la caja con un UPDATE atómico"""
+    _obtener_o_crear(caja)
+    SaldosCaja.objects.filter(id_caja=caja.pk).update(
+        total_ingresos=F('total_ingresos') + Decimal(str(ingresos)),
+        total_egresos=F('total_egresos') + Decimal(str(egresos)),
+        total_cobros=F('total_cobros') + Decimal(str(cobros)),
+        fecha_actualizacion=timezone.now()
+    )
+
+
+def obtener(caja):
+    """
+    Resumen de la caja leído del saldo acumulado:
+    total_esperado = apertura + ingresos + cobros - egresos
+    """
+    saldo = _obtener_o_crear(caja)
+    return resumen(caja, saldo)
+
+
+def resumen(caja, saldo):
+    total_esperado = (
+        Decimal(caja.monto_apertura) + saldo.total_ingresos
+        + saldo.total_cobros - saldo.total_egresos
+    )
+    return {
+        'total_ingresos': saldo.total_ingresos,
+        'total_egresos': saldo.total_egresos,
+        'total_cobros': saldo.total_cobros,
+        'total_esperado': total_esperado,
+    }
+
+
+@transaction.atomic
+def reconstruir(caja):
+    """
+    Reemplaza el saldo acumulado por los totales calculados desde los
+    movimientos. Devuelve (anterior, actual); anterior es None si no existía.
+    """
+    actual = totales_desde_movimientos(caja)
+    saldo = SaldosCaja.objects.select_for_update().filter(id_caja=caja.pk).first()
+    if saldo is None:
+        SaldosCaja.objects.create(id_caja=caja, **actual)
+        return None, actual
+
+    anterior = {
+        'total_ingresos': saldo.total_ingresos,
+        'total_egresos': saldo.total_egresos,
+        'total_cobros': saldo.total_cobros,
+    }
+    for campo, valor in actual.items():
+        setattr(saldo, campo, valor)
+    saldo.save()
+    return anterior, actual
@@ -4,7 +4,10 @@ from home.models import (
     CobrosConsulta, MetodosCobro, EstadosPago
 )
 from django.utils import timezone
-from django.db.models import Q, Sum
+from django.db.models import Q
+from home import catalogos
+from . import saldos
+from .agregaciones import cobros_por_metodo
 
 class CajaListSerializer(serializers.ModelSerializer):
     """Para listar cajas"""
@@ -89,7 +92,7 @@ class CajaDetailSerializer(serializers.ModelSerializer):
             metodo_nombre = None
             if c.id_metodo_cobro:
                 try:
-                    metodo = MetodosCobro.objects.get(id_metodo_cobro=c.id_metodo_cobro)
+                    metodo = catalogos.metodos_cobro.obtener(c.id_metodo_cobro)
                     metodo_nombre = metodo.tipo_cobro
                 except MetodosCobro.DoesNotExist:
                     pass
@@ -100,43 +103,42 @@ class CajaDetailSerializer(serializers.ModelSerializer):
                 'monto_total': str(c.monto_total),
                 'monto_pagado': str(c.monto_pagado),
                 'metodo_cobro': metodo_nombre,
-                'estado': c.id_estado_pago.nombre_estado
+                'estado': catalogos.estados_pago.obtener(c.id_estado_pago_id).nombre_estado
             })
     
         return data
     
     def get_resumen(self, obj):
-        from django.db.models import Sum
-        
-        # Total ingresos
-        total_ingresos = Ingresos.objects.filter(
-            id_caja=obj
-        ).aggregate(Sum('monto_ingreso'))['monto_ingreso__sum'] or 0
-        
-        # Total egresos
-        total_egresos = Egresos.objects.filter(
-            id_caja=obj
-        ).aggregate(Sum('monto_egreso'))['monto_egreso__sum'] or 0
-        
-        # Total cobros
-        total_cobros = CobrosConsulta.objects.filter(
-            Q(id_caja=obj) &
-            (Q(eliminado__isnull=True) | Q(eliminado=0))
-        ).aggregate(Sum('monto_pagado'))['monto_pagado__sum'] or 0
-        
-        # Calcular total esperado
-        total_esperado = float(obj.monto_apertura) + float(total_ingresos) + float(total_cobros) - float(total_egresos)
+        # Totales leídos del saldo acumulado de la caja
+        resumen = saldos.obtener(obj)
+        total_esperado = resumen['total_esperado']
         
         return {
             'monto_apertura': str(obj.monto_apertura),
-            'total_ingresos': str(total_ingresos),
-            'total_egresos': str(total_egresos),
-            'total_cobros': str(total_cobros),
+            'total_ingresos': str(resumen['total_ingresos']),
+            'total_egresos': str(resumen['total_egresos']),
+            'total_cobros': str(resumen['total_cobros']),
             'total_esperado': str(total_esperado),
             'monto_cierre': str(obj.monto_cierre) if obj.monto_cierre else None,
-            'diferencia': str(float(obj.monto_cierre) - total_esperado) if obj.monto_cierre else None
+            'diferencia': str(obj.monto_cierre - total_esperado) if obj.monto_cierre else None,
+            'cobros_por_metodo': self._cobros_por_metodo(obj)
         }
 
+    def _cobros_por_metodo(self, obj):
+        data = []
+        for fila in cobros_por_metodo(obj):
+            try:
+                metodo_nombre = catalogos.metodos_cobro.obtener(fila['id_metodo_cobro']).tipo_cobro
+            except MetodosCobro.DoesNotExist:
+                metodo_nombre = None
+            data.append({
+                'id_metodo_cobro': fila['id_metodo_cobro'],
+                'metodo_cobro': metodo_nombre,
+                'cantidad': fila['cantidad'],
+                'total': str(fila['total'])
+            })
+        return data
+
 class IngresoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingresos
@@ -156,24 +158,14 @@ class EgresoSerializer(serializers.ModelSerializer):
         if not caja:
             return value
         
-        # Calcular saldo disponible
-        total_ingresos = Ingresos.objects.filter(
-            id_caja=caja
-        ).aggregate(Sum('monto_ingreso'))['monto_ingreso__sum'] or 0
-        
-        total_egresos_existentes = Egresos.objects.filter(
-            id_caja=caja
-        ).aggregate(Sum('monto_egreso'))['monto_egreso__sum'] or 0
-        
-        total_cobros = CobrosConsulta.objects.filter(
-            Q(id_caja=caja) &
-            (Q(eliminado__isnull=True) | Q(eliminado=0))
-        ).aggregate(Sum('monto_pagado'))['monto_pagado__sum'] or 0
-        
         # Saldo disponible = apertura + ingresos + cobros - egresos ya realizados
-        saldo_disponible = float(caja.monto_apertura) + float(total_ingresos) + float(total_cobros) - float(total_egresos_existentes)
+        saldo = self.context.get('saldo')
+        if saldo is not None:
+            saldo_disponible = saldos.resumen(caja, saldo)['total_esperado']
+        else:
+            saldo_disponible = saldos.obtener(caja)['total_esperado']
         
-        if float(value) > saldo_disponible:
+        if value > saldo_disponible:
             raise serializers.ValidationError(
                 f'El monto del egreso ({value}) supera el saldo disponible en la caja ({saldo_disponible:.2f})'
             )
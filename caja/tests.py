@@ -1,3 +1,66 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from home.models import Cajas, CobrosConsulta, Egresos, Empleados, EstadosPago, Ingresos
 
-# Create your tests here.
+
+class CajaDashboardTests(TestCase):
+    """El dashboard resuelve los totales en consultas agregadas, sin una consulta por caja"""
+
+    CAJAS = 20
+
+    def setUp(self):
+        self.estado = EstadosPago.objects.create(nombre_estado='pagado')
+        self.desde = timezone.now() - timedelta(days=2 * self.CAJAS)
+        self.n = 0
+
+    def _agregar_cajas(self, desde):
+        # Un empleado por caja: sin select_related serían consultas por fila
+        for i in range(self.CAJAS):
+            self.n += 1
+            user = User.objects.create_user(f'cajero{self.n}', first_name='Caja', last_name=str(self.n))
+            empleado = Empleados.objects.create(user_id=user.pk, rol='recepcion')
+            apertura = desde + timedelta(days=i)
+            caja = Cajas.objects.create(
+                id_empleado=empleado,
+                fecha_hora_apertura=apertura,
+                monto_apertura=Decimal('1000.00'),
+                estado_caja=0
+            )
+            Ingresos.objects.create(id_caja=caja, fecha_hora_ingreso=apertura, monto_ingreso=Decimal('500.00'))
+            Egresos.objects.create(id_caja=caja, fecha_hora_egreso=apertura, monto_egreso=Decimal('200.00'))
+            CobrosConsulta.objects.create(
+                id_caja=caja,
+                id_metodo_cobro=1,
+                id_estado_pago=self.estado,
+                monto_total=Decimal('3000.00'),
+                monto_obra_social=Decimal('1000.00'),
+                monto_paciente=Decimal('2000.00'),
+                monto_pagado=Decimal('3000.00'),
+                fecha_hora_cobro=apertura
+            )
+
+    def _pedir(self):
+        respuesta = self.client.get(reverse('caja-dashboard'), {'page_size': 200})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_misma_cantidad_de_consultas_con_el_doble_de_cajas(self):
+        self._agregar_cajas(self.desde)
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self._pedir()
+        self.assertEqual(len(datos['data']), self.CAJAS)
+
+        self._agregar_cajas(self.desde + timedelta(days=self.CAJAS))
+        with self.assertNumQueries(len(consultas)):
+            datos = self._pedir()
+        self.assertEqual(len(datos['data']), 2 * self.CAJAS)
+
+    def test_id_empleado_invalido(self):
+        respuesta = self.client.get(reverse('caja-dashboard'), {'id_empleado': 'abc'})
+        self.assertEqual(respuesta.status_code, 400)
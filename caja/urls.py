@@ -8,6 +8,8 @@ from .views import (
     CajaEgresoView,
     MetodosCobroListView,
     CajaDashboardView,
+    CajaExportarView,
+    LiquidacionesObrasSocialesView,
     EmpleadosListView
 )
 
@@ -15,6 +17,12 @@ urlpatterns = [
     # Dashboard
     path('dashboard/', CajaDashboardView.as_view(), name='caja-dashboard'),
     
+    # Exportación contable de movimientos
+    path('exportar/', CajaExportarView.as_view(), name='caja-exportar'),
+    
+    # Liquidaciones mensuales por obra social
+    path('liquidaciones/', LiquidacionesObrasSocialesView.as_view(), name='caja-liquidaciones'),
+    
     # Lista de cajas
     path('', CajaListView.as_view(), name='caja-list'),
     
@@ -2,10 +2,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
-from django.db.models import Q, Sum
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from datetime import datetime
+from decimal import Decimal
 from home.models import (
     Cajas, Empleados, Ingresos, Egresos,
-    CobrosConsulta, MetodosCobro, AuthUser
+    AuthUser
 )
 from .serializers import (
     CajaListSerializer,
@@ -14,6 +18,10 @@ from .serializers import (
     EgresoSerializer,
     MetodoCobroSerializer
 )
+from home import catalogos
+from home.paginacion import paginar, CursorInvalido
+from .agregaciones import cajas_con_totales, totales_globales, filtrar_cajas
+from . import abierta, exportacion, liquidaciones, saldos
 
 class CajaListView(APIView):
     """Listar cajas (abiertas y cerradas)"""
@@ -33,14 +41,15 @@ class CajaListView(APIView):
             if id_empleado:
                 cajas = cajas.filter(id_empleado=id_empleado)
             
-            cajas = cajas.order_by('-fecha_hora_apertura')
-            
-            serializer = CajaListSerializer(cajas, many=True)
+            return Response(paginar(
+                request, cajas.select_related('id_empleado__user'), ['-fecha_hora_apertura'],
+                lambda filas: CajaListSerializer(filas, many=True).data
+            ))
+        except CursorInvalido as e:
             return Response({
-                'success': True,
-                'data': serializer.data,
-                'total': cajas.count()
-            })
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 'success': False,
@@ -52,19 +61,6 @@ class CajaAperturaView(APIView):
     
     def post(self, request):
         try:
-            # Verificar que no haya una caja abierta
-            caja_abierta = Cajas.objects.filter(estado_caja=1).first()
-            
-            if caja_abierta:
-                return Response({
-                    'success': False,
-                    'error': 'Ya existe una caja abierta. Debe cerrarla antes de abrir una nueva.',
-                    'caja_abierta': {
-                        'id_caja': caja_abierta.id_caja,
-                        'fecha_apertura': caja_abierta.fecha_hora_apertura
-                    }
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
             # Validar id_empleado: debe existir en la tabla Empleados
             id_empleado_input = request.data.get('id_empleado')
             empleado_obj = None
@@ -111,13 +107,19 @@ class CajaAperturaView(APIView):
                     'error': 'No se proporcionó id_empleado válido y no se encontró empleado para el usuario autenticado.'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Crear nueva caja usando la instancia de Empleados
-            caja = Cajas.objects.create(
-                id_empleado=empleado_obj,
-                fecha_hora_apertura=timezone.now(),
-                monto_apertura=request.data.get('monto_apertura', 0),
-                estado_caja=1
-            )
+            # Crear nueva caja usando la instancia de Empleados; la verificación
+            # de que no haya otra abierta se hace con la fila de caja abierta bloqueada
+            try:
+                caja = abierta.abrir(empleado_obj, request.data.get('monto_apertura', 0))
+            except abierta.CajaYaAbierta as e:
+                return Response({
+                    'success': False,
+                    'error': str(e),
+                    'caja_abierta': {
+                        'id_caja': e.caja.id_caja,
+                        'fecha_apertura': e.caja.fecha_hora_apertura
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             return Response({
                 'success': True,
@@ -141,21 +143,8 @@ class CajaCierreView(APIView):
         try:
             caja = Cajas.objects.get(id_caja=id_caja, estado_caja=1)
             
-            # Calcular total esperado
-            total_ingresos = Ingresos.objects.filter(
-                id_caja=caja
-            ).aggregate(Sum('monto_ingreso'))['monto_ingreso__sum'] or 0
-            
-            total_egresos = Egresos.objects.filter(
-                id_caja=caja
-            ).aggregate(Sum('monto_egreso'))['monto_egreso__sum'] or 0
-            
-            total_cobros = CobrosConsulta.objects.filter(
-                Q(id_caja=caja) &
-                (Q(eliminado__isnull=True) | Q(eliminado=0))
-            ).aggregate(Sum('monto_pagado'))['monto_pagado__sum'] or 0
-            
-            total_esperado = float(caja.monto_apertura) + float(total_ingresos) + float(total_cobros) - float(total_egresos)
+            # Total esperado leído del saldo acumulado de la caja
+            total_esperado = saldos.obtener(caja)['total_esperado']
             
             # Obtener monto real contado
             monto_cierre = request.data.get('monto_cierre')
@@ -166,13 +155,10 @@ class CajaCierreView(APIView):
                     'error': 'monto_cierre es requerido'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Cerrar caja
-            caja.fecha_hora_cierre = timezone.now()
-            caja.monto_cierre = monto_cierre
-            caja.estado_caja = 0
-            caja.save()
+            # Cerrar caja y liberar la fila de caja abierta
+            abierta.cerrar(caja, monto_cierre)
             
-            diferencia = float(monto_cierre) - total_esperado
+            diferencia = Decimal(str(monto_cierre)) - total_esperado
             
             return Response({
                 'success': True,
@@ -231,12 +217,14 @@ class CajaIngresoView(APIView):
             
             serializer = IngresoSerializer(data=request.data)
             if serializer.is_valid():
-                ingreso = Ingresos.objects.create(
-                    id_caja=caja,
-                    fecha_hora_ingreso=timezone.now(),
-                    descripcion_ingreso=serializer.validated_data['descripcion_ingreso'],
-                    monto_ingreso=serializer.validated_data['monto_ingreso']
-                )
+                with transaction.atomic():
+                    saldos.registrar(caja, ingresos=serializer.validated_data['monto_ingreso'])
+                    ingreso = Ingresos.objects.create(
+                        id_caja=caja,
+                        fecha_hora_ingreso=timezone.now(),
+                        descripcion_ingreso=serializer.validated_data['descripcion_ingreso'],
+                        monto_ingreso=serializer.validated_data['monto_ingreso']
+                    )
                 
                 return Response({
                     'success': True,
@@ -270,29 +258,35 @@ class CajaEgresoView(APIView):
         try:
             caja = Cajas.objects.get(id_caja=id_caja, estado_caja=1)
             
-            # Pasar la caja como contexto al serializer para validación
-            serializer = EgresoSerializer(data=request.data, context={'caja': caja})
-            if serializer.is_valid():
+            with transaction.atomic():
+                # Bloquear el saldo de la caja: la validación y el registro
+                # del egreso quedan serializados contra otros egresos
+                saldo = saldos.bloquear(caja)
+
+                # Pasar la caja y su saldo como contexto al serializer para validación
+                serializer = EgresoSerializer(data=request.data, context={'caja': caja, 'saldo': saldo})
+                if not serializer.is_valid():
+                    return Response({
+                        'success': False,
+                        'errors': serializer.errors
+                    }, status=status.HTTP_400_BAD_REQUEST)
+
                 egreso = Egresos.objects.create(
                     id_caja=caja,
                     fecha_hora_egreso=timezone.now(),
                     descripcion_egreso=serializer.validated_data['descripcion_egreso'],
                     monto_egreso=serializer.validated_data['monto_egreso']
                 )
-                
-                return Response({
-                    'success': True,
-                    'message': 'Egreso registrado correctamente',
-                    'data': {
-                        'id_egreso': egreso.id_egreso,
-                        'monto': str(egreso.monto_egreso)
-                    }
-                }, status=status.HTTP_201_CREATED)
-            else:
-                return Response({
-                    'success': False,
-                    'errors': serializer.errors
-                }, status=status.HTTP_400_BAD_REQUEST)
+                saldos.registrar(caja, egresos=egreso.monto_egreso)
+
+            return Response({
+                'success': True,
+                'message': 'Egreso registrado correctamente',
+                'data': {
+                    'id_egreso': egreso.id_egreso,
+                    'monto': str(egreso.monto_egreso)
+                }
+            }, status=status.HTTP_201_CREATED)
                 
         except Cajas.DoesNotExist:
             return Response({
@@ -310,9 +304,7 @@ class MetodosCobroListView(APIView):
     
     def get(self, request):
         try:
-            metodos = MetodosCobro.objects.filter(
-                Q(eliminado__isnull=True) | Q(eliminado=0)
-            )
+            metodos = catalogos.metodos_cobro.activos()
             serializer = MetodoCobroSerializer(metodos, many=True)
             return Response({
                 'success': True,
@@ -327,41 +319,63 @@ class MetodosCobroListView(APIView):
 
 class CajaDashboardView(APIView):
     """Dashboard: resumen agregado de cajas con totales de ingresos, egresos y cobros"""
-    
+
+    PAGE_SIZE_DEFAULT = 50
+    PAGE_SIZE_MAX = 200
+
     def get(self, request):
         try:
-            from django.db.models import Sum
-            
-            cajas = Cajas.objects.all().order_by('-fecha_hora_apertura')
-            
-            # Calcular totales globales
-            total_ingresos = Ingresos.objects.aggregate(Sum('monto_ingreso'))['monto_ingreso__sum'] or 0
-            total_egresos = Egresos.objects.aggregate(Sum('monto_egreso'))['monto_egreso__sum'] or 0
-            total_cobros = CobrosConsulta.objects.filter(
-                Q(eliminado__isnull=True) | Q(eliminado=0)
-            ).aggregate(Sum('monto_pagado'))['monto_pagado__sum'] or 0
-            
-            # Por cada caja, calcular sus movimientos
+            # Filtros opcionales
+            try:
+                fecha_desde = self._parse_fecha(request.query_params.get('fecha_desde'))
+                fecha_hasta = self._parse_fecha(request.query_params.get('fecha_hasta'))
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'error': 'Formato de fecha inválido. Use YYYY-MM-DD.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                pagina = max(int(request.query_params.get('page', 1)), 1)
+                tam_pagina = int(request.query_params.get('page_size', self.PAGE_SIZE_DEFAULT))
+                tam_pagina = min(max(tam_pagina, 1), self.PAGE_SIZE_MAX)
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'error': 'page y page_size deben ser números enteros'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            id_empleado = request.query_params.get('id_empleado')
+            if id_empleado and not id_empleado.isdigit():
+                return Response({
+                    'success': False,
+                    'error': 'id_empleado debe ser un número entero'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            cajas = filtrar_cajas(
+                Cajas.objects.all(),
+                fecha_desde=fecha_desde,
+                fecha_hasta=fecha_hasta,
+                id_empleado=id_empleado,
+                estado=request.query_params.get('estado'),
+            )
+
+            # Totales del conjunto filtrado (una sola consulta)
+            resumen = totales_globales(cajas)
+
+            total_cajas = cajas.count()
+            inicio = (pagina - 1) * tam_pagina
+            pagina_cajas = cajas_con_totales(cajas).order_by(
+                '-fecha_hora_apertura', '-id_caja'
+            )[inicio:inicio + tam_pagina]
+
             cajas_data = []
-            for caja in cajas:
-                caja_ingresos = Ingresos.objects.filter(
-                    id_caja=caja
-                ).aggregate(Sum('monto_ingreso'))['monto_ingreso__sum'] or 0
-                
-                caja_egresos = Egresos.objects.filter(
-                    id_caja=caja
-                ).aggregate(Sum('monto_egreso'))['monto_egreso__sum'] or 0
-                
-                caja_cobros = CobrosConsulta.objects.filter(
-                    Q(id_caja=caja) &
-                    (Q(eliminado__isnull=True) | Q(eliminado=0))
-                ).aggregate(Sum('monto_pagado'))['monto_pagado__sum'] or 0
-                
+            for caja in pagina_cajas:
                 empleado_nombre = ""
                 if caja.id_empleado and caja.id_empleado.user:
                     user = caja.id_empleado.user
                     empleado_nombre = f"{user.first_name} {user.last_name}".strip() or user.username
-                
+
                 cajas_data.append({
                     'id_caja': caja.id_caja,
                     'empleado_nombre': empleado_nombre,
@@ -370,18 +384,24 @@ class CajaDashboardView(APIView):
                     'fecha_hora_cierre': caja.fecha_hora_cierre,
                     'monto_cierre': str(caja.monto_cierre) if caja.monto_cierre else None,
                     'estado': 'Abierta' if caja.estado_caja == 1 else 'Cerrada',
-                    'ingresos': str(caja_ingresos),
-                    'egresos': str(caja_egresos),
-                    'cobros': str(caja_cobros)
+                    'ingresos': str(caja.total_ingresos),
+                    'egresos': str(caja.total_egresos),
+                    'cobros': str(caja.total_cobros)
                 })
-            
+
             return Response({
                 'success': True,
                 'data': cajas_data,
                 'resumen_total': {
-                    'total_ingresos': str(total_ingresos),
-                    'total_egresos': str(total_egresos),
-                    'total_cobros': str(total_cobros)
+                    'total_ingresos': str(resumen['total_ingresos']),
+                    'total_egresos': str(resumen['total_egresos']),
+                    'total_cobros': str(resumen['total_cobros'])
+                },
+                'paginacion': {
+                    'pagina': pagina,
+                    'tam_pagina': tam_pagina,
+                    'total': total_cajas,
+                    'paginas': (total_cajas + tam_pagina - 1) // tam_pagina
                 }
             })
         except Exception as e:
@@ -390,6 +410,11 @@ class CajaDashboardView(APIView):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _parse_fecha(self, valor):
+        if not valor:
+            return None
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+
 
 class EmpleadosListView(APIView):
     """Listar empleados activos"""
@@ -409,3 +434,79 @@ class EmpleadosListView(APIView):
             return Response({'success': True, 'data': data})
         except Exception as e:
             return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CajaExportarView(APIView):
+    """
+    Exporta los ingresos, egresos y cobros de un período en orden cronológico.
+    Parámetros: desde, hasta (AAAA-MM-DD), formato (csv|xlsx), id_caja.
+    """
+
+    def get(self, request):
+        try:
+            params = request.query_params
+            try:
+                desde = datetime.strptime(params.get('desde', ''), "%Y-%m-%d").date()
+                hasta = datetime.strptime(params.get('hasta', ''), "%Y-%m-%d").date()
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'error': 'desde y hasta son requeridos con formato AAAA-MM-DD'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            formato = params.get('formato', 'csv')
+            if formato not in exportacion.FORMATOS:
+                return Response({
+                    'success': False,
+                    'error': 'formato debe ser csv o xlsx'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            id_caja = params.get('id_caja')
+            lote = exportacion.Exportacion(desde, hasta, id_caja)
+            response = StreamingHttpResponse(
+                lote.generar(formato), content_type=exportacion.TIPOS_CONTENIDO[formato]
+            )
+            nombre = f"movimientos_{id_caja or 'todas'}_{desde}_{hasta}.{formato}"
+            response['Content-Disposition'] = f'attachment; filename={nombre}'
+            return response
+
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class LiquidacionesObrasSocialesView(APIView):
+    """
+    Liquidación de un mes por obra social: fichas, prestaciones por código
+    de tratamiento, monto adeudado, recibido y saldo. Parámetros: periodo
+    (AAAA-MM, por defecto el mes en curso), id_obra_social.
+    """
+
+    def get(self, request):
+        try:
+            periodo = request.query_params.get('periodo')
+            try:
+                periodo = (
+                    datetime.strptime(periodo, "%Y-%m").date() if periodo
+                    else liquidaciones.mes(timezone.localdate())
+                )
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'error': 'periodo debe tener formato AAAA-MM'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            data = liquidaciones.del_mes(periodo, request.query_params.get('id_obra_social'))
+            return Response({
+                'success': True,
+                'data': data,
+                'total': len(data)
+            })
+
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
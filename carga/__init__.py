@@ -0,0 +1,18 @@
+"""
+Prueba de carga HTTP de los recorridos de la recepción.
+
+Paquete autónomo (solo biblioteca estándar, no importa Django) que se
+ejecuta contra un servidor levantado con runserver o gunicorn:
+
+    python -m carga --url http://127.0.0.1:8000 --usuario admin --password ... \\
+        --usuarios 20 --duracion 60
+
+Cada usuario virtual inicia sesión y repite el recorrido de la recepción
+(buscar paciente, consultar horarios, reservar turno, crear la ficha con
+sus detalles, cobrarla) hasta que vence la duración; al final se cierra la
+caja una vez. Se informa por paso la cantidad de solicitudes, los errores,
+los percentiles p50/p95/p99 de latencia y el throughput.
+
+La prueba escribe datos reales (turnos, fichas, cobros, cierre de caja):
+usarla sobre una base de prueba, p. ej. cargada con manage.py seed_clinic.
+"""
@@ -0,0 +1,104 @@
+import argparse
+import random
+import sys
+import threading
+import time
+
+from .cliente import Cliente, ErrorPaso
+from .escenarios import Recepcion, cerrar_caja, preparar
+from .metricas import Metricas
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(
+        prog='python -m carga',
+        description='Prueba de carga de los recorridos de la recepción contra un servidor levantado.'
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--usuario', required=True, help='Usuario de login (debe ser empleado)')
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--usuarios', type=int, default=10, help='Usuarios virtuales concurrentes')
+    parser.add_argument('--duracion', type=float, default=60, help='Segundos de prueba')
+    parser.add_argument(
+        '--iteraciones', type=int, default=0,
+        help='Recorridos por usuario (0 = repetir hasta que venza la duración)'
+    )
+    parser.add_argument('--rampa', type=float, default=5, help='Segundos para arrancar a todos los usuarios')
+    parser.add_argument('--pausa', type=float, default=0, help='Pausa máxima entre pasos, en segundos')
+    parser.add_argument('--detalles', type=int, default=4, help='Detalles máximos por ficha')
+    parser.add_argument('--empleado', type=int, help='id_empleado para abrir la caja si no hay una abierta')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sin-cierre', action='store_true', help='No cerrar la caja al terminar')
+    parser.add_argument('--json', help='Guardar el resumen en este archivo')
+    return parser.parse_args()
+
+
+def main():
+    args = argumentos()
+    metricas = Metricas()
+
+    inicial = Cliente(args.url, Metricas())
+    try:
+        inicial.login(args.usuario, args.password)
+        contexto = preparar(inicial, args.empleado)
+    except (ErrorPaso, OSError) as e:
+        sys.exit(f'No se pudo preparar la prueba: {e}')
+    print(
+        f'Caja {contexto.id_caja}; {args.usuarios} usuarios contra {args.url} '
+        f'durante {args.duracion:.0f} s...', flush=True
+    )
+
+    completados = [0] * args.usuarios
+    fallidos = [0] * args.usuarios
+    fin = time.monotonic() + args.rampa + args.duracion
+
+    def usuario(i):
+        time.sleep(args.rampa * i / args.usuarios)
+        cliente = Cliente(args.url, metricas)
+        recepcion = Recepcion(
+            cliente, contexto, random.Random(args.seed * 1000 + i), args.pausa, args.detalles
+        )
+        try:
+            cliente.login(args.usuario, args.password)
+            while time.monotonic() < fin:
+                try:
+                    if recepcion.recorrido():
+                        completados[i] += 1
+                    else:
+                        fallidos[i] += 1
+                except ErrorPaso:
+                    fallidos[i] += 1
+                if args.iteraciones and completados[i] + fallidos[i] >= args.iteraciones:
+                    break
+        except ErrorPaso:
+            fallidos[i] += 1
+        finally:
+            cliente.cerrar()
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=usuario, args=(i,), daemon=True) for i in range(args.usuarios)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    if not args.sin_cierre:
+        cierre = Cliente(args.url, metricas)
+        cierre.token = inicial.token
+        try:
+            cerrar_caja(cierre, contexto)
+        except ErrorPaso as e:
+            print(f'No se pudo cerrar la caja: {e}', file=sys.stderr)
+        cierre.cerrar()
+    inicial.cerrar()
+
+    print(metricas.tabla(segundos))
+    print(f'Recorridos completos: {sum(completados)}, incompletos: {sum(fallidos)}')
+    if args.json:
+        parametros = {k: v for k, v in vars(args).items() if k != 'password'}
+        metricas.guardar(args.json, segundos, parametros)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Cliente HTTP JSON con conexión persistente y token JWT (uno por usuario virtual)"""
+import http.client
+import json
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+class ErrorPaso(Exception):
+    """El paso respondió algo que impide seguir con el recorrido"""
+
+
+class Cliente:
+    def __init__(self, url, metricas, timeout=30):
+        partes = urlsplit(url)
+        self.https = partes.scheme == 'https'
+        self.host = partes.netloc
+        self.base = partes.path.rstrip('/')
+        self.metricas = metricas
+        self.timeout = timeout
+        self.token = None
+        self._conexion = None
+
+    def _conectar(self):
+        clase = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return clase(self.host, timeout=self.timeout)
+
+    def _enviar(self, metodo, ruta, cuerpo, cabeceras):
+        # Un reintento si el servidor cerró la conexión persistente
+        for intento in range(2):
+            if self._conexion is None:
+                self._conexion = self._conectar()
+            try:
+                self._conexion.request(metodo, ruta, cuerpo, cabeceras)
+                respuesta = self._conexion.getresponse()
+                return respuesta.status, respuesta.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self._conexion.close()
+                self._conexion = None
+                if intento:
+                    raise
+
+    def pedir(self, paso, metodo, ruta, datos=None, params=None, esperados=(200, 201)):
+        """
+        Hace el request, registra la latencia del paso y devuelve (código, json).
+        Los códigos fuera de `esperados` cuentan como error del paso.
+        """
+        ruta = self.base + ruta + (f'?{urlencode(params)}' if params else '')
+        cabeceras = {'Accept': 'application/json'}
+        if self.token:
+            cabeceras['Authorization'] = f'Bearer {self.token}'
+        cuerpo = None
+        if datos is not None:
+            cuerpo = json.dumps(datos).encode()
+            cabeceras['Content-Type'] = 'application/json'
+
+        inicio = time.perf_counter()
+        try:
+            codigo, crudo = self._enviar(metodo, ruta, cuerpo, cabeceras)
+        except (OSError, http.client.HTTPException) as e:
+            self.metricas.registrar(paso, (time.perf_counter() - inicio) * 1000, type(e).__name__, False)
+            self.cerrar()
+            raise ErrorPaso(f'{paso}: {e}') from e
+        ms = (time.perf_counter() - inicio) * 1000
+        self.metricas.registrar(paso, ms, codigo, codigo in esperados)
+
+        try:
+            contenido = json.loads(crudo) if crudo else None
+        except ValueError:
+            contenido = None
+        return codigo, contenido
+
+    def login(self, usuario, password):
+        codigo, datos = self.pedir('login', 'POST', '/api/auth/', {'username': usuario, 'password': password})
+        if codigo != 200:
+            raise ErrorPaso(f'login: {codigo} {datos}')
+        self.token = datos['access']
+
+    def cerrar(self):
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
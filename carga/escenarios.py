@@ -0,0 +1,176 @@
+"""
+Recorridos de la recepción. `preparar` lee una vez los catálogos y abre la
+caja si hace falta; cada usuario virtual repite `recorrido` y al final de
+la prueba `cerrar_caja` hace el arqueo y el cierre.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from .cliente import ErrorPaso
+
+# Prefijos de apellidos frecuentes (los de los datos sintéticos de seed_clinic)
+BUSQUEDAS = [
+    'gonz', 'rodr', 'gom', 'fern', 'lop', 'diaz', 'mart', 'per', 'garc',
+    'sanch', 'rom', 'sosa', 'alv', 'torr', 'ruiz', 'ramir', 'flor', 'ben',
+]
+DIAS_RESERVA = 90
+
+
+@dataclass
+class Contexto:
+    """Datos compartidos entre usuarios, leídos una vez en preparar()"""
+    id_caja: int
+    id_empleado: int
+    id_estado_pendiente: int
+    tratamientos: list
+    dientes: list
+    caras: list
+    metodos_cobro: list
+    busquedas: list = field(default_factory=lambda: list(BUSQUEDAS))
+
+
+def _datos(paso, codigo, contenido, esperados=(200,)):
+    if codigo not in esperados or not isinstance(contenido, dict):
+        raise ErrorPaso(f'{paso}: respondió {codigo}')
+    return contenido.get('data')
+
+
+def preparar(cliente, id_empleado=None):
+    """Catálogos, estado de turno pendiente y caja abierta (la abre si no hay)"""
+    catalogos = _datos('catálogos', *cliente.pedir('preparar', 'GET', '/api/ficha_medica/catalogos/'))
+    estados = _datos('estados', *cliente.pedir('preparar', 'GET', '/api/turnos/estados/'))
+    metodos = _datos('métodos', *cliente.pedir('preparar', 'GET', '/api/ficha_medica/metodos-cobro/'))
+    pendiente = next(
+        (e['id_estado_turno'] for e in estados if e['estado_turno'].lower() == 'pendiente'), None
+    )
+    if pendiente is None:
+        raise ErrorPaso('No existe el estado de turno Pendiente')
+
+    codigo, estado = cliente.pedir('preparar', 'GET', '/api/ficha_medica/caja/estado/')
+    _datos('estado de caja', codigo, estado)
+    if not estado.get('caja_abierta'):
+        apertura = {'monto_apertura': '10000.00'}
+        if id_empleado:
+            apertura['id_empleado'] = id_empleado
+        _datos('apertura', *cliente.pedir(
+            'abrir caja', 'POST', '/api/caja/apertura/', apertura, esperados=(201,)
+        ), esperados=(201,))
+        codigo, estado = cliente.pedir('preparar', 'GET', '/api/ficha_medica/caja/estado/')
+    caja = _datos('estado de caja', codigo, estado)
+
+    return Contexto(
+        id_caja=caja['id_caja'],
+        id_empleado=id_empleado or caja.get('empleado_id'),
+        id_estado_pendiente=pendiente,
+        tratamientos=[t['id_tratamiento'] for t in catalogos['tratamientos']],
+        dientes=[d['id_diente'] for d in catalogos['dientes']],
+        caras=[c['id_cara'] for c in catalogos['caras']],
+        metodos_cobro=[m['id_metodo_cobro'] for m in metodos],
+    )
+
+
+class Recepcion:
+    """Un usuario virtual: la recepcionista que atiende pacientes de a uno"""
+
+    def __init__(self, cliente, contexto, rng, pausa=0.0, max_detalles=4):
+        self.cliente = cliente
+        self.ctx = contexto
+        self.rng = rng
+        self.pausa = pausa
+        self.max_detalles = max_detalles
+
+    def _esperar(self):
+        if self.pausa:
+            time.sleep(self.rng.uniform(0, self.pausa))
+
+    def _fecha_habil(self):
+        fecha = date.today() + timedelta(days=self.rng.randint(1, DIAS_RESERVA - 1))
+        while fecha.weekday() >= 5:
+            fecha -= timedelta(days=1)
+        return fecha if fecha > date.today() else fecha + timedelta(days=7)
+
+    def recorrido(self):
+        """Un paciente atendido de punta a punta; devuelve False si no se pudo completar"""
+        cliente, ctx, rng = self.cliente, self.ctx, self.rng
+
+        codigo, datos = cliente.pedir(
+            'buscar paciente', 'GET', '/api/pacientes/', params={'search': rng.choice(ctx.busquedas)}
+        )
+        pacientes = (datos or {}).get('data') or []
+        if codigo != 200 or not pacientes:
+            return False
+        id_paciente = rng.choice(pacientes)['id_paciente']
+        self._esperar()
+
+        fecha = self._fecha_habil()
+        codigo, datos = cliente.pedir(
+            'horarios disponibles', 'GET', '/api/turnos/horarios-disponibles/', params={'fecha': fecha.isoformat()}
+        )
+        horarios = (datos or {}).get('horarios_disponibles') or []
+        if codigo == 200 and horarios:
+            self._esperar()
+            # Con varios usuarios un 400 suele ser el horario tomado por otro
+            cliente.pedir('reservar turno', 'POST', '/api/turnos/', {
+                'id_paciente': id_paciente,
+                'fecha_turno': fecha.isoformat(),
+                'hora_turno': rng.choice(horarios)[:5],
+                'asunto': 'Control',
+                'id_turno_estado': ctx.id_estado_pendiente,
+            }, esperados=(201,))
+        self._esperar()
+
+        obras_sociales = _datos('obras sociales', *cliente.pedir(
+            'obras sociales paciente', 'GET', f'/api/ficha_medica/paciente/{id_paciente}/obras-sociales/'
+        ))
+        if not obras_sociales:
+            return False
+        id_paciente_os = obras_sociales[0]['id_paciente_os']
+
+        codigo, datos = cliente.pedir(
+            'ficha patológica', 'GET', '/api/ficha_medica/patologia/', params={'id_paciente_os': id_paciente_os}
+        )
+        if codigo == 200 and datos.get('exists'):
+            id_ficha_patologica = datos['data']['id_ficha_patologica']
+        else:
+            id_ficha_patologica = _datos('crear ficha patológica', *cliente.pedir(
+                'crear ficha patológica', 'POST', '/api/ficha_medica/patologia/',
+                {'id_paciente_os': id_paciente_os}, esperados=(201,)
+            ), esperados=(201,))['id_ficha_patologica']
+        self._esperar()
+
+        ficha = _datos('crear ficha', *cliente.pedir('crear ficha', 'POST', '/api/ficha_medica/', {
+            'id_paciente_os': id_paciente_os,
+            'id_empleado': ctx.id_empleado,
+            'id_ficha_patologica': id_ficha_patologica,
+            'id_caja': ctx.id_caja,
+            'detalles_consulta': [
+                {
+                    'id_tratamiento': rng.choice(ctx.tratamientos),
+                    'id_diente': rng.choice(ctx.dientes),
+                    'id_cara': rng.choice(ctx.caras),
+                }
+                for _ in range(rng.randint(1, self.max_detalles))
+            ],
+        }, esperados=(201,)), esperados=(201,))
+
+        cobro = _datos('ver ficha', *cliente.pedir(
+            'ver ficha', 'GET', f'/api/ficha_medica/ficha/{ficha["id_ficha_medica"]}/'
+        ))['cobro']
+        self._esperar()
+
+        cliente.pedir('cobrar', 'PATCH', f'/api/ficha_medica/cobros/{cobro["id_cobro_consulta"]}/', {
+            'id_metodo_cobro': rng.choice(ctx.metodos_cobro),
+            'monto_pagado_paciente': cobro['monto_paciente'],
+            'monto_pagado_obra_social': cobro['monto_obra_social'],
+        })
+        return True
+
+
+def cerrar_caja(cliente, contexto):
+    """Arqueo y cierre de la caja con el total esperado"""
+    caja = _datos('resumen de caja', *cliente.pedir('resumen caja', 'GET', f'/api/caja/{contexto.id_caja}/'))
+    _datos('cierre de caja', *cliente.pedir(
+        'cerrar caja', 'POST', f'/api/caja/{contexto.id_caja}/cierre/',
+        {'monto_cierre': caja['resumen']['total_esperado']}
+    ))
@@ -0,0 +1,75 @@
+"""Registro de latencias por paso y reporte con percentiles y throughput"""
+import json
+import math
+import threading
+from collections import Counter, defaultdict
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) por rango más cercano de una lista ya ordenada"""
+    if not ordenados:
+        return 0.0
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+class Metricas:
+    """Latencias (ms) y códigos de respuesta por paso; se comparte entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.codigos = defaultdict(Counter)
+        self.orden = []
+
+    def registrar(self, paso, ms, codigo, ok):
+        with self._lock:
+            if paso not in self.latencias:
+                self.orden.append(paso)
+            self.latencias[paso].append(ms)
+            self.codigos[paso][codigo] += 1
+            if not ok:
+                self.errores[paso] += 1
+
+    def resumen(self, segundos):
+        """[{paso, solicitudes, errores, p50, p95, p99, max, por_segundo, codigos}]"""
+        filas = []
+        for paso in self.orden:
+            ordenados = sorted(self.latencias[paso])
+            fila = {
+                'paso': paso,
+                'solicitudes': len(ordenados),
+                'errores': self.errores[paso],
+            }
+            for p in PERCENTILES:
+                fila[f'p{p}'] = round(percentil(ordenados, p), 1)
+            fila['max'] = round(ordenados[-1], 1)
+            fila['por_segundo'] = round(len(ordenados) / segundos, 2) if segundos else 0.0
+            fila['codigos'] = {str(c): n for c, n in sorted(self.codigos[paso].items(), key=str)}
+            filas.append(fila)
+        return filas
+
+    def tabla(self, segundos):
+        filas = self.resumen(segundos)
+        lineas = [
+            f'{"paso":<24}{"solic.":>8}{"errores":>9}{"p50 ms":>9}{"p95 ms":>9}'
+            f'{"p99 ms":>9}{"máx ms":>9}{"req/s":>9}  códigos'
+        ]
+        for f in filas:
+            codigos = ' '.join(f'{c}:{n}' for c, n in f['codigos'].items())
+            lineas.append(
+                f'{f["paso"]:<24}{f["solicitudes"]:>8}{f["errores"]:>9}{f["p50"]:>9.1f}{f["p95"]:>9.1f}'
+                f'{f["p99"]:>9.1f}{f["max"]:>9.1f}{f["por_segundo"]:>9.2f}  {codigos}'
+            )
+        total = sum(f['solicitudes'] for f in filas)
+        lineas.append(f'Total: {total} solicitudes en {segundos:.1f} s ({total / segundos:.1f} req/s)')
+        return '\n'.join(lineas)
+
+    def guardar(self, ruta, segundos, parametros):
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(
+                {'parametros': parametros, 'segundos': round(segundos, 2), 'pasos': self.resumen(segundos)},
+                archivo, indent=2, ensure_ascii=False
+            )
@@ -0,0 +1,95 @@
+"""
+Caché en disco de los PDF de fichas médicas.
+
+Cada PDF se guarda con el hash de los datos que se dibujan (más la versión
+del dibujo) como nombre:  PDF_CACHE_DIR/<tipo>/<id_ficha>/<hash>.pdf
+
+Si la ficha no cambió el archivo ya existe y se sirve directo del disco
+con FileResponse; el hash se usa además como ETag, así que el navegador
+que ya lo tiene recibe un 304 sin cuerpo. Como la fecha del día forma
+parte de los datos del formulario, el hash cambia solo al día siguiente.
+Al guardar una versión nueva se borran las anteriores de la misma ficha.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+from . import pdf as pdf_ficha
+
+
+def directorio():
+    return Path(getattr(settings, 'PDF_CACHE_DIR', Path(settings.BASE_DIR) / 'cache_pdf'))
+
+
+def huella(tipo, datos):
+    """Hash de los datos de la página (y la versión del dibujo)"""
+    crudo = json.dumps(
+        [pdf_ficha.VERSION, tipo, datos],
+        cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'), ensure_ascii=False
+    )
+    return hashlib.sha256(crudo.encode()).hexdigest()
+
+
+def _ruta(tipo, id_ficha, hash_datos):
+    return directorio() / tipo / str(id_ficha) / f'{hash_datos}.pdf'
+
+
+def _guardar(ruta, contenido):
+    """Escritura atómica: otro request nunca ve un PDF a medio escribir"""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+    for anterior in ruta.parent.glob('*.pdf'):
+        if anterior != ruta:
+            anterior.unlink(missing_ok=True)
+
+
+def abrir(tipo, id_ficha, datos, hash_datos=None):
+    """Archivo del PDF abierto en binario; lo dibuja y guarda si no estaba en caché"""
+    ruta = _ruta(tipo, id_ficha, hash_datos or huella(tipo, datos))
+    try:
+        return open(ruta, 'rb')
+    except FileNotFoundError:
+        pass
+    _guardar(ruta, pdf_ficha.renderizar(tipo, [datos]))
+    return open(ruta, 'rb')
+
+
+def respuesta(request, tipo, id_ficha, datos, nombre_archivo):
+    """
+    Respuesta HTTP del PDF: 304 si el If-None-Match del request coincide,
+    si no el archivo (de la caché o recién dibujado) como adjunto.
+    """
+    hash_datos = huella(tipo, datos)
+    etag = quote_etag(hash_datos)
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        if '*' in etags or etag in etags or f'W/{etag}' in etags:
+            respuesta_304 = HttpResponseNotModified()
+            respuesta_304['ETag'] = etag
+            return respuesta_304
+
+    response = FileResponse(
+        abrir(tipo, id_ficha, datos, hash_datos),
+        as_attachment=True,
+        filename=nombre_archivo,
+        content_type='application/pdf'
+    )
+    response['ETag'] = etag
+    # El navegador puede guardarlo pero debe revalidar con el ETag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
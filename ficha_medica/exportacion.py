@@ -0,0 +1,161 @@
+"""
+Exportación por lotes de los PDF de fichas médicas (p. ej. las presentaciones
+mensuales de "Registro de Prestaciones" a cada obra social).
+
+Los datos de las fichas se leen en bloques (select_related + prefetch, unas
+pocas consultas por bloque) y el dibujo se reparte en un ProcessPoolExecutor:
+cada tarea recibe solo dicts de valores simples y devuelve los PDF en bytes,
+así los procesos no necesitan acceso a la base de datos.
+
+Formatos:
+    zip  un PDF por ficha dentro de un ZIP que se va generando a medida que
+         llegan los resultados (se puede enviar con StreamingHttpResponse)
+    pdf  un único PDF con una página por ficha; se dibuja en un solo canvas
+         para que el fondo del formulario (Form XObject) y el logo queden una
+         sola vez en el archivo, por eso no se reparte entre procesos
+"""
+import multiprocessing
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.db.models import Q
+
+from home.models import FichasMedicas
+from . import pdf as pdf_ficha
+
+FORMATOS = ('zip', 'pdf')
+
+# Fichas por tarea de cada proceso y fichas leídas por consulta
+TAM_TAREA = 25
+TAM_BLOQUE = 500
+
+
+def procesos_por_defecto():
+    return getattr(settings, 'PDF_EXPORTACION_PROCESOS', None) or min(4, os.cpu_count() or 1)
+
+
+def fichas_a_exportar(desde, hasta, id_obra_social=None):
+    """Fichas activas creadas en [desde, hasta], opcionalmente de una obra social"""
+    fichas = FichasMedicas.objects.filter(
+        Q(eliminado__isnull=True),
+        fecha_creacion__gte=desde,
+        fecha_creacion__lte=hasta
+    )
+    if id_obra_social:
+        fichas = fichas.filter(id_paciente_os__id_obra_social=id_obra_social)
+    return fichas.order_by('fecha_creacion', 'id_ficha_medica')
+
+
+class _Salida:
+    """Destino no posicionable para zipfile: acumula lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+class Exportacion:
+    """
+    Exportación de las fichas de un queryset. `cantidad` y `segundos` quedan
+    disponibles después de consumir zip() o de llamar a pdf().
+    """
+
+    def __init__(self, fichas, tipo='ficha', procesos=None, hoy=None):
+        if tipo not in pdf_ficha.TIPOS:
+            raise ValueError(f'Tipo de PDF inválido: {tipo}')
+        self.fichas = fichas
+        self.tipo = tipo
+        self.procesos = procesos or procesos_por_defecto()
+        self.hoy = hoy
+        self.cantidad = 0
+        self.segundos = 0.0
+
+    def _datos(self):
+        """(id_ficha, datos de la página) en el orden del queryset"""
+        armar = pdf_ficha.datos_ficha if self.tipo == 'ficha' else pdf_ficha.datos_odontograma
+        argumentos = {'hoy': self.hoy} if self.tipo == 'ficha' else {}
+        for ficha in pdf_ficha.preparar_queryset(self.fichas).iterator(chunk_size=TAM_BLOQUE):
+            yield ficha.pk, armar(ficha, **argumentos)
+
+    def _tareas(self):
+        tarea = []
+        for item in self._datos():
+            tarea.append(item)
+            if len(tarea) == TAM_TAREA:
+                yield tarea
+                tarea = []
+        if tarea:
+            yield tarea
+
+    def _renderizados(self):
+        """
+        (id_ficha, bytes del PDF) en orden. Se mantienen a lo sumo dos tareas
+        por proceso en vuelo para no acumular en memoria todo el lote.
+        """
+        # spawn: los procesos no heredan conexiones ni hilos del servidor
+        contexto = multiprocessing.get_context('spawn')
+        pool = ProcessPoolExecutor(max_workers=self.procesos, mp_context=contexto)
+        pendientes = deque()
+        try:
+            for tarea in self._tareas():
+                ids = [id_ficha for id_ficha, _ in tarea]
+                paginas = [datos for _, datos in tarea]
+                pendientes.append((ids, pool.submit(pdf_ficha.renderizar_por_separado, self.tipo, paginas)))
+                if len(pendientes) >= self.procesos * 2:
+                    yield from self._resultado(pendientes.popleft())
+            while pendientes:
+                yield from self._resultado(pendientes.popleft())
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _resultado(pendiente):
+        ids, futuro = pendiente
+        yield from zip(ids, futuro.result())
+
+    def nombre_archivo(self, id_ficha):
+        prefijo = 'ficha_medica' if self.tipo == 'ficha' else 'odontograma'
+        return f'{prefijo}_{id_ficha}.pdf'
+
+    def zip(self):
+        """Genera el ZIP de a partes (bytes) a medida que se dibujan las fichas"""
+        inicio = time.perf_counter()
+        salida = _Salida()
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo:
+            for id_ficha, contenido in self._renderizados():
+                archivo.writestr(self.nombre_archivo(id_ficha), contenido)
+                self.cantidad += 1
+                yield salida.vaciar()
+        yield salida.vaciar()
+        self.segundos = time.perf_counter() - inicio
+
+    def pdf(self, salida=None):
+        """Un solo PDF con todas las fichas; bytes, o se escribe en `salida`"""
+        inicio = time.perf_counter()
+
+        def paginas():
+            for _, datos in self._datos():
+                self.cantidad += 1
+                yield datos
+
+        resultado = pdf_ficha.renderizar(self.tipo, paginas(), salida)
+        self.segundos = time.perf_counter() - inicio
+        return resultado
+
+    @property
+    def fichas_por_segundo(self):
+        return self.cantidad / self.segundos if self.segundos else 0.0
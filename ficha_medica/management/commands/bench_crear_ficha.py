@@ -0,0 +1,88 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from home import sintetico
+from ficha_medica.views import ListaPacientesFicha
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la creación de una ficha médica con muchos detalles '
+        '(POST /api/ficha_medica/) sobre datos sintéticos. Los datos '
+        'se crean dentro de una transacción que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--detalles', type=int, default=32)
+        parser.add_argument('--repeticiones', type=int, default=21)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--max-consultas', type=int, default=15,
+            help='Cantidad máxima de consultas SQL permitidas por ficha creada'
+        )
+        parser.add_argument(
+            '--max-ms', type=float, default=100,
+            help='Mediana máxima permitida por ficha creada, en milisegundos'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            consultas, tiempos = self._medir(options)
+            transaction.set_rollback(True)
+
+        ms = statistics.median(tiempos)
+        self.stdout.write(
+            f'Ficha con {options["detalles"]} detalles: mediana {ms:.1f} ms, '
+            f'máximo {max(tiempos):.1f} ms, {consultas} consultas '
+            f'({len(tiempos)} fichas medidas)'
+        )
+
+        errores = []
+        if consultas > options['max_consultas']:
+            errores.append(f'{consultas} consultas (máximo {options["max_consultas"]})')
+        if ms > options['max_ms']:
+            errores.append(f'{ms:.1f} ms (máximo {options["max_ms"]:.0f} ms)')
+        if errores:
+            raise CommandError('Presupuesto excedido: ' + ', '.join(errores))
+        self.stdout.write(self.style.SUCCESS('Dentro del presupuesto.'))
+
+    def _medir(self, options):
+        catalogos = sintetico.asegurar_catalogos()
+        lote = sintetico.crear_pacientes(options['repeticiones'], catalogos, seed=options['seed'])
+        caja = sintetico.crear_caja(catalogos)
+        desplazamiento_patologica = lote.fichas_patologicas.start - lote.pacientes_os.start
+
+        vista = ListaPacientesFicha.as_view()
+        factory = APIRequestFactory()
+        consultas = 0
+        tiempos = []
+        for i, id_paciente_os in enumerate(lote.pacientes_os):
+            datos = {
+                'id_paciente_os': id_paciente_os,
+                'id_empleado': catalogos.empleado.pk,
+                'id_ficha_patologica': id_paciente_os + desplazamiento_patologica,
+                'observaciones': 'Benchmark',
+                'id_caja': caja.pk,
+                'detalles_consulta': [
+                    {
+                        'id_tratamiento': catalogos.tratamientos[j % len(catalogos.tratamientos)].pk,
+                        'id_diente': catalogos.dientes[(i + j) % len(catalogos.dientes)],
+                        'id_cara': catalogos.caras[j % len(catalogos.caras)],
+                    }
+                    for j in range(options['detalles'])
+                ],
+            }
+            request = factory.post('/api/ficha_medica/', datos, format='json')
+            with CaptureQueriesContext(connection) as ctx:
+                inicio = time.perf_counter()
+                response = vista(request)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            if response.status_code != 201:
+                raise CommandError(f'La creación falló ({response.status_code}): {response.data}')
+            # La primera creación carga los catálogos en memoria: no cuenta
+            if i:
+                consultas = max(consultas, len(ctx.captured_queries))
+        return consultas, tiempos[1:]
@@ -0,0 +1,63 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from home import sintetico
+from ficha_medica.views import FichasMedicasListView
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el listado de fichas médicas (GET /api/ficha_medica/fichas/) sobre '
+        'datos sintéticos. Los datos se crean dentro de una transacción que se '
+        'revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fichas', type=int, default=5000)
+        parser.add_argument('--pacientes', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--max-consultas', type=int, default=10,
+            help='Cantidad máxima de consultas SQL permitidas para el listado'
+        )
+        parser.add_argument(
+            '--max-ms', type=float, default=5000,
+            help='Tiempo máximo permitido para el listado, en milisegundos'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            resultado = self._medir(options)
+            transaction.set_rollback(True)
+
+        consultas, ms, total = resultado
+        self.stdout.write(f'{total} fichas serializadas en {ms:.0f} ms con {consultas} consultas')
+
+        errores = []
+        if consultas > options['max_consultas']:
+            errores.append(f'{consultas} consultas (máximo {options["max_consultas"]})')
+        if ms > options['max_ms']:
+            errores.append(f'{ms:.0f} ms (máximo {options["max_ms"]:.0f} ms)')
+        if errores:
+            raise CommandError('Presupuesto excedido: ' + ', '.join(errores))
+        self.stdout.write(self.style.SUCCESS('Dentro del presupuesto.'))
+
+    def _medir(self, options):
+        catalogos = sintetico.asegurar_catalogos()
+        lote = sintetico.crear_pacientes(options['pacientes'], catalogos, seed=options['seed'])
+        caja = sintetico.crear_caja(catalogos, abierta=False)
+        sintetico.crear_fichas(options['fichas'], catalogos, lote, caja, seed=options['seed'])
+
+        request = APIRequestFactory().get('/api/ficha_medica/fichas/')
+        vista = FichasMedicasListView.as_view()
+
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            response = vista(request)
+            ms = (time.perf_counter() - inicio) * 1000
+
+        if response.status_code != 200 or not response.data.get('success'):
+            raise CommandError(f'El listado falló: {response.data}')
+        return len(ctx.captured_queries), ms, response.data['total']
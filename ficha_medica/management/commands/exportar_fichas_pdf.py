@@ -0,0 +1,48 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from ficha_medica import exportacion
+from ficha_medica.pdf import TIPOS
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor} (formato AAAA-MM-DD)') from None
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta en lote los PDF de las fichas médicas de un período (y obra '
+        'social) a un ZIP con un PDF por ficha o a un único PDF, e informa '
+        'cuántas fichas por segundo se dibujaron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_fecha, required=True)
+        parser.add_argument('--hasta', type=_fecha, required=True)
+        parser.add_argument('--obra-social', type=int, help='id_obra_social; por defecto todas')
+        parser.add_argument('--formato', choices=exportacion.FORMATOS, default='zip')
+        parser.add_argument('--tipo', choices=TIPOS, default='ficha')
+        parser.add_argument('--procesos', type=int, help='Procesos para dibujar (solo ZIP)')
+        parser.add_argument('--salida', required=True, help='Archivo a generar')
+
+    def handle(self, *args, **options):
+        fichas = exportacion.fichas_a_exportar(options['desde'], options['hasta'], options['obra_social'])
+        lote = exportacion.Exportacion(fichas, tipo=options['tipo'], procesos=options['procesos'])
+
+        with open(options['salida'], 'wb') as salida:
+            if options['formato'] == 'pdf':
+                lote.pdf(salida)
+            else:
+                for parte in lote.zip():
+                    salida.write(parte)
+
+        if not lote.cantidad:
+            self.stdout.write(self.style.WARNING('No hay fichas médicas en ese período.'))
+            return
+        procesos = f', {lote.procesos} procesos' if options['formato'] == 'zip' else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{lote.cantidad} fichas exportadas a {options['salida']} en {lote.segundos:.2f} s "
+            f"({lote.fichas_por_segundo:.1f} fichas/s{procesos})."
+        ))
@@ -0,0 +1,691 @@
+"""
+Dibujo de los PDF de la ficha médica (formulario de A.O.S.) y del odontograma.
+
+Se separa en dos pasos:
+    datos_ficha / datos_odontograma  arman un dict de valores simples a partir
+                                     de la ficha (sin consultas si viene de
+                                     preparar_queryset)
+    renderizar(tipo, paginas)        dibuja el PDF (una página por dict) sin
+                                     tocar la base de datos
+
+renderizar solo depende de ReportLab (los modelos se importan dentro de las
+funciones de carga), así los procesos de la exportación por lotes pueden
+importar este módulo sin inicializar Django.
+
+Las partes fijas de cada formulario (logo, recuadros, rótulos, grilla de la
+tabla) se dibujan una sola vez por documento como Form XObject y cada página
+solo las referencia; el logo se lee del disco una sola vez por proceso.
+
+Si cambia el dibujo hay que subir VERSION para que no se sirvan PDF
+cacheados con el formato anterior.
+"""
+from decimal import Decimal
+from io import BytesIO
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib import colors
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab import rl_config
+
+# Streams binarios en lugar de ASCII85: la codificación ASCII85 de ReportLab
+# es Python puro y se llevaba casi todo el tiempo de cada PDF (el logo se
+# vuelve a codificar en cada documento). Además los archivos quedan más chicos.
+rl_config.useA85 = 0
+
+VERSION = 1
+
+LOGO = Path(__file__).resolve().parent / 'static' / 'AOS-logo.png'
+
+ANCHO, ALTO = landscape(A4)  # 842pt x 595pt
+
+TIPOS = ('ficha', 'odontograma')
+
+
+# ============================================
+# CARGA DE DATOS
+# ============================================
+
+def preparar_queryset(queryset):
+    """Relaciones necesarias para armar los datos de los dos PDF sin consultas extra"""
+    from django.db.models import Prefetch
+    from home.models import DetallesConsulta
+    return queryset.select_related(
+        'id_paciente_os__id_paciente',
+        'id_paciente_os__id_obra_social',
+        'id_paciente_os__id_parentesco',
+        'id_ficha_patologica'
+    ).prefetch_related(
+        Prefetch(
+            'detallesconsulta_set',
+            queryset=DetallesConsulta.objects.filter(eliminado__isnull=True)
+            .select_related('id_tratamiento', 'id_diente')
+            .order_by('pk'),
+            to_attr='detalles_pdf'
+        )
+    )
+
+
+def _detalles(ficha):
+    if hasattr(ficha, 'detalles_pdf'):
+        return ficha.detalles_pdf
+    from home.models import DetallesConsulta
+    return list(
+        DetallesConsulta.objects.filter(id_ficha_medica=ficha, eliminado__isnull=True)
+        .select_related('id_tratamiento', 'id_diente')
+        .order_by('pk')
+    )
+
+
+def calcular_edad(fecha_nacimiento, hoy):
+    """Edad cumplida a la fecha `hoy`"""
+    edad = hoy.year - fecha_nacimiento.year
+    # Ajustar si aún no cumplió años este año
+    if (hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day):
+        edad -= 1
+    return edad
+
+
+def datos_ficha(ficha, hoy=None):
+    """Valores del formulario de prestaciones (la fecha impresa es la del día)"""
+    from home import catalogos
+    hoy = hoy or date.today()
+    paciente_os = ficha.id_paciente_os
+    paciente = paciente_os.id_paciente
+
+    fecha_ficha = ficha.fecha_creacion.strftime("%d/%m/%Y") if ficha.fecha_creacion else ''
+    total_importe = Decimal('0.00')
+    filas = []
+    for d in _detalles(ficha):
+        importe = Decimal(d.id_tratamiento.importe or 0)
+        total_importe += importe
+
+        cara = ''
+        if d.id_cara:
+            cara_diente = catalogos.caras.get(d.id_cara)
+            cara = cara_diente.abreviatura if cara_diente else ''
+
+        filas.append({
+            'diente': str(d.id_diente.id_diente) if d.id_diente else '',
+            'cara': cara or '',
+            'codigo': d.id_tratamiento.codigo,
+            'fecha': fecha_ficha,
+            # Conformidad: tilde si está confirmado
+            'conformidad': '✓' if d.conformidad_paciente else '',
+            'importe': f"{float(importe):.2f}",
+        })
+
+    return {
+        'hoy': hoy,
+        'obra_social': paciente_os.id_obra_social.nombre_os if paciente_os.id_obra_social else '',
+        'paciente': f"{paciente.apellido_paciente}, {paciente.nombre_paciente}",
+        'edad': str(calcular_edad(paciente.fecha_nacimiento, hoy)) if paciente.fecha_nacimiento else '',
+        'credencial': str(paciente_os.credencial_paciente) if paciente_os.credencial_paciente else '',
+        'titular': paciente_os.titular or '',
+        'parentesco': getattr(paciente_os.id_parentesco, 'tipo_parentesco', ''),
+        'fecha_nacimiento': paciente.fecha_nacimiento.strftime("%d/%m/%Y") if paciente.fecha_nacimiento else '_ _ / _ _ / _ _ _ _',
+        'domicilio': paciente.domicilio or '',
+        'localidad': paciente.localidad or '',
+        'telefono': paciente.telefono or '',
+        'filas': filas,
+        'total': f"{total_importe:.2f}",
+        'observaciones': str(ficha.observaciones or ''),
+    }
+
+
+DIENTES_ADULTOS = set(range(11, 19)) | set(range(21, 29)) | set(range(31, 39)) | set(range(41, 49))
+DIENTES_NINOS = set(range(51, 56)) | set(range(61, 66)) | set(range(71, 76)) | set(range(81, 86))
+
+PATOLOGIAS = [
+    ('Alergias', 'alergias'),
+    ('Embarazada o sospecha', 'embarazo_sospecha'),
+    ('Hipotensión', 'hipotension'),
+    ('Problemas tiroides', 'problemas_tiroides'),
+    ('VIH', 'vih'),
+    ('Anemias', 'anemia'),
+    ('Fiebre Reumática', 'fiebre_reumatica'),
+    ('Jaquecas', 'jaquecas'),
+    ('Problemas respiratorios', 'problemas_respiratorios'),
+    ('Portador de prótesis', 'portador_protesis'),
+    ('Artritis', 'artritis'),
+    ('Glaucoma', 'glaucoma'),
+    ('Lesiones de cabeza', 'lesiones_cabeza'),
+    ('Sinusitis', 'sinusitis'),
+    ('Problema periodontal', 'problema_periodontal'),
+    ('Asma', 'asma'),
+    ('Hemorragias', 'hemorragias'),
+    ('Problemas hepáticos', 'problemas_hepaticos'),
+    ('Tuberculosis', 'tuberculosis'),
+    ('Ortodoncia', 'ortodoncia'),
+    ('Desnutrición', 'desnutricion'),
+    ('Hepatitis', 'hepatitis'),
+    ('Problemas mentales', 'problemas_mentales'),
+    ('Tumores', 'tumores'),
+    ('Mala oclusión', 'mala_oclusion'),
+    ('Diabetes', 'diabetes'),
+    ('Herpes', 'herpes'),
+    ('Problemas Cardíacos', 'problemas_cardiacos'),
+    ('Úlceras', 'ulceras'),
+    ('Lesión en mucosa', 'lesion_mucosa'),
+    ('Epilepsia', 'epilepsia'),
+    ('Hipertensión', 'hipertension'),
+    ('Problemas renales', 'problemas_renales'),
+    ('Venéreas', 'venereas'),
+    ('Toma medicación', 'toma_medicacion'),
+]
+
+
+def datos_odontograma(ficha):
+    """Caras tratadas y extracciones por diente, más la ficha patológica"""
+    caras = {}
+    extracciones = set()
+    usa_adulta = usa_nino = False
+
+    for detalle in _detalles(ficha):
+        if not detalle.id_diente:
+            continue
+        num_diente = detalle.id_diente.id_diente
+        usa_adulta = usa_adulta or num_diente in DIENTES_ADULTOS
+        usa_nino = usa_nino or num_diente in DIENTES_NINOS
+
+        # Detectar extracciones
+        nombre_tratamiento = detalle.id_tratamiento.nombre_tratamiento.lower()
+        if 'extrac' in nombre_tratamiento or 'extracción' in nombre_tratamiento:
+            extracciones.add(num_diente)
+
+        caras.setdefault(num_diente, set())
+        if detalle.id_cara:
+            caras[num_diente].add(detalle.id_cara)
+
+    ficha_patologica = ficha.id_ficha_patologica
+    patologia = None
+    if ficha_patologica:
+        patologia = {
+            'marcadas': [
+                campo for _, campo in PATOLOGIAS
+                if getattr(ficha_patologica, campo) == 1 or getattr(ficha_patologica, campo) is True
+            ],
+            'otra': str(ficha_patologica.otra)[:50] if ficha_patologica.otra else '',
+        }
+
+    return {
+        'caras': {num: sorted(c) for num, c in sorted(caras.items())},
+        'extracciones': sorted(extracciones),
+        'usa_adulta': usa_adulta,
+        'usa_nino': usa_nino,
+        'patologia': patologia,
+    }
+
+
+# ============================================
+# FORMULARIOS FIJOS (Form XObjects)
+# ============================================
+
+@lru_cache(maxsize=1)
+def _logo():
+    """Logo leído una vez por proceso (None si no está el archivo)"""
+    try:
+        return ImageReader(str(LOGO))
+    except Exception:
+        return None
+
+
+def _usar_fondo(pdf, nombre, dibujar):
+    """Dibuja el formulario fijo `nombre` la primera vez y luego solo lo referencia"""
+    if not pdf.hasForm(nombre):
+        pdf.beginForm(nombre)
+        dibujar(pdf)
+        pdf.endForm()
+    pdf.doForm(nombre)
+
+
+# Posiciones verticales del formulario de prestaciones
+Y_ENCABEZADO = ALTO - 1.5*cm
+Y_PACIENTE = Y_ENCABEZADO - 3.8*cm
+Y_DATOS = Y_PACIENTE - 1.3*cm
+Y_ODONTOLOGO = Y_DATOS - 1.8*cm
+Y_TABLA = Y_ODONTOLOGO - 1.5*cm
+ALTO_FILA = 0.6*cm
+FILAS_VISIBLES = 10
+Y_TOTAL = Y_TABLA - ALTO_FILA * (FILAS_VISIBLES + 1)
+Y_OBSERVACIONES = Y_TOTAL - 1.2*cm
+
+# Columnas de la tabla de tratamientos
+X_DIENTE = 1*cm
+X_CARA = 2.5*cm
+X_CODIGO = 4.5*cm
+X_FECHA = 7.5*cm
+X_CONFORMIDAD = 11*cm
+X_IMPORTE = 23*cm
+ANCHO_TABLA = ANCHO - 2*cm
+
+
+def _lineas_columnas(pdf, y):
+    for x in (X_CARA, X_CODIGO, X_FECHA, X_CONFORMIDAD, X_IMPORTE):
+        pdf.line(x, y - ALTO_FILA, x, y)
+
+
+def _fondo_ficha(pdf):
+    # ---------- Encabezado con logo y título ----------
+    y_pos = Y_ENCABEZADO
+    logo = _logo()
+    if logo is not None:
+        pdf.drawImage(
+            logo, 1*cm, y_pos - 2.5*cm,
+            width=2.5*cm, height=2.5*cm, preserveAspectRatio=True
+        )
+
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(4*cm, y_pos - 0.5*cm, "REGISTRO DE")
+    pdf.drawString(4*cm, y_pos - 1*cm, "PRESTACIONES")
+
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(4*cm, y_pos - 1.5*cm, "ASOCIACIÓN ODONTOLÓGICA")
+    pdf.drawString(4*cm, y_pos - 1.9*cm, "SALTEÑA")
+
+    pdf.setFont("Helvetica", 7)
+    pdf.drawString(4*cm, y_pos - 2.4*cm, "ESPAÑA 1175 - TEL. 0387 431-1116 - 4400 SALTA")
+
+    # ---------- Recuadros superiores (Entidad y Obra Social) ----------
+    pdf.setStrokeColor(colors.black)
+    pdf.setLineWidth(1)
+    pdf.rect(13*cm, y_pos - 2.5*cm, 6.5*cm, 2.5*cm, stroke=1, fill=0)
+
+    pdf.setFont("Helvetica", 7)
+    pdf.drawString(13.2*cm, y_pos - 0.5*cm, "ENTIDAD")
+    pdf.drawString(13.2*cm, y_pos - 0.8*cm, "PRIMARIA:")
+
+    pdf.setFont("Helvetica-Bold", 18)
+    pdf.drawString(14.5*cm, y_pos - 1.5*cm, "A.O.S.")
+
+    pdf.setFont("Helvetica", 7)
+    pdf.drawString(13.2*cm, y_pos - 2*cm, "CÓDIGO")
+
+    pdf.rect(19.5*cm, y_pos - 2.5*cm, 9.5*cm, 2.5*cm, stroke=1, fill=0)
+
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawString(22*cm, y_pos - 0.7*cm, "OBRA SOCIAL")
+
+    pdf.setFont("Helvetica", 7)
+    pdf.drawString(19.7*cm, y_pos - 1.8*cm, "Nº")
+    pdf.drawString(21.5*cm, y_pos - 1.8*cm, "CÓDIGO")
+
+    pdf.rect(20.2*cm, y_pos - 2*cm, 1*cm, 0.4*cm, stroke=1, fill=0)
+    pdf.rect(22.5*cm, y_pos - 2*cm, 6*cm, 0.4*cm, stroke=1, fill=0)
+
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawString(19.5*cm, y_pos - 3*cm, "FECHA:")
+
+    # ---------- Datos del paciente ----------
+    y_pos = Y_PACIENTE
+    pdf.setStrokeColor(colors.black)
+    pdf.setLineWidth(1.5)
+    pdf.rect(1*cm, y_pos - 1*cm, ANCHO - 2*cm, 1*cm, stroke=1, fill=0)
+
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawString(1.2*cm, y_pos - 0.6*cm, "PACIENTE:")
+
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(15*cm, y_pos - 0.55*cm, "Edad:")
+    pdf.rect(16*cm, y_pos - 0.65*cm, 1*cm, 0.4*cm, stroke=1, fill=0)
+    pdf.drawString(18*cm, y_pos - 0.55*cm, "Credencial:")
+    pdf.rect(20*cm, y_pos - 0.65*cm, 5*cm, 0.4*cm, stroke=1, fill=0)
+
+    # ---------- Datos del odontólogo ----------
+    y_pos = Y_ODONTOLOGO
+    pdf.setStrokeColor(colors.black)
+    pdf.setLineWidth(1.5)
+    pdf.rect(1*cm, y_pos - 1.3*cm, ANCHO - 2*cm, 1.3*cm, stroke=1, fill=0)
+
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawString(1.2*cm, y_pos - 0.7*cm, "ODONTÓLOGO:")
+
+    pdf.setFont("Helvetica", 9)
+    pdf.drawCentredString(10*cm, y_pos - 0.5*cm, "GISELA ALEJANDRA FLORES")
+    pdf.setFont("Helvetica", 8)
+    pdf.drawCentredString(10*cm, y_pos - 0.8*cm, "ODONTÓLOGA")
+    pdf.drawCentredString(10*cm, y_pos - 1.1*cm, "M.P. 1802")
+
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(22*cm, y_pos - 0.5*cm, "Matrícula")
+    pdf.drawString(22*cm, y_pos - 0.8*cm, "Profesional:")
+    pdf.rect(24.5*cm, y_pos - 0.9*cm, 3.5*cm, 0.7*cm, stroke=1, fill=0)
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawCentredString(26.2*cm, y_pos - 0.6*cm, "1802")
+
+    # ---------- Tabla de tratamientos (encabezado y grilla) ----------
+    y_pos = Y_TABLA
+    pdf.setStrokeColor(colors.black)
+    pdf.setLineWidth(1)
+
+    pdf.setFillColor(colors.lightgrey)
+    pdf.rect(X_DIENTE, y_pos - ALTO_FILA, ANCHO_TABLA, ALTO_FILA, stroke=1, fill=1)
+
+    pdf.setFillColor(colors.black)
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawCentredString(X_DIENTE + 0.75*cm, y_pos - 0.4*cm, "DIENTE Nº")
+    pdf.drawCentredString(X_CARA + 1*cm, y_pos - 0.4*cm, "CARA")
+    pdf.drawCentredString(X_CODIGO + 1.5*cm, y_pos - 0.4*cm, "CÓDIGO")
+    pdf.drawCentredString(X_FECHA + 1.75*cm, y_pos - 0.4*cm, "Fecha Realización")
+    pdf.drawCentredString(X_CONFORMIDAD + 6*cm, y_pos - 0.4*cm, "CONFORMIDAD PACIENTE")
+    pdf.drawCentredString(X_IMPORTE + 3*cm, y_pos - 0.4*cm, "IMPORTE")
+    _lineas_columnas(pdf, y_pos)
+
+    for _ in range(FILAS_VISIBLES):
+        y_pos -= ALTO_FILA
+        pdf.rect(X_DIENTE, y_pos - ALTO_FILA, ANCHO_TABLA, ALTO_FILA, stroke=1, fill=0)
+        _lineas_columnas(pdf, y_pos)
+
+    y_pos = Y_TOTAL
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawRightString(X_CONFORMIDAD + 11.5*cm, y_pos - 0.4*cm, "TOTAL")
+    pdf.rect(X_DIENTE, y_pos - ALTO_FILA, ANCHO_TABLA, ALTO_FILA, stroke=1, fill=0)
+    pdf.line(X_IMPORTE, y_pos - ALTO_FILA, X_IMPORTE, y_pos)
+
+    # ---------- Observaciones ----------
+    y_pos = Y_OBSERVACIONES
+    pdf.setStrokeColor(colors.black)
+    pdf.setLineWidth(1)
+    pdf.rect(1*cm, y_pos - 2.5*cm, 18*cm, 2.5*cm, stroke=1, fill=0)
+
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawString(1.2*cm, y_pos - 0.4*cm, "OBSERVACIONES:")
+
+    pdf.setFont("Helvetica", 8)
+    y_obs = y_pos - 0.9*cm
+    for _ in range(4):
+        pdf.drawString(1.2*cm, y_obs, "_" * 110)
+        y_obs -= 0.5*cm
+
+    # ---------- Cantidad de RX y firma ----------
+    pdf.rect(19.5*cm, y_pos - 2.5*cm, 3*cm, 2.5*cm, stroke=1, fill=0)
+    pdf.setFont("Helvetica", 8)
+    pdf.drawString(19.7*cm, y_pos - 0.6*cm, "Cantidad de RX")
+    pdf.drawString(19.7*cm, y_pos - 0.9*cm, "Adjuntas")
+    pdf.rect(20*cm, y_pos - 1.7*cm, 2*cm, 0.8*cm, stroke=1, fill=0)
+
+    pdf.rect(22.5*cm, y_pos - 2.5*cm, 6.5*cm, 2.5*cm, stroke=1, fill=0)
+    pdf.setFont("Helvetica", 8)
+    pdf.drawCentredString(25.7*cm, y_pos - 0.5*cm, "GISELA ALEJANDRA FLORES")
+    pdf.setFont("Helvetica", 7)
+    pdf.drawCentredString(25.7*cm, y_pos - 0.8*cm, "ODONTÓLOGA")
+    pdf.drawCentredString(25.7*cm, y_pos - 1.1*cm, "M.P. 1802")
+    pdf.setFont("Helvetica-Bold", 7)
+    pdf.drawCentredString(25.7*cm, y_pos - 2.2*cm, "SELLO Y FIRMA DEL PROFESIONAL")
+
+
+# ============================================
+# FICHA MÉDICA (formulario de prestaciones)
+# ============================================
+
+def dibujar_ficha(pdf, datos):
+    """Dibuja una página del formulario con los datos de `datos_ficha`"""
+    _usar_fondo(pdf, 'fondo_ficha', _fondo_ficha)
+    pdf.setFillColor(colors.black)
+
+    # Obra social y fecha
+    y_pos = Y_ENCABEZADO
+    pdf.setFont("Helvetica", 10)
+    pdf.drawString(20*cm, y_pos - 1.2*cm, datos['obra_social'])
+
+    hoy = datos['hoy']
+    pdf.drawString(21.5*cm, y_pos - 3*cm, f"Día {hoy.day:02d}")
+    pdf.drawString(24*cm, y_pos - 3*cm, f"Mes {hoy.month:02d}")
+    pdf.drawString(26.5*cm, y_pos - 3*cm, f"Año 20{hoy.year % 100:02d}")
+
+    # Paciente
+    y_pos = Y_PACIENTE
+    pdf.setFont("Helvetica", 10)
+    pdf.drawString(3.5*cm, y_pos - 0.6*cm, datos['paciente'])
+    pdf.setFont("Helvetica", 9)
+    pdf.drawCentredString(16.5*cm, y_pos - 0.60*cm, datos['edad'])
+    pdf.drawString(20.2*cm, y_pos - 0.60*cm, datos['credencial'])
+
+    # Datos adicionales (fuera del recuadro)
+    y_pos = Y_DATOS
+    pdf.drawString(1.2*cm, y_pos, f"Titular: {datos['titular']}")
+    pdf.drawString(11*cm, y_pos, f"Parentesco: {datos['parentesco']}")
+    pdf.drawString(20*cm, y_pos, f"Fecha de nacimiento: {datos['fecha_nacimiento']}")
+
+    y_pos -= 0.5*cm
+    pdf.drawString(1.2*cm, y_pos, f"Domicilio: {datos['domicilio'] or '_' * 50}")
+    pdf.drawString(15*cm, y_pos, f"Localidad: {datos['localidad'] or '_' * 30}")
+
+    y_pos -= 0.5*cm
+    pdf.drawString(1.2*cm, y_pos, f"Lugar de trabajo del Titular: {'_' * 55}")
+    pdf.drawString(21*cm, y_pos, f"Tel: {datos['telefono'] or '_' * 15}")
+
+    # Filas de tratamientos (máximo 10 filas visibles)
+    pdf.setFont("Helvetica", 9)
+    y_pos = Y_TABLA - ALTO_FILA
+    for fila in datos['filas'][:FILAS_VISIBLES]:
+        pdf.drawCentredString(X_DIENTE + 0.75*cm, y_pos - 0.4*cm, fila['diente'])
+        pdf.drawCentredString(X_CARA + 1*cm, y_pos - 0.4*cm, fila['cara'])
+        pdf.drawCentredString(X_CODIGO + 1.5*cm, y_pos - 0.4*cm, fila['codigo'])
+        pdf.drawCentredString(X_FECHA + 1.75*cm, y_pos - 0.4*cm, fila['fecha'])
+        pdf.drawCentredString(X_CONFORMIDAD + 6*cm, y_pos - 0.4*cm, fila['conformidad'])
+        pdf.drawRightString(X_IMPORTE + 5.5*cm, y_pos - 0.4*cm, f"${fila['importe']}")
+        y_pos -= ALTO_FILA
+
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawRightString(X_IMPORTE + 5.5*cm, Y_TOTAL - 0.4*cm, f"${datos['total']}")
+
+    # Observaciones sobre las líneas del formulario
+    texto_obs = datos['observaciones']
+    if texto_obs:
+        pdf.setFont("Helvetica", 8)
+        y_obs = Y_OBSERVACIONES - 0.9*cm
+        max_chars = 80
+        for i in range(0, min(len(texto_obs), 320), max_chars):
+            pdf.drawString(1.2*cm, y_obs, texto_obs[i:i+max_chars])
+            y_obs -= 0.5*cm
+            if y_obs < Y_OBSERVACIONES - 2.3*cm:
+                break
+
+
+# ============================================
+# ODONTOGRAMA
+# ============================================
+
+# Layout de dientes: (números, x de inicio, y, es dentadura de niño)
+MARGEN_IZQ = 2*cm
+MARGEN_SUP = ALTO - 2*cm
+DIENTE = 1.2*cm
+SEPARACION = 0.3*cm
+
+Y_FILA1 = MARGEN_SUP - 1.5*cm   # adultos superiores
+Y_FILA3 = Y_FILA1 - 2*cm        # adultos inferiores
+Y_FILA5 = Y_FILA3 - 3*cm        # niños superiores
+Y_FILA7 = Y_FILA5 - 2*cm        # niños inferiores
+
+X_ADULTO_IZQ = MARGEN_IZQ + 1*cm
+X_DERECHA = ANCHO/2 + 0.5*cm
+X_NINO_IZQ = MARGEN_IZQ + 4*cm + 1.5*cm
+
+FILAS_DIENTES = [
+    (list(range(18, 10, -1)), X_ADULTO_IZQ, Y_FILA1, False),
+    (list(range(21, 29)), X_DERECHA, Y_FILA1, False),
+    (list(range(48, 40, -1)), X_ADULTO_IZQ, Y_FILA3, False),
+    (list(range(31, 39)), X_DERECHA, Y_FILA3, False),
+    (list(range(55, 50, -1)), X_NINO_IZQ, Y_FILA5, True),
+    (list(range(61, 66)), X_DERECHA, Y_FILA5, True),
+    (list(range(85, 80, -1)), X_NINO_IZQ, Y_FILA7, True),
+    (list(range(71, 76)), X_DERECHA, Y_FILA7, True),
+]
+
+# Caras según los ids de la BD: oclusal(1), vestibular(3), mesial(5), distal(6), palatino(7)
+CARA_OCLUSAL, CARA_VESTIBULAR, CARA_MESIAL, CARA_DISTAL, CARA_PALATINO = 1, 3, 5, 6, 7
+
+# Ficha patológica (7 filas x 5 columnas + "Otras especificar")
+X_PATOLOGIA = 2*cm
+Y_PATOLOGIA = ALTO - 14*cm
+CELDA_ANCHO = 5*cm
+CELDA_ALTO = 0.6*cm
+
+
+def _fondo_odontograma(pdf):
+    # Cuadro alrededor del odontograma
+    y = Y_FILA3 - 6*cm
+    pdf.setLineWidth(1)
+    pdf.setStrokeColor(colors.black)
+    pdf.rect(MARGEN_IZQ - 0.5*cm, y, ANCHO - 3.5*cm, (Y_FILA1 - y) + DIENTE + 1.5*cm, stroke=1, fill=0)
+
+    # Línea divisoria entre adultos y niños
+    linea_y = Y_FILA3 - (Y_FILA3 - Y_FILA5) / 2
+    pdf.line(MARGEN_IZQ, linea_y, ANCHO - MARGEN_IZQ - 1*cm, linea_y)
+
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(MARGEN_IZQ, Y_FILA3 - 1*cm, "Derecha")
+    pdf.drawString(ANCHO - MARGEN_IZQ - 2*cm, Y_FILA3 - 1*cm, "Izquierda")
+
+    # Números de los dientes
+    pdf.setFont("Helvetica", 7)
+    pdf.setFillColor(colors.black)
+    for numeros, x, y, _ in FILAS_DIENTES:
+        for num in numeros:
+            pdf.drawCentredString(x + DIENTE/2, y - 0.4*cm, str(num))
+            x += DIENTE + SEPARACION
+
+
+def _fondo_patologia(pdf):
+    cuadro_y = Y_PATOLOGIA - 7*CELDA_ALTO - 0.8*cm   # cubre 7 filas + "otras"
+    pdf.setLineWidth(1)
+    pdf.setStrokeColor(colors.black)
+    pdf.rect(
+        X_PATOLOGIA - 0.3*cm, cuadro_y,
+        CELDA_ANCHO * 5 + 0.6*cm, 8 * CELDA_ALTO + 1.1*cm,
+        stroke=1, fill=0
+    )
+
+    pdf.setFont("Helvetica", 7)
+    pdf.setFillColor(colors.black)
+    for i, (nombre, _) in enumerate(PATOLOGIAS):
+        x, y = _celda_patologia(i)
+        pdf.rect(x, y, CELDA_ANCHO, CELDA_ALTO, stroke=1, fill=0)
+        pdf.drawString(x + 0.1*cm, y + 0.2*cm, nombre)
+
+    y_otras = Y_PATOLOGIA - 7 * CELDA_ALTO
+    pdf.rect(X_PATOLOGIA, y_otras, CELDA_ANCHO * 5, CELDA_ALTO, stroke=1, fill=0)
+    pdf.drawString(X_PATOLOGIA + 0.1*cm, y_otras + 0.2*cm, "Otras especificar:")
+
+
+def _celda_patologia(i):
+    return X_PATOLOGIA + (i % 5) * CELDA_ANCHO, Y_PATOLOGIA - (i // 5) * CELDA_ALTO
+
+
+def _trapecio(pdf, puntos, color):
+    path = pdf.beginPath()
+    path.moveTo(*puntos[0])
+    for punto in puntos[1:]:
+        path.lineTo(*punto)
+    path.close()
+    pdf.setFillColor(color)
+    pdf.setStrokeColor(colors.black)
+    pdf.drawPath(path, stroke=1, fill=1)
+
+
+def dibujar_diente(pdf, x, y, size, caras_tratadas):
+    """Diente con sus 5 caras (cuadrado central + 4 trapecios); las tratadas en azul"""
+    m = size * 0.25
+    color = lambda cara: colors.blue if cara in caras_tratadas else colors.white
+
+    # Cuadrado central (oclusal)
+    pdf.setFillColor(color(CARA_OCLUSAL))
+    pdf.setStrokeColor(colors.black)
+    pdf.rect(x + m, y + m, size - 2*m, size - 2*m, stroke=1, fill=1 if CARA_OCLUSAL in caras_tratadas else 0)
+
+    # Vestibular (superior), palatino (inferior), mesial (izquierda), distal (derecha)
+    _trapecio(pdf, [(x + m, y + size - m), (x + size - m, y + size - m), (x + size, y + size), (x, y + size)],
+              color(CARA_VESTIBULAR))
+    _trapecio(pdf, [(x + m, y + m), (x + size - m, y + m), (x + size, y), (x, y)],
+              color(CARA_PALATINO))
+    _trapecio(pdf, [(x + m, y + m), (x + m, y + size - m), (x, y + size), (x, y)],
+              color(CARA_MESIAL))
+    _trapecio(pdf, [(x + size - m, y + m), (x + size - m, y + size - m), (x + size, y + size), (x + size, y)],
+              color(CARA_DISTAL))
+
+
+def dibujar_diente_extraido(pdf, x, y, size):
+    """X roja sobre el contorno del diente"""
+    pdf.setStrokeColor(colors.red)
+    pdf.setLineWidth(2)
+    pdf.line(x, y, x + size, y + size)
+    pdf.line(x, y + size, x + size, y)
+
+    pdf.setStrokeColor(colors.black)
+    pdf.setLineWidth(1)
+    pdf.rect(x, y, size, size, stroke=1, fill=0)
+
+
+def dibujar_diente_no_usado(pdf, x, y, size):
+    """Línea roja horizontal para las dentaduras que no se usan"""
+    pdf.setStrokeColor(colors.red)
+    pdf.setLineWidth(1.5)
+    pdf.line(x, y + size/2, x + size, y + size/2)
+
+    pdf.setStrokeColor(colors.black)
+    pdf.setLineWidth(1)
+    pdf.rect(x, y, size, size, stroke=1, fill=0)
+
+
+def dibujar_odontograma(pdf, datos):
+    """Dibuja una página con el odontograma y la ficha patológica de `datos_odontograma`"""
+    _usar_fondo(pdf, 'fondo_odontograma', _fondo_odontograma)
+
+    caras = {num: set(c) for num, c in datos['caras'].items()}
+    extracciones = set(datos['extracciones'])
+    for numeros, x, y, es_nino in FILAS_DIENTES:
+        no_usado = not (datos['usa_nino'] if es_nino else datos['usa_adulta'])
+        for num in numeros:
+            if no_usado:
+                dibujar_diente_no_usado(pdf, x, y, DIENTE)
+            elif num in extracciones:
+                dibujar_diente_extraido(pdf, x, y, DIENTE)
+            else:
+                dibujar_diente(pdf, x, y, DIENTE, caras.get(num, set()))
+            x += DIENTE + SEPARACION
+
+    patologia = datos['patologia']
+    pdf.setFillColor(colors.black)
+    if patologia is None:
+        pdf.setFont("Helvetica", 7)
+        pdf.drawString(2*cm, ALTO - 10*cm + 0.5*cm, "No hay ficha patológica registrada")
+        return
+
+    _usar_fondo(pdf, 'fondo_patologia', _fondo_patologia)
+    marcadas = set(patologia['marcadas'])
+    pdf.setFont("Helvetica-Bold", 9)
+    for i, (_, campo) in enumerate(PATOLOGIAS):
+        if campo in marcadas:
+            x, y = _celda_patologia(i)
+            pdf.drawString(x + CELDA_ANCHO - 0.5*cm, y + 0.2*cm, "✓")
+    if patologia['otra']:
+        pdf.setFont("Helvetica", 7)
+        pdf.drawString(X_PATOLOGIA + 3*cm, Y_PATOLOGIA - 7 * CELDA_ALTO + 0.2*cm, patologia['otra'])
+
+
+DIBUJAR = {'ficha': dibujar_ficha, 'odontograma': dibujar_odontograma}
+
+
+def renderizar(tipo, paginas, salida=None):
+    """
+    PDF con una página por cada dict de datos en `paginas`. Si no se pasa
+    `salida` (archivo abierto en binario) devuelve los bytes.
+    """
+    buffer = salida or BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=landscape(A4))
+    dibujar = DIBUJAR[tipo]
+    for datos in paginas:
+        dibujar(pdf, datos)
+        pdf.showPage()
+    pdf.save()
+    if salida is None:
+        return buffer.getvalue()
+
+
+def renderizar_por_separado(tipo, paginas):
+    """Un PDF (bytes) por cada dict de datos; es la tarea de los procesos de exportación"""
+    return [renderizar(tipo, [datos]) for datos in paginas]
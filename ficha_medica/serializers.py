@@ -1,8 +1,15 @@
 from rest_framework import serializers
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from caja import abierta as caja_actual
+from caja import pagos
+from home import catalogos
+from pacientes import deudas
 from home.models import (
     Pacientes, FichasMedicas, PacientesXOs, FichasPatologicas,
     Dientes, CarasDiente, Parentesco, Tratamientos, 
-    DetallesConsulta, CoberturasOs, CobrosConsulta, EstadosPago, 
+    DetallesConsulta, CobrosConsulta, EstadosPago, 
     Cajas, MetodosCobro, ObrasSociales
 )
 
@@ -54,7 +61,28 @@ class ObraSocialSerializer(serializers.ModelSerializer):
         model = ObrasSociales
         fields = ['id_obra_social', 'nombre_os']
 
+class CatalogoRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField que valida contra un catálogo en memoria de
+    home.catalogos (por nombre, p. ej. 'tratamientos') sin consultar la base.
+    """
+
+    def __init__(self, catalogo, **kwargs):
+        self.catalogo = catalogo
+        super().__init__(queryset=getattr(catalogos, catalogo).modelo.objects.all(), **kwargs)
+
+    def to_internal_value(self, data):
+        catalogo = getattr(catalogos, self.catalogo)
+        try:
+            return catalogo.obtener(data)
+        except catalogo.modelo.DoesNotExist:
+            self.fail('does_not_exist', pk_value=data)
+
+
 class DetalleConsultaSerializer(serializers.ModelSerializer):
+    id_tratamiento = CatalogoRelatedField('tratamientos')
+    id_diente = CatalogoRelatedField('dientes')
+
     class Meta:
         model = DetallesConsulta
         fields = [
@@ -83,72 +111,58 @@ class FichaMedicaCreateSerializer(serializers.ModelSerializer):
         ]
     
     def create(self, validated_data):
-        from django.utils import timezone
-        
+        """
+        Crea la ficha, su cobro y los detalles en una sola transacción.
+        Los importes salen de la matriz de coberturas (home.catalogos) y el
+        cobro se inserta una sola vez con los totales ya calculados.
+        """
         detalles_data = validated_data.pop('detalles_consulta')
         id_caja = validated_data.pop('id_caja')
         
         if 'fecha_creacion' not in validated_data:
             validated_data['fecha_creacion'] = timezone.now().date()
         
-        ficha_medica = FichasMedicas.objects.create(**validated_data)
-        print(f"✓ Ficha médica creada: {ficha_medica.id_ficha_medica}")
-        
-        monto_total = 0
-        obra_social = ficha_medica.id_paciente_os.id_obra_social
-        monto_obra_social = 0
-        
-        try:
-            estado_pendiente = EstadosPago.objects.get(nombre_estado='pendiente')
-        except EstadosPago.DoesNotExist:
-            estado_pendiente = EstadosPago.objects.create(nombre_estado='pendiente')
-        
-        caja = Cajas.objects.get(id_caja=id_caja)
+        with transaction.atomic():
+            # La caja de la ficha es casi siempre la abierta, que ya está en memoria
+            caja = caja_actual.actual()
+            if caja is None or caja.id_caja != id_caja:
+                caja = Cajas.objects.get(id_caja=id_caja)
 
-        print(f"✓ Estado pendiente obtenido: {estado_pendiente.id_estado_pago}")
-        
-        cobro = CobrosConsulta.objects.create(
-            monto_total=0,
-            monto_obra_social=0,
-            monto_paciente=0,
-            monto_pagado=0.00,
-            id_estado_pago=estado_pendiente,
-            id_caja=caja,
-            id_metodo_cobro=1,
-        )
-        
-        print(f"✓ Cobro creado: ID={cobro.id_cobro_consulta}")
-        
-        for i, detalle_data in enumerate(detalles_data):
-            print(f"→ Creando detalle {i+1}...")
-            
-            detalle = DetallesConsulta.objects.create(
-                id_ficha_medica=ficha_medica,
-                id_cobro_consulta=cobro,
-                **detalle_data
-            )
-            
-            print(f"✓ Detalle creado: {detalle.id_detalle}")
-            
-            tratamiento = detalle.id_tratamiento
-            monto_total += tratamiento.importe
-            
             try:
-                cobertura = CoberturasOs.objects.get(
-                    id_obra_social=obra_social,
-                    id_tratamiento=tratamiento
+                estado_pendiente = catalogos.estados_pago.obtener_por_nombre('pendiente')
+            except EstadosPago.DoesNotExist:
+                estado_pendiente = EstadosPago.objects.create(nombre_estado='pendiente')
+
+            ficha_medica = FichasMedicas.objects.create(**validated_data)
+
+            # Importes y coberturas desde la matriz de precios en memoria
+            id_obra_social = ficha_medica.id_paciente_os.id_obra_social_id
+            monto_total = 0
+            monto_obra_social = 0
+            for detalle_data in detalles_data:
+                tratamiento = detalle_data['id_tratamiento']
+                monto_total += tratamiento.importe
+                monto_obra_social += catalogos.coberturas.precio(id_obra_social, tratamiento).importe_obra_social
+
+            cobro = CobrosConsulta.objects.create(
+                monto_total=monto_total,
+                monto_obra_social=monto_obra_social,
+                monto_paciente=monto_total - monto_obra_social,
+                monto_pagado=0.00,
+                id_estado_pago=estado_pendiente,
+                id_caja=caja,
+                id_metodo_cobro=1,
+            )
+            deudas.registrar_cobro(cobro, ficha_medica)
+
+            DetallesConsulta.objects.bulk_create([
+                DetallesConsulta(
+                    id_ficha_medica=ficha_medica,
+                    id_cobro_consulta=cobro,
+                    **detalle_data
                 )
-                monto_obra_social += (tratamiento.importe * cobertura.porcentaje / 100)
-            except CoberturasOs.DoesNotExist:
-                pass
-        
-        monto_paciente = monto_total - monto_obra_social
-        cobro.monto_total = monto_total
-        cobro.monto_obra_social = monto_obra_social
-        cobro.monto_paciente = monto_paciente
-        cobro.save()
-        
-        print(f"✓ Cobro actualizado con montos")
+                for detalle_data in detalles_data
+            ])
         
         return ficha_medica
 
@@ -165,11 +179,11 @@ class FichaMedicaDetailSerializer(serializers.ModelSerializer):
         detalles = DetallesConsulta.objects.filter(
         id_ficha_medica=obj, 
         eliminado__isnull=True
-        )
+        ).select_related('id_tratamiento', 'id_diente')
         data = []
         for d in detalles:
             try:
-                cara = CarasDiente.objects.get(id_cara=d.id_cara)
+                cara = catalogos.caras.obtener(d.id_cara)
                 cara_abreviatura = cara.abreviatura
             except CarasDiente.DoesNotExist:
                 cara_abreviatura = "?"
@@ -221,20 +235,26 @@ class CobroDetailSerializer(serializers.ModelSerializer):
     def get_metodo_cobro(self, obj):
         if obj.id_metodo_cobro:
             try:
-                metodo = MetodosCobro.objects.get(id_metodo_cobro=obj.id_metodo_cobro)
+                metodo = catalogos.metodos_cobro.obtener(obj.id_metodo_cobro)
                 return metodo.tipo_cobro
             except MetodosCobro.DoesNotExist:
                 return None
         return None
     
+    def _pagado(self, obj):
+        # Sumas por pagador anotadas en la consulta (preparar_queryset) o
+        # dejadas por caja.pagos.registrar; si no, se suman los pagos
+        if not hasattr(obj, 'pagado_paciente'):
+            pagado = pagos.pagado_por(obj)
+            obj.pagado_paciente = pagado[pagos.PACIENTE]
+            obj.pagado_obra_social = pagado[pagos.OBRA_SOCIAL]
+        return obj
+
     def get_monto_pagado_paciente(self, obj):
-        # Primero se paga lo que debe el paciente
-        return min(float(obj.monto_pagado), float(obj.monto_paciente))
+        return float(self._pagado(obj).pagado_paciente)
     
     def get_monto_pagado_obra_social(self, obj):
-        # Lo que sobra después de pagar al paciente va a obra social
-        pagado_paciente = min(float(obj.monto_pagado), float(obj.monto_paciente))
-        return max(0, float(obj.monto_pagado) - pagado_paciente)
+        return float(self._pagado(obj).pagado_obra_social)
 
 class FichaMedicaConCobroSerializer(serializers.ModelSerializer):
     # Datos del paciente
@@ -288,22 +308,52 @@ class FichaMedicaConCobroSerializer(serializers.ModelSerializer):
             'cobro'
         ]
     
+    @staticmethod
+    def preparar_queryset(queryset):
+        """
+        Carga en bloque todo lo que usa el serializer: paciente, obra social,
+        parentesco y empleado por JOIN, y los detalles con su tratamiento,
+        diente y cobro (con lo pagado por el paciente y por la obra social)
+        en una única consulta adicional para toda la página.
+        """
+        detalles = FichaMedicaConCobroSerializer._detalles_con_pagos(DetallesConsulta.objects)
+
+        return queryset.select_related(
+            'id_paciente_os__id_paciente',
+            'id_paciente_os__id_obra_social',
+            'id_paciente_os__id_parentesco',
+            'id_empleado__user'
+        ).prefetch_related(
+            Prefetch('detallesconsulta_set', queryset=detalles, to_attr='detalles_prefetch')
+        )
+
+    @staticmethod
+    def _detalles_con_pagos(detalles):
+        return detalles.select_related(
+            'id_tratamiento',
+            'id_diente',
+            'id_cobro_consulta__id_estado_pago'
+        ).annotate(
+            pagado_paciente=pagos.pagado_subconsulta(pagos.PACIENTE),
+            pagado_obra_social=pagos.pagado_subconsulta(pagos.OBRA_SOCIAL)
+        ).order_by('id_detalle')
+
+    def _detalles_ficha(self, obj):
+        """Todos los detalles de la ficha (incluidos eliminados), ordenados por id"""
+        if hasattr(obj, 'detalles_prefetch'):
+            return obj.detalles_prefetch
+        return list(self._detalles_con_pagos(DetallesConsulta.objects.filter(id_ficha_medica=obj)))
+
     def get_empleado_nombre(self, obj):
         user = obj.id_empleado.user
         return f"{user.first_name} {user.last_name}"
     
     def get_detalles(self, obj):
-        detalles = DetallesConsulta.objects.filter(
-        id_ficha_medica=obj, 
-        eliminado__isnull=True
-        )
+        caras = catalogos.caras.por_id
         data = []
-        for d in detalles:
-            try:
-                cara = CarasDiente.objects.get(id_cara=d.id_cara)
-                cara_abreviatura = cara.abreviatura
-            except CarasDiente.DoesNotExist:
-                cara_abreviatura = "?"
+        for d in self._detalles_ficha(obj):
+            if d.eliminado is not None:
+                continue
             
             data.append({
                 'id_detalle': d.id_detalle,
@@ -312,19 +362,25 @@ class FichaMedicaConCobroSerializer(serializers.ModelSerializer):
                 'importe': str(d.id_tratamiento.importe),
                 'id_diente': d.id_diente.id_diente if d.id_diente else None,
                 'diente': d.id_diente.nombre_diente if d.id_diente else None,
-                'cara': cara_abreviatura,
+                'cara': caras[d.id_cara].abreviatura if d.id_cara in caras else "?",
                 'conformidad_paciente': getattr(d, 'conformidad_paciente', False)
             })
         return data
     
     def get_cobro(self, obj):
         try:
-            detalle = DetallesConsulta.objects.filter(
-                id_ficha_medica=obj
-            ).first()
+            detalles = self._detalles_ficha(obj)
+            detalle = detalles[0] if detalles else None
             
             if detalle and detalle.id_cobro_consulta:
-                return CobroDetailSerializer(detalle.id_cobro_consulta).data
+                cobro = detalle.id_cobro_consulta
+                cobro.pagado_paciente = detalle.pagado_paciente
+                cobro.pagado_obra_social = detalle.pagado_obra_social
+                # Una sola instancia para toda la lista: construir los campos
+                # del serializer en cada ficha cuesta más que la serialización
+                if 'cobro_serializer' not in self.context:
+                    self.context['cobro_serializer'] = CobroDetailSerializer(context=self.context)
+                return self.context['cobro_serializer'].to_representation(cobro)
             return None
         except:
             return None
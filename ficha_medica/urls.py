@@ -10,10 +10,12 @@ from .views import (
     CajaEstadoView,
     ObrasSocialesPacienteView,
     TratamientosConCoberturaView,
+    MatrizCoberturasView,
     FichaMedicaDetailView,
     FichaMedicaPDFView,
     OdontogramaView,
     OdontogramaPdfView,
+    ExportarFichasPDFView,
     MetodosCobroView,
     EstadosPagoView,
     UpdateConformidadView,
@@ -51,6 +53,9 @@ urlpatterns = [
     # NUEVO: Descargar PDF del odontograma
     path('ficha/<int:id_ficha>/odontograma/pdf/', OdontogramaPdfView.as_view(), name='odontograma-pdf'),
     
+    # Exportar en lote los PDF de un período (ZIP o PDF único)
+    path('fichas/exportar/', ExportarFichasPDFView.as_view(), name='fichas-exportar'),
+    
     
     # ============================================
     # FICHAS PATOLÓGICAS
@@ -77,6 +82,9 @@ urlpatterns = [
     
     # Tratamientos con cobertura según obra social
     path('tratamientos/', TratamientosConCoberturaView.as_view(), name='tratamientos-cobertura'),
+
+    # Matriz completa de precios (obra social x tratamiento) en una sola respuesta
+    path('tratamientos/matriz/', MatrizCoberturasView.as_view(), name='tratamientos-matriz'),
     
     # Métodos de cobro disponibles
     path('metodos-cobro/', MetodosCobroView.as_view(), name='metodos-cobro'),
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class HomeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'home'
+
+    def ready(self):
+        from . import catalogos, estadisticas
+        catalogos.conectar_senales()
+        estadisticas.conectar_senales()
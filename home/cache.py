@@ -0,0 +1,250 @@
+"""
+Caché en dos niveles: un LRU en la memoria de cada proceso delante de una
+caché compartida entre procesos, que es otra entrada de CACHES (locmem en
+pruebas; archivos, base de datos o Redis en producción):
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'home.cache.CacheEscalonada',
+            'OPTIONS': {
+                'COMPARTIDA': 'compartida',       # alias de la caché compartida
+                'MAX_LOCAL': 1000,                # entradas del LRU de cada proceso
+                'SEGUNDOS_LOCAL': 5,              # cuánto se confía en una copia local
+                'SOLO_COMPARTIDA': ['recovery_'], # prefijos que nunca se copian
+            },
+        },
+        'compartida': {...},
+    }
+
+Las lecturas se resuelven en el LRU y, si la clave no está o venció su
+copia, en la compartida (y se copia al LRU). Escrituras y borrados van a la
+compartida y actualizan el LRU del propio proceso; los demás procesos ven
+el cambio cuando vence su copia, a lo sumo SEGUNDOS_LOCAL después. Las
+claves que no toleran esa demora (códigos de recuperación, versiones de
+los catálogos, la caja abierta) se declaran en SOLO_COMPARTIDA y se leen
+siempre de la compartida.
+
+get_or_set evita la estampida cuando vence una clave cara de calcular:
+dentro del proceso calcula un solo hilo por clave, y entre procesos solo
+el que obtiene el candado (un add en la compartida; con archivos es solo
+una aproximación, ver abajo); los demás esperan a que el valor se publique.
+
+add es atómico entre procesos en Redis, locmem y base de datos, pero no en
+archivos. incr y decr solo lo son en Redis y locmem: en base de datos y en
+archivos son un get seguido de un set (el de BaseCache), que además deja
+la clave con el timeout por defecto de la compartida. Los límites que deben
+respetarse entre procesos se cuentan con add (ver login/views.py).
+"""
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_FALTA = object()
+
+# Espera máxima por el valor que calcula otro proceso antes de calcularlo igual
+ESPERA_MAX = 10
+INTERVALO_ESPERA = 0.05
+
+# LRU por proceso (las instancias de BaseCache son una por hilo), por LOCATION
+_locales = {}
+_lock_locales = threading.Lock()
+# Candados por clave para get_or_set, repartidos en un número fijo
+_candados = [threading.Lock() for _ in range(64)]
+
+
+class _LRU:
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self.datos = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, clave):
+        with self.lock:
+            entrada = self.datos.get(clave)
+            if entrada is None:
+                return _FALTA
+            valor, vence = entrada
+            if vence <= time.monotonic():
+                del self.datos[clave]
+                return _FALTA
+            self.datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, segundos):
+        with self.lock:
+            self.datos[clave] = (valor, time.monotonic() + segundos)
+            self.datos.move_to_end(clave)
+            while len(self.datos) > self.maximo:
+                self.datos.popitem(last=False)
+
+    def delete(self, clave):
+        with self.lock:
+            self.datos.pop(clave, None)
+
+    def clear(self):
+        with self.lock:
+            self.datos.clear()
+
+
+class CacheEscalonada(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        opciones = params.get('OPTIONS', {})
+        self.alias_compartida = opciones.get('COMPARTIDA', 'compartida')
+        self.segundos_local = opciones.get('SEGUNDOS_LOCAL', 5)
+        self.solo_compartida = tuple(opciones.get('SOLO_COMPARTIDA', ()))
+        with _lock_locales:
+            self._local = _locales.setdefault(location, _LRU(opciones.get('MAX_LOCAL', 1000)))
+
+    @property
+    def compartida(self):
+        return caches[self.alias_compartida]
+
+    def _clave_local(self, key, version):
+        if key.startswith(self.solo_compartida):
+            return None
+        return self.make_and_validate_key(key, version=version)
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        # Se pasa tal cual a la compartida, que lo convierte a su formato; el
+        # timeout por defecto es el de la compartida
+        return self.compartida.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _segundos_local(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return self.segundos_local if timeout is None else min(self.segundos_local, timeout)
+
+    def _copiar(self, key, value, timeout, version):
+        clave = self._clave_local(key, version)
+        if clave is not None:
+            segundos = self._segundos_local(timeout)
+            if segundos > 0:
+                self._local.set(clave, value, segundos)
+            else:
+                self._local.delete(clave)
+
+    def _olvidar(self, key, version):
+        clave = self._clave_local(key, version)
+        if clave is not None:
+            self._local.delete(clave)
+
+    def get(self, key, default=None, version=None):
+        clave = self._clave_local(key, version)
+        if clave is not None:
+            valor = self._local.get(clave)
+            if valor is not _FALTA:
+                return valor
+        valor = self.compartida.get(key, _FALTA, version=version)
+        if valor is _FALTA:
+            return default
+        if clave is not None:
+            self._local.set(clave, valor, self.segundos_local)
+        return valor
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.compartida.set(key, value, timeout=self.get_backend_timeout(timeout), version=version)
+        self._copiar(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        agregado = self.compartida.add(key, value, timeout=self.get_backend_timeout(timeout), version=version)
+        if agregado:
+            self._copiar(key, value, timeout, version)
+        return agregado
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.compartida.touch(key, timeout=self.get_backend_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._olvidar(key, version)
+        return self.compartida.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _FALTA, version=version) is not _FALTA
+
+    def incr(self, key, delta=1, version=None):
+        # Los contadores se resuelven siempre en la compartida (atómico solo
+        # si lo es ahí, ver arriba)
+        self._olvidar(key, version)
+        return self.compartida.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._olvidar(key, version)
+        return self.compartida.decr(key, delta, version=version)
+
+    def get_many(self, keys, version=None):
+        encontrados, faltantes = {}, []
+        for key in keys:
+            clave = self._clave_local(key, version)
+            valor = self._local.get(clave) if clave is not None else _FALTA
+            if valor is _FALTA:
+                faltantes.append(key)
+            else:
+                encontrados[key] = valor
+        if faltantes:
+            leidos = self.compartida.get_many(faltantes, version=version)
+            for key, valor in leidos.items():
+                clave = self._clave_local(key, version)
+                if clave is not None:
+                    self._local.set(clave, valor, self.segundos_local)
+            encontrados.update(leidos)
+        return encontrados
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        fallidas = self.compartida.set_many(data, timeout=self.get_backend_timeout(timeout), version=version)
+        for key, value in data.items():
+            if key not in fallidas:
+                self._copiar(key, value, timeout, version)
+        return fallidas
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._olvidar(key, version)
+        self.compartida.delete_many(keys, version=version)
+
+    def clear(self):
+        self._local.clear()
+        self.compartida.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        valor = self.get(key, _FALTA, version=version)
+        if valor is not _FALTA:
+            return valor
+        if not callable(default):
+            return super().get_or_set(key, default, timeout=timeout, version=version)
+
+        clave = self.make_and_validate_key(key, version=version)
+        with _candados[zlib.crc32(clave.encode()) % len(_candados)]:
+            # Otro hilo pudo haberlo calculado mientras se esperaba el candado
+            valor = self.get(key, _FALTA, version=version)
+            if valor is not _FALTA:
+                return valor
+
+            candado = f'{key}:calculando'
+            if self.compartida.add(candado, 1, timeout=ESPERA_MAX, version=version):
+                try:
+                    valor = default()
+                    self.set(key, valor, timeout=timeout, version=version)
+                finally:
+                    self.compartida.delete(candado, version=version)
+                return valor
+
+            # Lo está calculando otro proceso: esperar a que lo publique
+            limite = time.monotonic() + ESPERA_MAX
+            while time.monotonic() < limite:
+                time.sleep(INTERVALO_ESPERA)
+                valor = self.compartida.get(key, _FALTA, version=version)
+                if valor is not _FALTA:
+                    self._copiar(key, valor, timeout, version)
+                    return valor
+                if not self.compartida.has_key(candado, version=version):
+                    break
+
+            valor = default()
+            self.set(key, valor, timeout=timeout, version=version)
+            return valor
+
+    def close(self, **kwargs):
+        self.compartida.close(**kwargs)
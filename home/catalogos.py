@@ -0,0 +1,270 @@
+"""
+Caché en memoria de los catálogos odontológicos.
+
+Las tablas chicas que casi no cambian (caras, dientes, métodos de cobro,
+estados de pago y de turno, parentescos y tratamientos) se cargan una sola
+vez por proceso en diccionarios de solo lectura, indexados por id y por
+nombre (sin distinguir mayúsculas). La matriz de precios por obra social y
+tratamiento (coberturas) se mantiene de la misma forma.
+
+Cada catálogo tiene una versión guardada en el caché de Django. Cuando se
+guarda o elimina un registro (panel de control, admin o cualquier .save())
+se publica una versión nueva al confirmar la transacción; los demás
+procesos la comparan como máximo cada CATALOGOS_VERIFICACION_SEGUNDOS y
+recargan solo los catálogos que cambiaron.
+
+Las instancias devueltas se comparten entre requests: no deben modificarse.
+Los cambios hechos con queryset.update() no disparan señales; en ese caso
+hay que llamar a invalidar(Modelo).
+"""
+import threading
+import time
+import uuid
+from collections import namedtuple
+from types import MappingProxyType
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from home.models import (
+    CarasDiente, CoberturasOs, Dientes, EstadosPago, EstadosTurno, MetodosCobro,
+    Parentesco, Tratamientos
+)
+
+_VACIO = MappingProxyType({})
+
+
+def _normalizar(nombre):
+    return str(nombre).strip().lower()
+
+
+def _es_activo(obj):
+    return getattr(obj, 'eliminado', None) in (None, 0)
+
+
+class Catalogo:
+    def __init__(self, modelo, campo_nombre):
+        self.modelo = modelo
+        self.campo_nombre = campo_nombre
+        self.clave = f'catalogos:version:{modelo._meta.db_table}'
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._version = None
+        self._por_id = _VACIO
+        self._por_nombre = _VACIO
+        self._todos = ()
+        # Cambia en cada carga (la usan los cachés derivados, como la matriz de coberturas)
+        self._generacion = 0
+
+    def _asegurar(self):
+        _verificar_versiones()
+        if self._cargado:
+            return
+        with self._lock:
+            if self._cargado:
+                return
+            # La versión se lee antes que los datos: si alguien publica una
+            # nueva mientras cargamos, la próxima verificación recarga
+            version = cache.get(self.clave)
+            todos = tuple(self.modelo.objects.order_by(self.modelo._meta.pk.attname))
+            por_nombre = {}
+            for obj in todos:
+                nombre = getattr(obj, self.campo_nombre)
+                if nombre is not None:
+                    por_nombre.setdefault(_normalizar(nombre), obj)
+            self._todos = todos
+            self._por_id = MappingProxyType({obj.pk: obj for obj in todos})
+            self._por_nombre = MappingProxyType(por_nombre)
+            self._version = version
+            self._generacion += 1
+            self._cargado = True
+
+    def descartar(self):
+        """Fuerza la recarga en el próximo acceso (solo en este proceso)"""
+        with self._lock:
+            self._cargado = False
+
+    def _comparar(self, version):
+        if self._cargado and version != self._version:
+            self.descartar()
+
+    @property
+    def por_id(self):
+        self._asegurar()
+        return self._por_id
+
+    @property
+    def por_nombre(self):
+        self._asegurar()
+        return self._por_nombre
+
+    def todos(self):
+        """Todos los registros, ordenados por id"""
+        self._asegurar()
+        return self._todos
+
+    def activos(self):
+        """Registros no eliminados (eliminado nulo o 0), ordenados por id"""
+        return tuple(obj for obj in self.todos() if _es_activo(obj))
+
+    def get(self, pk, default=None):
+        try:
+            return self.obtener(pk)
+        except self.modelo.DoesNotExist:
+            return default
+
+    def obtener(self, pk):
+        """Como Modelo.objects.get(pk=pk): lanza Modelo.DoesNotExist si no está"""
+        try:
+            return self.por_id[int(pk)]
+        except (KeyError, TypeError, ValueError):
+            raise self.modelo.DoesNotExist(
+                f'{self.modelo.__name__} con id {pk!r} no existe'
+            ) from None
+
+    def obtener_por_nombre(self, nombre):
+        try:
+            return self.por_nombre[_normalizar(nombre)]
+        except KeyError:
+            raise self.modelo.DoesNotExist(
+                f'{self.modelo.__name__} "{nombre}" no existe'
+            ) from None
+
+
+caras = Catalogo(CarasDiente, 'nombre_cara')
+dientes = Catalogo(Dientes, 'nombre_diente')
+metodos_cobro = Catalogo(MetodosCobro, 'tipo_cobro')
+estados_pago = Catalogo(EstadosPago, 'nombre_estado')
+estados_turno = Catalogo(EstadosTurno, 'estado_turno')
+parentescos = Catalogo(Parentesco, 'tipo_parentesco')
+tratamientos = Catalogo(Tratamientos, 'nombre_tratamiento')
+
+
+Precio = namedtuple('Precio', 'porcentaje importe_obra_social importe_paciente')
+
+
+class MatrizCoberturas:
+    """
+    Precios por obra social y tratamiento: {id_obra_social: {id_tratamiento:
+    Precio}}, calculados con los importes del catálogo de tratamientos y los
+    porcentajes de coberturas_os. Solo se guardan los pares con cobertura;
+    sin cobertura el paciente paga el importe completo.
+
+    Se recarga (en el próximo acceso) cuando cambia una cobertura o cuando se
+    recarga el catálogo de tratamientos, p. ej. al editar un importe.
+    """
+
+    def __init__(self, tratamientos):
+        self.modelo = CoberturasOs
+        self.tratamientos = tratamientos
+        self.clave = f'catalogos:version:{CoberturasOs._meta.db_table}'
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._version = None
+        self._generacion_tratamientos = None
+        self._matriz = _VACIO
+
+    def _vigente(self):
+        return self._cargado and self._generacion_tratamientos == self.tratamientos._generacion
+
+    def _asegurar(self):
+        por_id = self.tratamientos.por_id
+        if self._vigente():
+            return
+        with self._lock:
+            if self._vigente():
+                return
+            generacion = self.tratamientos._generacion
+            version = cache.get(self.clave)
+            matriz = {}
+            coberturas = CoberturasOs.objects.values_list('id_obra_social', 'id_tratamiento', 'porcentaje')
+            for id_obra_social, id_tratamiento, porcentaje in coberturas:
+                tratamiento = por_id.get(id_tratamiento)
+                if tratamiento is None:
+                    continue
+                importe_obra_social = tratamiento.importe * porcentaje / 100
+                matriz.setdefault(id_obra_social, {})[id_tratamiento] = Precio(
+                    porcentaje, importe_obra_social, tratamiento.importe - importe_obra_social
+                )
+            self._matriz = MappingProxyType({k: MappingProxyType(v) for k, v in matriz.items()})
+            self._version = version
+            self._generacion_tratamientos = generacion
+            self._cargado = True
+
+    def descartar(self):
+        """Fuerza la recarga en el próximo acceso (solo en este proceso)"""
+        with self._lock:
+            self._cargado = False
+
+    def _comparar(self, version):
+        if self._cargado and version != self._version:
+            self.descartar()
+
+    @property
+    def matriz(self):
+        self._asegurar()
+        return self._matriz
+
+    def de_obra_social(self, id_obra_social):
+        """{id_tratamiento: Precio} de los tratamientos que cubre la obra social"""
+        try:
+            return self.matriz.get(int(id_obra_social), _VACIO)
+        except (TypeError, ValueError):
+            return _VACIO
+
+    def precio(self, id_obra_social, tratamiento):
+        """Precio del tratamiento (instancia del catálogo) para la obra social"""
+        precio = self.de_obra_social(id_obra_social).get(tratamiento.pk)
+        if precio is None:
+            return Precio(0, 0, tratamiento.importe)
+        return precio
+
+
+coberturas = MatrizCoberturas(tratamientos)
+
+
+CATALOGOS = (
+    caras, dientes, metodos_cobro, estados_pago, estados_turno, parentescos, tratamientos,
+    coberturas
+)
+_POR_MODELO = {c.modelo: c for c in CATALOGOS}
+
+_ultima_verificacion = 0.0
+_lock_verificacion = threading.Lock()
+
+
+def _verificar_versiones():
+    """Compara las versiones locales con las publicadas (una lectura de caché para todos)"""
+    global _ultima_verificacion
+    intervalo = getattr(settings, 'CATALOGOS_VERIFICACION_SEGUNDOS', 5)
+    ahora = time.monotonic()
+    if ahora - _ultima_verificacion < intervalo:
+        return
+    with _lock_verificacion:
+        if ahora - _ultima_verificacion < intervalo:
+            return
+        _ultima_verificacion = ahora
+    versiones = cache.get_many([c.clave for c in CATALOGOS])
+    for catalogo in CATALOGOS:
+        catalogo._comparar(versiones.get(catalogo.clave))
+
+
+def invalidar(modelo):
+    """Publica una versión nueva del catálogo al confirmar la transacción actual"""
+    catalogo = _POR_MODELO[modelo]
+
+    def publicar():
+        cache.set(catalogo.clave, uuid.uuid4().hex, None)
+        catalogo.descartar()
+
+    transaction.on_commit(publicar)
+
+
+def _al_modificar(sender, **kwargs):
+    invalidar(sender)
+
+
+def conectar_senales():
+    for modelo in _POR_MODELO:
+        post_save.connect(_al_modificar, sender=modelo, dispatch_uid=f'catalogos_save_{modelo.__name__}')
+        post_delete.connect(_al_modificar, sender=modelo, dispatch_uid=f'catalogos_delete_{modelo.__name__}')
@@ -0,0 +1,417 @@
+"""
+Estadísticas diarias precalculadas para los dashboards.
+
+Los días cerrados (anteriores a hoy) se leen de EstadisticasDiarias; el día
+de hoy siempre se calcula sobre los datos crudos, con consultas limitadas
+a ese día. Un día se consolida la primera vez que se necesita (o con el
+comando consolidar_estadisticas) y queda marcado en DiasConsolidados.
+
+Métricas (clave -> cantidad, monto):
+    turnos               id de estado de turno -> turnos del día
+    cobros               "metodo:pagador" -> pagos y monto (por fecha de pago, ver caja/pagos.py)
+    tratamientos         id de tratamiento -> detalles de consulta (por fecha de la ficha)
+    pacientes_atendidos  id de paciente_os -> fichas del día
+    pacientes_nuevos     '' -> pacientes cuya primera ficha es de ese día
+    egresos              '' -> egresos y monto
+
+Si se modifica un registro de un día ya consolidado (un cobro eliminado,
+un turno reprogramado, una ficha eliminada) las señales recalculan, al
+confirmar la transacción, solo las métricas que dependen de los campos que
+cambiaron (SEGUIDOS), en el día anterior y en el nuevo. Los cambios hechos
+con queryset.update() no disparan señales: hay que recalcular con el comando.
+
+Los totales de los días cerrados de cada rango se guardan en la caché,
+con una versión que cambia cada vez que se recalcula un día; el primer día
+con datos también queda en la caché.
+"""
+import uuid
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+from caja.models import Pagos
+from home.models import (
+    CobrosConsulta, DetallesConsulta, DiasConsolidados, Egresos,
+    EstadisticasDiarias, FichasMedicas, Turnos
+)
+
+ACTIVO = Q(eliminado__isnull=True) | Q(eliminado=0)
+CLAVE_VERSION = 'estadisticas:version'
+CLAVE_PRIMER_DIA = 'estadisticas:primer_dia'
+# Los totales cacheados incluyen la fecha de ayer en la clave: no sirven más de un día
+SEGUNDOS_TOTALES = 24 * 3600
+PAGO_ACTIVO = Q(id_cobro_consulta__eliminado__isnull=True) | Q(id_cobro_consulta__eliminado=0)
+CERO = Decimal('0.00')
+
+
+def _rango_aware(desde, hasta):
+    """[desde 00:00, hasta + 1 día 00:00) en la zona horaria del proyecto"""
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+def _turnos(desde, hasta):
+    filas = (
+        Turnos.objects.filter(ACTIVO, fecha_turno__gte=desde, fecha_turno__lte=hasta)
+        .values('fecha_turno', 'id_turno_estado')
+        .annotate(cantidad=Count('pk'))
+        .order_by()
+    )
+    for f in filas:
+        yield f['fecha_turno'], str(f['id_turno_estado']), f['cantidad'], CERO
+
+
+def _cobros(desde, hasta):
+    # Pagos y no monto_pagado de los cobros: un pago no cambia después de
+    # registrado, y un cobro pagado en cuotas suma cada cuota en su día
+    inicio, fin = _rango_aware(desde, hasta)
+    filas = (
+        Pagos.objects.filter(PAGO_ACTIVO, fecha_hora_pago__gte=inicio, fecha_hora_pago__lt=fin)
+        .annotate(fecha=TruncDate('fecha_hora_pago'))
+        .values('fecha', 'id_metodo_cobro', 'pagador')
+        .annotate(cantidad=Count('pk'), monto=Sum('monto'))
+        .order_by()
+    )
+    for f in filas:
+        clave = f"{f['id_metodo_cobro']}:{f['pagador']}"
+        yield f['fecha'], clave, f['cantidad'], f['monto'] or CERO
+
+
+def _tratamientos(desde, hasta):
+    filas = (
+        DetallesConsulta.objects.filter(
+            ACTIVO,
+            id_ficha_medica__fecha_creacion__gte=desde,
+            id_ficha_medica__fecha_creacion__lte=hasta
+        )
+        .values('id_ficha_medica__fecha_creacion', 'id_tratamiento')
+        .annotate(cantidad=Count('pk'))
+        .order_by()
+    )
+    for f in filas:
+        yield f['id_ficha_medica__fecha_creacion'], str(f['id_tratamiento']), f['cantidad'], CERO
+
+
+def _pacientes_atendidos(desde, hasta):
+    filas = (
+        FichasMedicas.objects.filter(ACTIVO, fecha_creacion__gte=desde, fecha_creacion__lte=hasta)
+        .values('fecha_creacion', 'id_paciente_os')
+        .annotate(cantidad=Count('pk'))
+        .order_by()
+    )
+    for f in filas:
+        yield f['fecha_creacion'], str(f['id_paciente_os']), f['cantidad'], CERO
+
+
+def _pacientes_nuevos(desde, hasta):
+    # Primera ficha de los pacientes atendidos en el rango, agrupando todas
+    # sus fichas (un NOT EXISTS correlacionado por ficha crece cuadrático)
+    atendidos = (
+        FichasMedicas.objects
+        .filter(ACTIVO, fecha_creacion__gte=desde, fecha_creacion__lte=hasta)
+        .values('id_paciente_os__id_paciente')
+    )
+    primeras = (
+        FichasMedicas.objects
+        .filter(ACTIVO, id_paciente_os__id_paciente__in=atendidos)
+        .values('id_paciente_os__id_paciente')
+        .annotate(primera=Min('fecha_creacion'))
+        .filter(primera__gte=desde, primera__lte=hasta)
+        .order_by()
+        .values_list('primera', flat=True)
+    )
+    por_dia = defaultdict(int)
+    for fecha in primeras:
+        por_dia[fecha] += 1
+    for fecha, cantidad in por_dia.items():
+        yield fecha, '', cantidad, CERO
+
+
+def _egresos(desde, hasta):
+    inicio, fin = _rango_aware(desde, hasta)
+    filas = (
+        Egresos.objects.filter(fecha_hora_egreso__gte=inicio, fecha_hora_egreso__lt=fin)
+        .annotate(fecha=TruncDate('fecha_hora_egreso'))
+        .values('fecha')
+        .annotate(cantidad=Count('pk'), monto=Sum('monto_egreso'))
+        .order_by()
+    )
+    for f in filas:
+        yield f['fecha'], '', f['cantidad'], f['monto'] or CERO
+
+
+METRICAS = {
+    'turnos': _turnos,
+    'cobros': _cobros,
+    'tratamientos': _tratamientos,
+    'pacientes_atendidos': _pacientes_atendidos,
+    'pacientes_nuevos': _pacientes_nuevos,
+    'egresos': _egresos,
+}
+
+
+def _como_fecha(valor):
+    """Fecha local de un date/datetime (los datetime de la base vienen en UTC)"""
+    if isinstance(valor, datetime):
+        return timezone.localdate(valor) if timezone.is_aware(valor) else valor.date()
+    return valor
+
+
+def _version():
+    return cache.get_or_set(CLAVE_VERSION, lambda: uuid.uuid4().hex, None)
+
+
+def recalcular(desde, hasta, metricas=None):
+    """
+    Recalcula las métricas de los días [desde, hasta] y los marca
+    consolidados. Con `metricas` (nombres) recalcula solo esas, en días que
+    ya estaban consolidados.
+    """
+    filas = [
+        EstadisticasDiarias(
+            fecha=_como_fecha(fecha), metrica=metrica, clave=clave,
+            cantidad=cantidad, monto=monto
+        )
+        for metrica, calcular in METRICAS.items() if metricas is None or metrica in metricas
+        for fecha, clave, cantidad, monto in calcular(desde, hasta)
+    ]
+    anteriores = EstadisticasDiarias.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+    if metricas is not None:
+        anteriores = anteriores.filter(metrica__in=metricas)
+    with transaction.atomic():
+        anteriores.delete()
+        EstadisticasDiarias.objects.bulk_create(filas, batch_size=2000, ignore_conflicts=True)
+        if metricas is None:
+            dias = [DiasConsolidados(fecha=desde + timedelta(days=i)) for i in range((hasta - desde).days + 1)]
+            DiasConsolidados.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+            DiasConsolidados.objects.bulk_create(dias, batch_size=2000, ignore_conflicts=True)
+        # Descarta los totales cacheados (y el primer día, si el rango es anterior)
+        transaction.on_commit(lambda: cache.set(CLAVE_VERSION, uuid.uuid4().hex, None))
+        primero = cache.get(CLAVE_PRIMER_DIA)
+        if primero and desde < primero:
+            transaction.on_commit(lambda: cache.delete(CLAVE_PRIMER_DIA))
+    return len(filas)
+
+
+def consolidar(desde, hasta):
+    """Calcula los días cerrados del rango que todavía no están consolidados"""
+    hasta = min(hasta, timezone.localdate() - timedelta(days=1))
+    if desde > hasta:
+        return
+    total = (hasta - desde).days + 1
+    hechos = set(
+        DiasConsolidados.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+        .values_list('fecha', flat=True)
+    )
+    if len(hechos) == total:
+        return
+    faltantes = [desde + timedelta(days=i) for i in range(total) if desde + timedelta(days=i) not in hechos]
+    recalcular(faltantes[0], faltantes[-1])
+
+
+def primer_dia(actualizar=False):
+    """
+    Fecha del dato más antiguo (para las métricas sin rango, como los
+    tratamientos más usados). Se calcula una vez y queda en la caché hasta
+    que se guarda o se recalcula un día anterior; las cargas masivas, que no
+    disparan señales, la piden con actualizar=True.
+    """
+    primero = None if actualizar else cache.get(CLAVE_PRIMER_DIA)
+    if primero:
+        return primero
+    fechas = [
+        modelo.objects.aggregate(minima=Min(campo))['minima']
+        for modelo, campo in CAMPOS_FECHA.items()
+    ]
+    fechas = [_como_fecha(f) for f in fechas if f]
+    if not fechas:
+        return timezone.localdate()
+    primero = min(fechas)
+    cache.set(CLAVE_PRIMER_DIA, primero, None)
+    return primero
+
+
+def totales(metrica, desde, hasta):
+    """
+    {clave: {'cantidad', 'monto'}} de la métrica en [desde, hasta]:
+    días cerrados desde el rollup y el día de hoy desde los datos crudos.
+    """
+    hoy = timezone.localdate()
+    resultado = defaultdict(lambda: {'cantidad': 0, 'monto': CERO})
+
+    if desde < hoy:
+        cerrado = min(hasta, hoy - timedelta(days=1))
+        clave_cache = f'estadisticas:{_version()}:{metrica}:{desde.isoformat()}:{cerrado.isoformat()}'
+        filas = cache.get(clave_cache)
+        if filas is None:
+            consolidar(desde, cerrado)
+            filas = list(
+                EstadisticasDiarias.objects
+                .filter(metrica=metrica, fecha__gte=desde, fecha__lte=cerrado)
+                .values('clave')
+                .annotate(cantidad_total=Sum('cantidad'), monto_total=Sum('monto'))
+                .order_by()
+                .values_list('clave', 'cantidad_total', 'monto_total')
+            )
+            cache.set(clave_cache, filas, SEGUNDOS_TOTALES)
+        for clave, cantidad, monto in filas:
+            resultado[clave]['cantidad'] += cantidad or 0
+            resultado[clave]['monto'] += monto or CERO
+
+    if desde <= hoy <= hasta:
+        for _, clave, cantidad, monto in METRICAS[metrica](hoy, hoy):
+            resultado[clave]['cantidad'] += cantidad
+            resultado[clave]['monto'] += monto
+
+    return dict(resultado)
+
+
+def suma(metrica, desde, hasta):
+    """Cantidad y monto totales de la métrica en el rango, sin separar por clave"""
+    valores = totales(metrica, desde, hasta).values()
+    return {
+        'cantidad': sum(v['cantidad'] for v in valores),
+        'monto': sum((v['monto'] for v in valores), CERO),
+    }
+
+
+# ---------- recálculo de días ya consolidados ----------
+
+CAMPOS_FECHA = {
+    Turnos: 'fecha_turno',
+    Pagos: 'fecha_hora_pago',
+    FichasMedicas: 'fecha_creacion',
+    Egresos: 'fecha_hora_egreso',
+}
+
+# modelo -> {campo: métricas que cambian si cambia}. Los pagos no están:
+# solo se insertan, y con la fecha del momento (ver caja/pagos.py)
+SEGUIDOS = {
+    Turnos: {
+        'fecha_turno': ('turnos',),
+        'id_turno_estado_id': ('turnos',),
+        'eliminado': ('turnos',),
+    },
+    CobrosConsulta: {
+        'eliminado': ('cobros',),
+    },
+    FichasMedicas: {
+        'fecha_creacion': ('tratamientos', 'pacientes_atendidos', 'pacientes_nuevos'),
+        'id_paciente_os_id': ('pacientes_atendidos', 'pacientes_nuevos'),
+        'eliminado': ('pacientes_atendidos', 'pacientes_nuevos'),
+    },
+    DetallesConsulta: {
+        'id_ficha_medica_id': ('tratamientos',),
+        'id_tratamiento_id': ('tratamientos',),
+        'eliminado': ('tratamientos',),
+    },
+    Egresos: {
+        'fecha_hora_egreso': ('egresos',),
+        'monto_egreso': ('egresos',),
+    },
+}
+
+
+def _fechas(sender, valores):
+    """Días en que cuenta el registro con esos valores de los campos seguidos"""
+    if sender is DetallesConsulta:
+        return set(
+            FichasMedicas.objects.filter(pk=valores['id_ficha_medica_id'])
+            .values_list('fecha_creacion', flat=True)
+        )
+    if sender is CobrosConsulta:
+        # Un cobro cuenta en los días en que se recibieron sus pagos
+        return set(
+            Pagos.objects.filter(id_cobro_consulta=valores['pk'])
+            .values_list('fecha_hora_pago', flat=True).distinct()
+        )
+    return {valores[CAMPOS_FECHA[sender]]}
+
+
+def _valores(sender, instance):
+    valores = {campo: getattr(instance, campo) for campo in SEGUIDOS[sender]}
+    valores['pk'] = instance.pk
+    return valores
+
+
+def _antes_de_guardar(sender, instance, update_fields=None, **kwargs):
+    # Valores guardados de los campos seguidos, para saber después qué
+    # cambió y en qué días contaba antes (p. ej. un turno reprogramado).
+    # Se leen solo al guardar y solo si el guardado puede tocarlos.
+    instance._estadisticas_antes = None
+    campos = SEGUIDOS[sender]
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not any(
+        sender._meta.get_field(campo).name in update_fields for campo in campos
+    ):
+        return
+    antes = sender.objects.filter(pk=instance.pk).values(*campos).first()
+    if antes is not None:
+        antes['pk'] = instance.pk
+    instance._estadisticas_antes = antes
+
+
+def _programar(fechas, metricas):
+    hoy = timezone.localdate()
+    primero = cache.get(CLAVE_PRIMER_DIA)
+    for fecha in {_como_fecha(f) for f in fechas if f}:
+        if primero and fecha < primero:
+            cache.delete(CLAVE_PRIMER_DIA)
+            primero = None
+        if fecha < hoy:
+            transaction.on_commit(
+                lambda fecha=fecha: _recalcular_si_consolidado(fecha, metricas)
+            )
+
+
+def _todas(sender):
+    return {m for metricas in SEGUIDOS[sender].values() for m in metricas}
+
+
+def _al_guardar(sender, instance, created=False, **kwargs):
+    antes = getattr(instance, '_estadisticas_antes', None)
+    instance._estadisticas_antes = None
+    ahora = _valores(sender, instance)
+    if created:
+        # Un cobro nuevo todavía no tiene pagos
+        if sender is not CobrosConsulta:
+            _programar(_fechas(sender, ahora), _todas(sender))
+        return
+    if antes is None:
+        return
+    cambiados = [campo for campo in SEGUIDOS[sender] if antes[campo] != ahora[campo]]
+    metricas = {m for campo in cambiados for m in SEGUIDOS[sender][campo]}
+    if not metricas:
+        return
+    if sender is CobrosConsulta or (
+        sender is DetallesConsulta and antes['id_ficha_medica_id'] == ahora['id_ficha_medica_id']
+    ):
+        # El día no depende de lo que cambió
+        fechas = _fechas(sender, ahora)
+    else:
+        fechas = _fechas(sender, antes) | _fechas(sender, ahora)
+    _programar(fechas, metricas)
+
+
+def _al_eliminar(sender, instance, **kwargs):
+    _programar(_fechas(sender, _valores(sender, instance)), _todas(sender))
+
+
+def _recalcular_si_consolidado(fecha, metricas):
+    if DiasConsolidados.objects.filter(fecha=fecha).exists():
+        recalcular(fecha, fecha, metricas)
+
+
+def conectar_senales():
+    for modelo in SEGUIDOS:
+        nombre = modelo.__name__
+        pre_save.connect(_antes_de_guardar, sender=modelo, dispatch_uid=f'estadisticas_pre_save_{nombre}')
+        post_save.connect(_al_guardar, sender=modelo, dispatch_uid=f'estadisticas_save_{nombre}')
+        post_delete.connect(_al_eliminar, sender=modelo, dispatch_uid=f'estadisticas_delete_{nombre}')
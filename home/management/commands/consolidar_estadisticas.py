@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from home import estadisticas
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor} (formato AAAA-MM-DD)') from None
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula las estadísticas diarias de los dashboards (turnos, cobros, '
+        'tratamientos, pacientes y egresos) para un rango de días cerrados. '
+        'Necesario después de cambios masivos hechos con update() o por SQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_fecha, help='Primer día (por defecto, el dato más antiguo)')
+        parser.add_argument('--hasta', type=_fecha, help='Último día (por defecto, ayer)')
+
+    def handle(self, *args, **options):
+        ayer = timezone.localdate() - timedelta(days=1)
+        desde = options['desde'] or estadisticas.primer_dia(actualizar=True)
+        hasta = min(options['hasta'] or ayer, ayer)
+        if desde > hasta:
+            raise CommandError('No hay días cerrados en el rango indicado')
+
+        filas = estadisticas.recalcular(desde, hasta)
+        dias = (hasta - desde).days + 1
+        self.stdout.write(self.style.SUCCESS(
+            f'{dias} días consolidados ({desde} a {hasta}), {filas} filas de estadísticas.'
+        ))
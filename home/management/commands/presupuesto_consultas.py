@@ -0,0 +1,424 @@
+import json
+import re
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.urls import URLResolver, get_resolver, resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+from caja import abierta
+from home import estadisticas, sintetico
+from home.models import (
+    DetallesConsulta, FichasMedicas, FichasPatologicas, MetodosCobro,
+    PacientesXOs, Turnos
+)
+from pacientes import busqueda, deudas
+from turnos import agenda
+
+PRESUPUESTO = Path(__file__).resolve().parents[2] / 'presupuesto_consultas.json'
+
+# Rutas de /api/ que no se pueden recorrer con la clínica sintética
+EXCLUIDAS = {
+    'api/auth/recuperar-contrasena/': 'envía un correo real',
+    'api/auth/validar-codigo/': 'necesita el código enviado por correo',
+    'api/auth/cambiar-contrasena/': 'misma vista que api/auth/cambiar/',
+}
+
+# (método, url, datos). Los {nombres} se reemplazan con los ids de la
+# clínica sintética (ver _ids) y la url sin reemplazar es la clave del
+# presupuesto. Las lecturas se miden varias veces después de una pasada
+# de calentamiento; las escrituras una sola vez y en este orden, que sigue
+# el recorrido de la recepción y termina cerrando y reabriendo la caja.
+LECTURAS = [
+    ('GET', '/api/home/', None),
+    ('GET', '/api/home/bienvenida/?user_id={usuario}', None),
+    ('GET', '/api/dashboard/stats/', None),
+    ('GET', '/api/citas/por-mes/', None),
+    ('GET', '/api/citas/filtradas/?periodo=mes', None),
+    ('GET', '/api/pacientes/por-edad/', None),
+    ('GET', '/api/tratamientos/populares/', None),
+    ('GET', '/api/movimientos/caja/?periodo=mes', None),
+    ('GET', '/api/pacientes/', None),
+    ('GET', '/api/pacientes/?search=gonz', None),
+    ('GET', '/api/pacientes/{paciente}/', None),
+    ('GET', '/api/pacientes/{paciente}/ficha-patologica/', None),
+    ('GET', '/api/pacientes/obras-sociales/disponibles/', None),
+    ('GET', '/api/pacientes/deudas/antiguedad/', None),
+    ('GET', '/api/pacientes/deudas/antiguedad/?id_paciente={paciente}', None),
+    ('GET', '/api/ficha_medica/', None),
+    ('GET', '/api/ficha_medica/?search=gonz', None),
+    ('GET', '/api/ficha_medica/paciente/{paciente}/', None),
+    ('GET', '/api/ficha_medica/paciente/{paciente}/obras-sociales/', None),
+    ('GET', '/api/ficha_medica/fichas/', None),
+    ('GET', '/api/ficha_medica/fichas/?id_paciente={paciente}', None),
+    ('GET', '/api/ficha_medica/ficha/{ficha}/', None),
+    ('GET', '/api/ficha_medica/ficha/{ficha}/pdf/', None),
+    ('GET', '/api/ficha_medica/ficha/{ficha}/odontograma/', None),
+    ('GET', '/api/ficha_medica/ficha/{ficha}/odontograma/pdf/', None),
+    ('GET', '/api/ficha_medica/fichas/exportar/?desde={hace_una_semana}&hasta={hoy}&formato=pdf', None),
+    ('GET', '/api/ficha_medica/patologia/?id_paciente_os={paciente_os}', None),
+    ('GET', '/api/ficha_medica/catalogos/', None),
+    ('GET', '/api/ficha_medica/pacientes-os/', None),
+    ('GET', '/api/ficha_medica/tratamientos/?id_obra_social={obra_social}', None),
+    ('GET', '/api/ficha_medica/tratamientos/matriz/', None),
+    ('GET', '/api/ficha_medica/metodos-cobro/', None),
+    ('GET', '/api/ficha_medica/estados-pago/', None),
+    ('GET', '/api/ficha_medica/caja/estado/', None),
+    ('GET', '/api/turnos/', None),
+    ('GET', '/api/turnos/{turno}/', None),
+    ('GET', '/api/turnos/estados/', None),
+    ('GET', '/api/turnos/horarios-disponibles/?fecha={dia_habil}', None),
+    ('GET', '/api/turnos/disponibilidad/?mes={mes}', None),
+    ('GET', '/api/turnos/proximos-libres/?cantidad=20', None),
+    ('GET', '/api/caja/', None),
+    ('GET', '/api/caja/dashboard/', None),
+    ('GET', '/api/caja/{caja}/', None),
+    ('GET', '/api/caja/metodos-cobro/', None),
+    ('GET', '/api/caja/empleados/', None),
+    ('GET', '/api/caja/exportar/?desde={hace_una_semana}&hasta={hoy}&formato=xlsx', None),
+    ('GET', '/api/caja/liquidaciones/', None),
+    ('GET', '/api/caja/liquidaciones/?periodo={mes_anterior}', None),
+    ('GET', '/api/panel-control/', None),
+    ('GET', '/api/panel-control/authuser/', None),
+    ('GET', '/api/panel-control/authuser/{usuario}/', None),
+    ('GET', '/api/panel-control/empleados/', None),
+    ('GET', '/api/panel-control/empleados/{empleado}/', None),
+    ('GET', '/api/panel-control/obras_sociales/', None),
+    ('GET', '/api/panel-control/obras_sociales/{obra_social}/', None),
+    ('GET', '/api/panel-control/metodos_cobro/', None),
+    ('GET', '/api/panel-control/metodos_cobro/{metodo_cobro}/', None),
+    ('GET', '/api/panel-control/tratamientos/', None),
+    ('GET', '/api/panel-control/tratamientos/{tratamiento}/', None),
+    ('GET', '/api/panel-control/coberturas_os/', None),
+    ('GET', '/api/panel-control/coberturas_os/{cobertura}/', None),
+]
+
+ESCRITURAS = [
+    ('POST', '/api/auth/', {'username': '{usuario_nombre}', 'password': 'presupuesto'}),
+    ('POST', '/api/auth/verify/', {'token': '{access}'}),
+    ('POST', '/api/auth/refresh/', {'refresh': '{refresh}'}),
+    ('POST', '/api/auth/cambiar/', {'contrasena_actual': 'presupuesto', 'contrasena_nueva': 'presupuesto2'}),
+    ('POST', '/api/auth/logout/', {}),
+    ('POST', '/api/pacientes/', {
+        'dni_paciente': 99999999, 'nombre_paciente': 'Nuevo', 'apellido_paciente': 'Paciente',
+        'fecha_nacimiento': '1990-05-10', 'localidad': 'Salta', 'telefono': '3874000000',
+    }),
+    ('PUT', '/api/pacientes/{paciente}/', {'telefono': '3874111111'}),
+    ('POST', '/api/pacientes/{paciente_sin_ficha}/ficha-patologica/', {'alergias': 1}),
+    ('PUT', '/api/pacientes/{paciente}/ficha-patologica/', {'diabetes': 1}),
+    ('POST', '/api/pacientes/{paciente_sin_ficha}/obras-sociales/', {
+        'id_obra_social': '{otra_obra_social}', 'id_parentesco': '{parentesco}', 'credencial_paciente': 123,
+    }),
+    ('DELETE', '/api/pacientes/{paciente_sin_ficha}/obras-sociales/{paciente_os_a_borrar}/', None),
+    ('DELETE', '/api/pacientes/{paciente_a_borrar}/', None),
+    ('POST', '/api/ficha_medica/patologia/', {'id_paciente_os': '{paciente_os_sin_ficha}', 'alergias': 1}),
+    ('PUT', '/api/ficha_medica/patologia/', {'id_ficha_patologica': '{ficha_patologica}', 'hipertension': 1}),
+    ('POST', '/api/ficha_medica/', {
+        'id_paciente_os': '{paciente_os}', 'id_empleado': '{empleado}',
+        'id_ficha_patologica': '{ficha_patologica}', 'id_caja': '{caja}',
+        'detalles_consulta': [
+            {'id_tratamiento': '{tratamiento}', 'id_diente': '{diente}', 'id_cara': '{cara}'},
+            {'id_tratamiento': '{otro_tratamiento}', 'id_diente': '{diente}', 'id_cara': '{cara}'},
+        ],
+    }),
+    ('PUT', '/api/ficha_medica/ficha/{ficha}/', {'observaciones': 'Control'}),
+    ('PATCH', '/api/ficha_medica/cobros/{cobro}/', {
+        'id_metodo_cobro': '{metodo_cobro}', 'monto_pagado_paciente': '100.00', 'monto_pagado_obra_social': '50.00',
+    }),
+    ('PATCH', '/api/ficha_medica/detalle/{detalle}/conformidad/', {'conformidad_paciente': 1}),
+    ('DELETE', '/api/ficha_medica/ficha/{ficha_a_borrar}/', None),
+    ('POST', '/api/turnos/', {
+        'id_paciente': '{paciente}', 'fecha_turno': '{libre_fecha}', 'hora_turno': '{libre_hora}',
+        'asunto': 'Control', 'id_turno_estado': '{estado_pendiente}',
+    }),
+    ('PUT', '/api/turnos/{turno}/', {'fecha_turno': '{otro_libre_fecha}', 'hora_turno': '{otro_libre_hora}'}),
+    ('PATCH', '/api/turnos/{turno}/estado/', {'id_turno_estado': '{estado_confirmado}'}),
+    ('PATCH', '/api/turnos/{turno_a_borrar}/estado/', {'id_turno_estado': '{estado_cancelado}'}),
+    ('DELETE', '/api/turnos/{turno_a_borrar}/', None),
+    ('POST', '/api/caja/{caja}/ingresos/', {'descripcion_ingreso': 'Cambio', 'monto_ingreso': '500.00'}),
+    ('POST', '/api/caja/{caja}/egresos/', {'descripcion_egreso': 'Insumos', 'monto_egreso': '200.00'}),
+    ('POST', '/api/caja/{caja}/cierre/', {'monto_cierre': '10000.00'}),
+    ('POST', '/api/caja/apertura/', {'id_empleado': '{empleado}', 'monto_apertura': '5000.00'}),
+    ('POST', '/api/panel-control/obras_sociales/', {'nombre_os': 'Obra social nueva'}),
+    ('PATCH', '/api/panel-control/obras_sociales/{obra_social}/', {'nombre_os': '{obra_social_nombre}'}),
+    ('POST', '/api/panel-control/tratamientos/', {
+        'nombre_tratamiento': 'Blanqueamiento', 'codigo': '0701', 'importe': '30000.00', 'eliminado': None,
+    }),
+    ('PATCH', '/api/panel-control/tratamientos/{tratamiento}/', {'importe': '9000.00'}),
+    ('PATCH', '/api/panel-control/coberturas_os/{cobertura}/', {'porcentaje': 60}),
+    ('POST', '/api/panel-control/metodos_cobro/', {'tipo_cobro': 'Cheque'}),
+    ('DELETE', '/api/panel-control/metodos_cobro/{metodo_cobro_a_borrar}/', None),
+    ('PATCH', '/api/panel-control/empleados/{empleado}/', {'rol': 'odontologo'}),
+    ('PATCH', '/api/panel-control/authuser/{usuario}/', {'first_name': 'Usuario'}),
+]
+
+
+def _reemplazar(valor, ids):
+    if isinstance(valor, str):
+        return valor.format(**ids)
+    if isinstance(valor, dict):
+        return {clave: _reemplazar(v, ids) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_reemplazar(v, ids) for v in valor]
+    return valor
+
+
+def _normalizar(ruta):
+    # Las rutas del router de DRF son expresiones regulares ('^authuser/$')
+    return ruta.replace('^', '').replace('$', '')
+
+
+def rutas_api():
+    """Rutas de todas las vistas bajo api/ (sin las variantes con sufijo de formato)"""
+    rutas = set()
+
+    def recorrer(patrones, prefijo=''):
+        for patron in patrones:
+            ruta = prefijo + str(patron.pattern)
+            if isinstance(patron, URLResolver):
+                recorrer(patron.url_patterns, ruta)
+            elif ruta.startswith('api/') and 'format' not in ruta:
+                rutas.add(_normalizar(ruta))
+
+    recorrer(get_resolver().url_patterns)
+    return rutas
+
+
+class ContadorConsultas:
+    """execute_wrapper que cuenta las consultas ejecutadas mientras está activo"""
+
+    def __init__(self):
+        self.cantidad = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.cantidad += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Presupuesto de consultas SQL por endpoint. Crea una clínica sintética '
+        'dentro de una transacción que se revierte al terminar, recorre todas '
+        'las rutas de /api/ y compara la cantidad de consultas, el código de '
+        'respuesta y la latencia de cada una con home/presupuesto_consultas.json '
+        '(la latencia solo en las lecturas, que se miden varias veces; las '
+        'escrituras se hacen una sola vez y se controlan por consultas). '
+        'Falla si algún endpoint empeora o si hay rutas sin recorrer. Con '
+        '--actualizar guarda lo medido como nuevo presupuesto (conviene hacerlo '
+        'contra el mismo motor de base de datos que se usa para verificar).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pacientes', type=int, default=2000)
+        parser.add_argument('--fichas', type=int, default=4000)
+        parser.add_argument('--turnos', type=int, default=3000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeticiones', type=int, default=3, help='Mediciones por cada lectura')
+        parser.add_argument('--presupuesto', default=str(PRESUPUESTO))
+        parser.add_argument(
+            '--tolerancia', type=float, default=3.0,
+            help='Factor sobre los milisegundos del presupuesto antes de fallar'
+        )
+        parser.add_argument(
+            '--margen-ms', type=float, default=50,
+            help='Milisegundos que se suman al límite (ruido en los endpoints rápidos)'
+        )
+        parser.add_argument('--sin-tiempos', action='store_true', help='Comparar solo consultas y códigos')
+        parser.add_argument('--actualizar', action='store_true', help='Guardar lo medido como presupuesto')
+
+    def handle(self, *args, **options):
+        # Sin la verificación periódica de versiones de los catálogos: depende
+        # del reloj y sumaría una consulta a un endpoint cualquiera
+        with override_settings(CATALOGOS_VERIFICACION_SEGUNDOS=float('inf')), transaction.atomic():
+            medidos = self._medir(options)
+            transaction.set_rollback(True)
+        # La caja abierta publicada durante la medición se revirtió con la transacción
+        abierta.descartar()
+
+        recorridas = {
+            _normalizar(resolve(re.sub(r'{\w+}', '1', url.split('?')[0])).route)
+            for _, url, _ in LECTURAS + ESCRITURAS
+        }
+        sin_recorrer = sorted(rutas_api() - recorridas - set(EXCLUIDAS))
+
+        archivo = Path(options['presupuesto'])
+        if options['actualizar']:
+            archivo.write_text(json.dumps(medidos, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'{len(medidos)} endpoints guardados en {archivo}'))
+            for ruta in sin_recorrer:
+                self.stdout.write(self.style.WARNING(f'Ruta sin recorrer: {ruta}'))
+            return
+
+        try:
+            presupuesto = json.loads(archivo.read_text())
+        except FileNotFoundError:
+            raise CommandError(f'No existe {archivo}; generarlo con --actualizar') from None
+
+        self.stdout.write(f'{"endpoint":<80}{"consultas":>10}{"ms":>9}{"código":>8}')
+        # Una sola medición de una escritura es demasiado ruidosa para un límite de tiempo
+        escrituras = {f'{metodo} {url}' for metodo, url, _ in ESCRITURAS}
+        fallas = []
+        for clave, medido in medidos.items():
+            self.stdout.write(
+                f'{clave[:79]:<80}{medido["consultas"]:>10}{medido["ms"]:>9.1f}{medido["estado"]:>8}'
+            )
+            esperado = presupuesto.get(clave)
+            if esperado is None:
+                fallas.append(f'{clave}: sin presupuesto')
+                continue
+            if medido['consultas'] > esperado['consultas']:
+                fallas.append(f'{clave}: {medido["consultas"]} consultas (presupuesto {esperado["consultas"]})')
+            if medido['estado'] != esperado['estado']:
+                fallas.append(f'{clave}: respondió {medido["estado"]} (antes {esperado["estado"]})')
+            limite = esperado['ms'] * options['tolerancia'] + options['margen_ms']
+            if not options['sin_tiempos'] and clave not in escrituras and medido['ms'] > limite:
+                fallas.append(f'{clave}: {medido["ms"]:.1f} ms (límite {limite:.1f} ms)')
+        fallas += [f'{ruta}: ruta sin recorrer' for ruta in sin_recorrer]
+
+        if fallas:
+            for falla in fallas:
+                self.stdout.write(self.style.ERROR(falla))
+            raise CommandError(f'{len(fallas)} problemas con el presupuesto de consultas')
+        self.stdout.write(self.style.SUCCESS(f'{len(medidos)} endpoints dentro del presupuesto.'))
+
+    def _sembrar(self, options):
+        inicio = time.perf_counter()
+        hoy = timezone.localdate()
+        catalogos = sintetico.asegurar_catalogos()
+        lote = sintetico.crear_pacientes(options['pacientes'], catalogos, seed=options['seed'])
+        caja = sintetico.crear_caja(catalogos)
+        abierta.descartar()
+        fichas = sintetico.crear_fichas(
+            options['fichas'], catalogos, lote, caja, seed=options['seed'], desde=hoy - timedelta(days=364)
+        )
+        sintetico.crear_turnos(options['turnos'], catalogos, lote, seed=options['seed'], ocupacion=0.7)
+        # Pacientes sin ficha patológica (para crearla) y uno para borrar
+        extra = sintetico.crear_pacientes(3, catalogos, seed=options['seed'] + 1)
+        FichasPatologicas.objects.filter(pk__in=extra.fichas_patologicas).delete()
+        metodo_a_borrar = MetodosCobro.objects.create(tipo_cobro='Temporal')
+
+        # bulk_create no dispara señales: los índices se arman a mano
+        busqueda.reindexar()
+        deudas.reconstruir()
+        agenda.reconstruir()
+        estadisticas.recalcular(estadisticas.primer_dia(actualizar=True), hoy - timedelta(days=1))
+        self.stdout.write(f'Clínica sintética creada en {time.perf_counter() - inicio:.1f} s')
+        return self._ids(catalogos, extra, caja, fichas, metodo_a_borrar)
+
+    def _ids(self, catalogos, extra, caja, fichas, metodo_a_borrar):
+        hoy = timezone.localdate()
+        usuario = User.objects.get(pk=catalogos.empleado.user_id)
+        usuario.set_password('presupuesto')
+        usuario.save()
+
+        ficha, ficha_a_borrar = FichasMedicas.objects.filter(pk__in=fichas).order_by('pk')[:2]
+        detalle = DetallesConsulta.objects.filter(id_ficha_medica=ficha).order_by('pk').first()
+        paciente_os = ficha.id_paciente_os
+        obra_social = paciente_os.id_obra_social
+        turno, turno_a_borrar = (
+            Turnos.objects.filter(
+                fecha_turno__gt=hoy + timedelta(days=1),
+                id_turno_estado=catalogos.estados_turno['pendiente'],
+            ).order_by('fecha_turno', 'hora_turno')[:2]
+        )
+        (libre_fecha, libre_hora), (otro_libre_fecha, otro_libre_hora) = (
+            agenda.proximos_libres(2, desde=hoy + timedelta(days=2))
+        )
+        dia_habil = hoy + timedelta(days=1)
+        while dia_habil.weekday() >= 5:
+            dia_habil += timedelta(days=1)
+        os_sin_ficha = PacientesXOs.objects.get(pk=extra.pacientes_os[0]).id_obra_social_id
+        tratamiento, otro_tratamiento = catalogos.tratamientos[:2]
+
+        return {
+            'hoy': hoy.isoformat(),
+            'hace_una_semana': (hoy - timedelta(days=7)).isoformat(),
+            'mes': hoy.strftime('%Y-%m'),
+            'mes_anterior': (hoy.replace(day=1) - timedelta(days=1)).strftime('%Y-%m'),
+            'dia_habil': dia_habil.isoformat(),
+            'usuario': usuario.pk,
+            'usuario_nombre': usuario.username,
+            'empleado': catalogos.empleado.pk,
+            'paciente': paciente_os.id_paciente_id,
+            'paciente_os': paciente_os.pk,
+            'ficha_patologica': FichasPatologicas.objects.filter(id_paciente_os=paciente_os).first().pk,
+            'paciente_sin_ficha': extra.pacientes[0],
+            'paciente_os_a_borrar': extra.pacientes_os[0],
+            'paciente_os_sin_ficha': extra.pacientes_os[1],
+            'paciente_a_borrar': extra.pacientes[2],
+            'obra_social': obra_social.pk,
+            'obra_social_nombre': obra_social.nombre_os,
+            'otra_obra_social': next(o.pk for o in catalogos.obras_sociales if o.pk != os_sin_ficha),
+            'parentesco': catalogos.parentescos[0].pk,
+            'ficha': ficha.pk,
+            'ficha_a_borrar': ficha_a_borrar.pk,
+            'detalle': detalle.pk,
+            'cobro': detalle.id_cobro_consulta_id,
+            'caja': caja.pk,
+            'tratamiento': tratamiento.pk,
+            'otro_tratamiento': otro_tratamiento.pk,
+            'cobertura': obra_social.coberturasos_set.order_by('pk').values_list('pk', flat=True).first(),
+            'diente': catalogos.dientes[0],
+            'cara': catalogos.caras[0],
+            'metodo_cobro': catalogos.metodos_cobro[0],
+            'metodo_cobro_a_borrar': metodo_a_borrar.pk,
+            'turno': turno.pk,
+            'turno_a_borrar': turno_a_borrar.pk,
+            'libre_fecha': libre_fecha.isoformat(),
+            'libre_hora': libre_hora.strftime('%H:%M'),
+            'otro_libre_fecha': otro_libre_fecha.isoformat(),
+            'otro_libre_hora': otro_libre_hora.strftime('%H:%M'),
+            'estado_pendiente': catalogos.estados_turno['pendiente'].pk,
+            'estado_confirmado': catalogos.estados_turno['confirmado'].pk,
+            'estado_cancelado': catalogos.estados_turno['cancelado'].pk,
+        }
+
+    def _pedir(self, cliente, metodo, url, datos, ids):
+        """(respuesta, consultas, ms) de un request; el cuerpo se consume dentro de la medición"""
+        contador = ContadorConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contador):
+            respuesta = getattr(cliente, metodo.lower())(
+                _reemplazar(url, ids), _reemplazar(datos, ids), format='json'
+            )
+            if respuesta.streaming:
+                # El cliente de pruebas cierra la respuesta al agotar el iterador
+                b''.join(respuesta.streaming_content)
+        return respuesta, contador.cantidad, (time.perf_counter() - inicio) * 1000
+
+    def _medir(self, options):
+        ids = self._sembrar(options)
+        cliente = APIClient()
+        cliente.force_authenticate(User.objects.get(pk=ids['usuario']))
+        medidos = {}
+
+        for metodo, url, datos in LECTURAS:
+            self._pedir(cliente, metodo, url, datos, ids)
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                respuesta, consultas, ms = self._pedir(cliente, metodo, url, datos, ids)
+                tiempos.append(ms)
+            medidos[f'{metodo} {url}'] = {
+                'consultas': consultas,
+                'ms': round(statistics.median(tiempos), 1),
+                'estado': respuesta.status_code,
+            }
+
+        for metodo, url, datos in ESCRITURAS:
+            respuesta, consultas, ms = self._pedir(cliente, metodo, url, datos, ids)
+            medidos[f'{metodo} {url}'] = {
+                'consultas': consultas, 'ms': round(ms, 1), 'estado': respuesta.status_code,
+            }
+            if respuesta.status_code >= 400 and options['verbosity'] > 1:
+                self.stdout.write(f'{metodo} {url} -> {respuesta.status_code}: {respuesta.content[:300]!r}')
+            # Los tokens del login se usan en los requests siguientes
+            if not respuesta.streaming and 'json' in respuesta.get('Content-Type', ''):
+                cuerpo = respuesta.json()
+                if isinstance(cuerpo, dict):
+                    ids.update({k: cuerpo[k] for k in ('access', 'refresh') if k in cuerpo})
+        return medidos
@@ -0,0 +1,129 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from caja import abierta as caja_abierta
+from home import estadisticas, sintetico
+from home.models import Turnos
+from pacientes import busqueda, deudas
+from turnos import agenda
+
+# Días que recalcula cada llamada a estadisticas.recalcular
+BLOQUE_ESTADISTICAS = 365
+
+
+class Command(BaseCommand):
+    help = (
+        'Carga una clínica sintética del tamaño pedido (pacientes con obra social '
+        'y ficha patológica, cajas diarias con ingresos y egresos, fichas médicas '
+        'con cobro y detalles, turnos) con bulk_create por lotes y rangos de ids '
+        'asignados de antemano, así las claves foráneas quedan armadas sin leer '
+        'nada de vuelta. Con la misma semilla genera siempre los mismos datos. '
+        'Como bulk_create no dispara señales, al final reconstruye el índice de '
+        'búsqueda de pacientes, la ocupación de la agenda y las estadísticas '
+        'diarias. Los datos quedan guardados: usar sobre una base de pruebas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pacientes', type=int, default=10_000)
+        parser.add_argument('--fichas', type=int, default=20_000)
+        parser.add_argument('--turnos', type=int, default=20_000)
+        parser.add_argument('--dias', type=int, default=365, help='Días de historia de cajas y fichas')
+        parser.add_argument('--detalles-min', type=int, default=1, help='Detalles mínimos por ficha')
+        parser.add_argument('--detalles-max', type=int, default=4, help='Detalles máximos por ficha')
+        parser.add_argument('--movimientos', type=int, default=3, help='Ingresos y egresos máximos por caja')
+        parser.add_argument(
+            '--ocupacion', type=float, default=0.8,
+            help='Fracción de los horarios de la agenda ocupados por turnos'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--sin-indices', action='store_true',
+            help='No reconstruir búsqueda, deudas, ocupación ni estadísticas (hacerlo después a mano)'
+        )
+
+    def handle(self, *args, **options):
+        if options['pacientes'] < 1 or options['dias'] < 1:
+            raise CommandError('--pacientes y --dias deben ser al menos 1')
+        if not 1 <= options['detalles_min'] <= options['detalles_max']:
+            raise CommandError('Se necesita 1 <= --detalles-min <= --detalles-max')
+        if not 0 < options['ocupacion'] <= 1:
+            raise CommandError('--ocupacion debe estar en (0, 1]')
+
+        seed = options['seed']
+        hoy = timezone.localdate()
+        desde = hoy - timedelta(days=options['dias'] - 1)
+        inicio = time.perf_counter()
+
+        catalogos = self._paso('Catálogos', lambda: sintetico.asegurar_catalogos())
+        lote = self._paso(
+            'Pacientes, obras sociales y fichas patológicas',
+            lambda: sintetico.crear_pacientes(options['pacientes'], catalogos, seed=seed),
+            filas=options['pacientes'] * 3
+        )
+        # Solo puede haber una caja abierta: la de hoy, si no hay otra
+        abierta = caja_abierta.actual() is None
+        cajas = self._paso(
+            'Cajas',
+            lambda: sintetico.crear_cajas(catalogos, desde, options['dias'], seed=seed, abierta_ultima=abierta),
+            filas=options['dias']
+        )
+        movimientos = self._paso(
+            'Ingresos y egresos',
+            lambda: sintetico.crear_movimientos(cajas, desde, seed=seed, por_caja=(0, options['movimientos'])),
+            filas=lambda creados: sum(creados)
+        )
+        self._paso(
+            'Fichas médicas, cobros y detalles',
+            lambda: sintetico.crear_fichas(
+                options['fichas'], catalogos, lote, cajas, seed=seed, desde=desde,
+                detalles=(options['detalles_min'], options['detalles_max'])
+            ),
+            filas=options['fichas'] * (2 + (options['detalles_min'] + options['detalles_max']) / 2)
+        )
+        turnos = self._paso(
+            'Turnos',
+            lambda: sintetico.crear_turnos(
+                options['turnos'], catalogos, lote, seed=seed, ocupacion=options['ocupacion']
+            ),
+            filas=options['turnos']
+        )
+
+        if not options['sin_indices']:
+            self._paso('Índice de búsqueda de pacientes', lambda: busqueda.reindexar())
+            self._paso('Deudas de pacientes', lambda: deudas.reconstruir())
+            self._paso('Ocupación de la agenda', lambda: agenda.reconstruir())
+            self._paso('Estadísticas diarias', lambda: self._estadisticas(hoy))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Clínica sintética cargada en {time.perf_counter() - inicio:.1f} s '
+            f'({len(lote.pacientes)} pacientes, {options["fichas"]} fichas, '
+            f'{len(turnos)} turnos, {len(cajas)} cajas, {sum(movimientos)} movimientos).'
+        ))
+        if turnos:
+            primero = Turnos.objects.filter(pk__in=turnos).order_by('fecha_turno').values_list(
+                'fecha_turno', flat=True
+            ).first()
+            self.stdout.write(f'Los turnos van del {primero:%d/%m/%Y} al {agenda.limite_reservas(hoy):%d/%m/%Y}.')
+
+    def _paso(self, nombre, funcion, filas=None):
+        """Ejecuta un paso mostrando su duración (y filas por segundo si se conocen)"""
+        self.stdout.write(f'{nombre}...', ending='')
+        self.stdout.flush()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        if callable(filas):
+            filas = filas(resultado)
+        detalle = f' ({filas / segundos:,.0f} filas/s)' if filas and segundos else ''
+        self.stdout.write(f' {segundos:.1f} s{detalle}')
+        return resultado
+
+    def _estadisticas(self, hoy):
+        """Recalcula el rollup diario hasta ayer, por bloques para acotar la memoria"""
+        desde = estadisticas.primer_dia(actualizar=True)
+        hasta = hoy - timedelta(days=1)
+        while desde <= hasta:
+            fin = min(desde + timedelta(days=BLOQUE_ESTADISTICAS - 1), hasta)
+            estadisticas.recalcular(desde, fin)
+            desde = fin + timedelta(days=1)
@@ -0,0 +1,39 @@
+# Índices para la paginación por cursor de los listados. Las tablas no son
+# administradas por Django, por eso se crean con RunPython y no con AddIndex.
+from django.db import migrations, models
+
+INDICES = [
+    ('Pacientes', models.Index(
+        fields=['apellido_paciente', 'nombre_paciente', 'id_paciente'],
+        name='pacientes_apellido_nombre_idx')),
+    ('Turnos', models.Index(
+        fields=['fecha_turno', 'hora_turno', 'id_turno'],
+        name='turnos_fecha_hora_idx')),
+    ('FichasMedicas', models.Index(
+        fields=['fecha_creacion', 'id_ficha_medica'],
+        name='fichas_fecha_creacion_idx')),
+    ('Cajas', models.Index(
+        fields=['fecha_hora_apertura', 'id_caja'],
+        name='cajas_apertura_idx')),
+]
+
+
+def crear_indices(apps, schema_editor):
+    for modelo, indice in INDICES:
+        schema_editor.add_index(apps.get_model('home', modelo), indice)
+
+
+def eliminar_indices(apps, schema_editor):
+    for modelo, indice in INDICES:
+        schema_editor.remove_index(apps.get_model('home', modelo), indice)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
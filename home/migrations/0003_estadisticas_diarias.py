@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0002_indices_listados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiasConsolidados',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dias_consolidados',
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadisticasDiarias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('metrica', models.CharField(max_length=30)),
+                ('clave', models.CharField(blank=True, default='', max_length=60)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'db_table': 'estadisticas_diarias',
+                'indexes': [models.Index(fields=['metrica', 'fecha'], name='estadisticas_metrica_idx')],
+                'unique_together': {('fecha', 'metrica', 'clave')},
+            },
+        ),
+    ]
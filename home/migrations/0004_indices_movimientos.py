@@ -0,0 +1,34 @@
+# Índices para leer los ingresos y egresos por fecha (exportación contable,
+# ver caja/exportacion.py). Las tablas no son administradas por Django, por
+# eso se crean con RunPython y no con AddIndex.
+from django.db import migrations, models
+
+INDICES = [
+    ('Ingresos', models.Index(
+        fields=['fecha_hora_ingreso', 'id_ingreso'],
+        name='ingresos_fecha_idx')),
+    ('Egresos', models.Index(
+        fields=['fecha_hora_egreso', 'id_egreso'],
+        name='egresos_fecha_idx')),
+]
+
+
+def crear_indices(apps, schema_editor):
+    for modelo, indice in INDICES:
+        schema_editor.add_index(apps.get_model('home', modelo), indice)
+
+
+def eliminar_indices(apps, schema_editor):
+    for modelo, indice in INDICES:
+        schema_editor.remove_index(apps.get_model('home', modelo), indice)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0003_estadisticas_diarias'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
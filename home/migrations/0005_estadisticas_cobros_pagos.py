@@ -0,0 +1,21 @@
+# La métrica de cobros pasa a sumar los pagos (caja.Pagos) por fecha de
+# pago, con clave "metodo:pagador". Los días ya consolidados tienen la
+# métrica vieja: se descartan y se vuelven a calcular cuando se consultan
+# (o con el comando consolidar_estadisticas).
+from django.db import migrations
+
+
+def descartar_consolidados(apps, schema_editor):
+    apps.get_model('home', 'EstadisticasDiarias').objects.all().delete()
+    apps.get_model('home', 'DiasConsolidados').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_indices_movimientos'),
+    ]
+
+    operations = [
+        migrations.RunPython(descartar_consolidados, migrations.RunPython.noop),
+    ]
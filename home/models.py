@@ -415,3 +415,32 @@ class Turnos(models.Model):
     class Meta:
         managed = False
         db_table = 'turnos'
+
+
+class EstadisticasDiarias(models.Model):
+    """
+    Totales por día para los dashboards (ver home/estadisticas.py).
+    `clave` es la dimensión de la métrica: id de estado de turno,
+    "metodo:pagador" de los pagos, id de tratamiento, id de paciente_os...
+    """
+    fecha = models.DateField()
+    metrica = models.CharField(max_length=30)
+    clave = models.CharField(max_length=60, blank=True, default='')
+    cantidad = models.IntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'estadisticas_diarias'
+        unique_together = (('fecha', 'metrica', 'clave'),)
+        indexes = [
+            models.Index(fields=['metrica', 'fecha'], name='estadisticas_metrica_idx'),
+        ]
+
+
+class DiasConsolidados(models.Model):
+    """Días cuyas estadísticas ya están calculadas en EstadisticasDiarias"""
+    fecha = models.DateField(primary_key=True)
+    fecha_calculo = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dias_consolidados'
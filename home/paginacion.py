@@ -0,0 +1,175 @@
+"""
+Paginación por cursor (keyset) para los listados de la API.
+
+Es opcional: si el request no trae `limit` ni `cursor`, el listado se
+devuelve completo como siempre, con 'total' igual a la cantidad de filas.
+
+Con `?limit=N` se devuelve una página y un cursor opaco para pedir la
+siguiente (`?cursor=...`). La página se busca con WHERE sobre las columnas
+del orden (más la clave primaria como desempate) en lugar de OFFSET, así
+el costo de cada página no crece con la tabla.
+
+`?total=` controla el conteo:
+    exacto  COUNT(*) del listado filtrado
+    aprox   (por defecto) cuenta hasta TOPE_CONTEO filas; si hay más,
+            devuelve TOPE_CONTEO con 'total_aproximado': True
+    no      no cuenta ('total' es None)
+
+Las columnas del orden no deben admitir NULL.
+"""
+import base64
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+TAM_PAGINA_MAX = 200
+TOPE_CONTEO = 10000
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def _orden_completo(queryset, orden):
+    """Agrega la clave primaria al orden para que sea total"""
+    pk = queryset.model._meta.pk.attname
+    campos = list(orden)
+    if not any(c.lstrip('-') == pk for c in campos):
+        descendente = campos[-1].startswith('-') if campos else False
+        campos.append(f'-{pk}' if descendente else pk)
+    return campos
+
+
+def _codificar(valores):
+    crudo = json.dumps(valores, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip('=')
+
+
+def _decodificar(cursor, model, campos):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != len(campos):
+            raise ValueError
+        return [
+            model._meta.get_field(c.lstrip('-')).to_python(v)
+            for c, v in zip(campos, valores)
+        ]
+    except Exception:
+        raise CursorInvalido('Cursor inválido') from None
+
+
+def _despues_de(campos, valores):
+    """
+    Condición "fila posterior a `valores`" para el orden dado:
+    (a > x) OR (a = x AND b > y) OR ...  con < en los campos descendentes.
+    """
+    condicion = Q()
+    for i, campo in enumerate(campos):
+        nombre = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        paso = Q(**{f'{nombre}__{operador}': valores[i]})
+        for anterior, valor in zip(campos[:i], valores[:i]):
+            paso &= Q(**{anterior.lstrip('-'): valor})
+        condicion |= paso
+    return condicion
+
+
+def _parse_limit(valor):
+    try:
+        limit = int(valor)
+    except (TypeError, ValueError):
+        raise CursorInvalido('limit debe ser un número entero') from None
+    if limit < 1:
+        raise CursorInvalido('limit debe ser mayor que 0')
+    return min(limit, TAM_PAGINA_MAX)
+
+
+def _contar(queryset, modo):
+    if modo == 'no':
+        return None, False
+    if modo == 'exacto':
+        return queryset.count(), False
+    if modo != 'aprox':
+        raise CursorInvalido('total debe ser exacto, aprox o no')
+    ids = queryset.order_by().values('pk')[:TOPE_CONTEO + 1]
+    cantidad = ids.count()
+    if cantidad > TOPE_CONTEO:
+        return TOPE_CONTEO, True
+    return cantidad, False
+
+
+def paginar(request, queryset, orden, serializar):
+    """
+    Ordena el queryset y arma la respuesta del listado.
+
+    `serializar` recibe el queryset (o la página) y devuelve la lista de
+    datos. Devuelve el dict de respuesta con 'success', 'data' y 'total';
+    en modo paginado agrega 'paginacion' y, si corresponde, 'total_aproximado'.
+    Lanza CursorInvalido ante parámetros mal formados.
+    """
+    params = request.query_params
+    campos = _orden_completo(queryset, orden)
+    queryset = queryset.order_by(*campos)
+
+    if 'limit' not in params and 'cursor' not in params:
+        data = serializar(queryset)
+        return {'success': True, 'data': data, 'total': len(data)}
+
+    limit = _parse_limit(params.get('limit', 50))
+    total, aproximado = _contar(queryset, params.get('total', 'aprox'))
+
+    pagina = queryset
+    cursor = params.get('cursor')
+    if cursor:
+        valores = _decodificar(cursor, queryset.model, campos)
+        pagina = pagina.filter(_despues_de(campos, valores))
+
+    # Se pide una fila de más para saber si hay otra página
+    filas = list(pagina[:limit + 1])
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+
+    siguiente = None
+    if hay_mas:
+        ultima = filas[-1]
+        siguiente = _codificar([getattr(ultima, c.lstrip('-')) for c in campos])
+
+    respuesta = {
+        'success': True,
+        'data': serializar(filas),
+        'total': total,
+        'paginacion': {
+            'tam_pagina': limit,
+            'hay_mas': hay_mas,
+            'siguiente_cursor': siguiente,
+        }
+    }
+    if aproximado:
+        respuesta['total_aproximado'] = True
+    return respuesta
+
+
+def recorrer(queryset, orden, tam_bloque=1000):
+    """
+    Recorre el queryset completo en el orden dado, de a bloques de
+    tam_bloque filas buscados con la misma condición que las páginas. Sirve
+    para modelos y para .values(). A diferencia de .iterator(chunk_size),
+    la memoria no depende de la cantidad de filas tampoco en MySQL, donde
+    mysqlclient trae el resultado completo de la consulta.
+    """
+    campos = _orden_completo(queryset, orden)
+    queryset = queryset.order_by(*campos)
+    atributos = [queryset.model._meta.get_field(c.lstrip('-')).attname for c in campos]
+
+    bloque = list(queryset[:tam_bloque])
+    while bloque:
+        yield from bloque
+        if len(bloque) < tam_bloque:
+            return
+        ultima = bloque[-1]
+        if isinstance(ultima, dict):
+            valores = [ultima.get(a, ultima.get(c.lstrip('-'))) for a, c in zip(atributos, campos)]
+        else:
+            valores = [getattr(ultima, a) for a in atributos]
+        bloque = list(queryset.filter(_despues_de(campos, valores))[:tam_bloque])
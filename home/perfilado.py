@@ -0,0 +1,125 @@
+"""
+Perfilado de consultas SQL por request.
+
+PerfiladoConsultasMiddleware mide, para cada request perfilado, cuántas
+consultas se ejecutaron, cuánto tardaron en la base, cuánto tiempo quedó
+para Python y qué consultas se repitieron. El resultado se devuelve en la
+cabecera Server-Timing (visible en la pestaña Network del navegador) y se
+escribe una línea JSON en el logger "perfilado". Si una misma consulta
+normalizada se ejecuta más de PERFILADO_REPETICIONES_MAX veces (típico de
+un N+1: una consulta por fila dentro de un bucle) la línea sale con nivel
+WARNING e incluye las consultas repetidas.
+
+Se activa para todos los requests con PERFILADO_CONSULTAS = True o solo
+para los que traen la cabecera "X-Perfilar: 1" si PERFILADO_CABECERA es
+True (por defecto, igual a DEBUG). Sin perfilado no agrega costo: no se
+instala ningún wrapper en las conexiones.
+
+En las respuestas en streaming solo se mide hasta que la vista devuelve la
+respuesta, no el envío del contenido.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('perfilado')
+
+CABECERA = 'X-Perfilar'
+
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTAS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def huella(sql):
+    """SQL normalizado: sin literales, con las listas de IN colapsadas y espacios simples"""
+    sql = _CADENAS.sub('?', sql)
+    sql = _NUMEROS.sub('?', sql)
+    sql = _LISTAS.sub('(...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+class Registro:
+    """execute_wrapper que acumula cantidad, tiempo y huellas de las consultas"""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.huellas = Counter()
+
+    def __call__(self, ejecutar, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return ejecutar(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.cantidad += 1
+            self.huellas[huella(sql)] += 1
+
+    def repetidas(self, minimo=2):
+        """[(huella, veces)] de las consultas ejecutadas al menos `minimo` veces"""
+        return [(sql, veces) for sql, veces in self.huellas.most_common() if veces >= minimo]
+
+
+class PerfiladoConsultasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.siempre = getattr(settings, 'PERFILADO_CONSULTAS', False)
+        self.por_cabecera = getattr(settings, 'PERFILADO_CABECERA', settings.DEBUG)
+        self.repeticiones_max = getattr(settings, 'PERFILADO_REPETICIONES_MAX', 5)
+
+    def _activo(self, request):
+        return self.siempre or (self.por_cabecera and request.headers.get(CABECERA) == '1')
+
+    def __call__(self, request):
+        if not self._activo(request):
+            return self.get_response(request)
+
+        registro = Registro()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(registro))
+            response = self.get_response(request)
+        total = time.perf_counter() - inicio
+
+        self._informar(request, response, registro, total)
+        return response
+
+    def _informar(self, request, response, registro, total):
+        db_ms = registro.segundos * 1000
+        total_ms = total * 1000
+        python_ms = max(total_ms - db_ms, 0.0)
+        repetidas = registro.repetidas()
+        n_mas_uno = [(sql, veces) for sql, veces in repetidas if veces > self.repeticiones_max]
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.1f};desc="{registro.cantidad} consultas"',
+            f'app;dur={python_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+        # El frontend corre en otro origen: sin esto el navegador oculta los tiempos
+        if 'Origin' in request.headers:
+            response['Timing-Allow-Origin'] = request.headers['Origin']
+
+        linea = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'consultas': registro.cantidad,
+            'db_ms': round(db_ms, 1),
+            'python_ms': round(python_ms, 1),
+            'total_ms': round(total_ms, 1),
+            'repetidas': sum(veces - 1 for _, veces in repetidas),
+        }
+        if n_mas_uno:
+            linea['n_mas_uno'] = [{'sql': sql[:300], 'veces': veces} for sql, veces in n_mas_uno]
+            logger.warning(json.dumps(linea, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(linea, ensure_ascii=False))
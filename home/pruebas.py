@@ -0,0 +1,63 @@
+"""
+Ejecutor de las pruebas (TEST_RUNNER).
+
+Las tablas de home son de la base existente (managed = False), así que la
+base de pruebas no las tendría y las migraciones que les agregan índices o
+cargan datos desde ellas fallarían. Antes de migrar se crean desde los
+modelos, salvo las de auth y django, que crean sus propias migraciones.
+
+La caché compartida (CACHES['compartida']) se reemplaza por una en memoria
+mientras corren las pruebas, para que no lean ni dejen datos en la del
+servidor de desarrollo.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import pre_migrate
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+UID = 'pruebas_tablas_home'
+
+
+def _crear_tablas(sender, using, **kwargs):
+    connection = connections[using]
+    existentes = set(connection.introspection.table_names())
+    modelos = [
+        m for m in apps.get_app_config('home').get_models()
+        if not m._meta.managed
+        and m._meta.db_table not in existentes
+        and not m._meta.db_table.startswith(('auth_', 'django_'))
+    ]
+    if not modelos:
+        return
+    # Las claves foráneas a auth_user se crean antes que la tabla
+    with connection.constraint_checks_disabled():
+        with connection.schema_editor() as editor:
+            for modelo in modelos:
+                editor.create_model(modelo)
+
+
+class EjecutorPruebas(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        caches_pruebas = {
+            **settings.CACHES,
+            'compartida': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'pruebas',
+            },
+        }
+        self._cache_pruebas = override_settings(CACHES=caches_pruebas)
+        self._cache_pruebas.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_pruebas.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        pre_migrate.connect(_crear_tablas, dispatch_uid=UID)
+        try:
+            return super().setup_databases(**kwargs)
+        finally:
+            pre_migrate.disconnect(dispatch_uid=UID)
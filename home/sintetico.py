@@ -0,0 +1,431 @@
+"""
+Generación de datos sintéticos para benchmarks y pruebas de carga.
+
+Todas las funciones insertan con bulk_create en lotes y asignan las claves
+primarias explícitamente (MySQL no devuelve los ids de un INSERT masivo),
+por eso devuelven rangos de ids contiguos en lugar de listas de objetos.
+Con la misma semilla se generan siempre los mismos datos.
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.db.models import Max
+from django.utils import timezone
+from caja import abierta as caja_abierta
+from caja.models import Pagos
+from home.models import (
+    AuthUser, Cajas, CarasDiente, CoberturasOs, CobrosConsulta,
+    DetallesConsulta, Dientes, Egresos, Empleados, EstadosPago, EstadosTurno,
+    FichasMedicas, FichasPatologicas, Ingresos, MetodosCobro, ObrasSociales,
+    Pacientes, PacientesXOs, Parentesco, Tratamientos, Turnos
+)
+
+LOTE = 2000
+
+NOMBRES = [
+    'María', 'José', 'Lucía', 'Juan', 'Sofía', 'Martín', 'Valentina', 'Matías',
+    'Camila', 'Nicolás', 'Florencia', 'Agustín', 'Julieta', 'Tomás', 'Ana',
+    'Ramón', 'Inés', 'Joaquín', 'Belén', 'Andrés', 'Mónica', 'Héctor',
+]
+APELLIDOS = [
+    'González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez',
+    'Pérez', 'García', 'Sánchez', 'Romero', 'Sosa', 'Álvarez', 'Torres', 'Ruiz',
+    'Ramírez', 'Flores', 'Benítez', 'Acosta', 'Medina', 'Núñez', 'Ibáñez',
+]
+LOCALIDADES = ['Salta', 'Cerrillos', 'Rosario de Lerma', 'Vaqueros', 'La Caldera', 'Güemes']
+
+DIENTES = (
+    list(range(11, 19)) + list(range(21, 29)) + list(range(31, 39)) + list(range(41, 49))
+    + list(range(51, 56)) + list(range(61, 66)) + list(range(71, 76)) + list(range(81, 86))
+)
+CARAS = [
+    ('Oclusal', 'O'), ('Mesial', 'M'), ('Distal', 'D'),
+    ('Vestibular', 'V'), ('Lingual', 'L'),
+]
+TRATAMIENTOS = [
+    ('Consulta', '0101', '8000'), ('Obturación simple', '0201', '15000'),
+    ('Obturación compuesta', '0202', '22000'), ('Extracción', '1001', '18000'),
+    ('Tratamiento de conducto', '0301', '60000'), ('Limpieza', '0501', '12000'),
+    ('Radiografía', '0901', '5000'), ('Sellador', '0601', '7000'),
+]
+OBRAS_SOCIALES = ['Particular', 'OSDE', 'IPS Salta', 'Swiss Medical', 'PAMI', 'OSECAC']
+INGRESOS = ['Cambio', 'Reintegro', 'Venta de insumos']
+EGRESOS = ['Insumos', 'Limpieza', 'Laboratorio', 'Librería', 'Viáticos']
+
+
+@dataclass
+class Catalogos:
+    empleado: Empleados
+    obras_sociales: list
+    parentescos: list
+    tratamientos: list
+    caras: list
+    dientes: list
+    metodos_cobro: list
+    estados_pago: dict
+    estados_turno: dict
+
+
+@dataclass
+class LotePacientes:
+    """Rangos de ids creados por crear_pacientes (uno por paciente en cada tabla)"""
+    pacientes: range
+    pacientes_os: range
+    fichas_patologicas: range
+
+
+def siguiente_id(modelo):
+    pk = modelo._meta.pk.attname
+    return (modelo.objects.aggregate(maximo=Max(pk))['maximo'] or 0) + 1
+
+
+def en_lotes(objetos, tam=LOTE):
+    lote = []
+    for obj in objetos:
+        lote.append(obj)
+        if len(lote) >= tam:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def insertar(modelo, objetos, tam=LOTE):
+    """Inserta un iterable de instancias en lotes; devuelve cuántas insertó"""
+    total = 0
+    for lote in en_lotes(objetos, tam):
+        modelo.objects.bulk_create(lote, batch_size=tam)
+        total += len(lote)
+    return total
+
+
+def asegurar_catalogos():
+    """Crea los registros de catálogo que falten y devuelve los existentes"""
+    for nombre in ('pendiente', 'parcial', 'pagado'):
+        EstadosPago.objects.get_or_create(nombre_estado=nombre)
+    for nombre in ('Pendiente', 'Confirmado', 'Atendido', 'Cancelado'):
+        if not EstadosTurno.objects.filter(estado_turno__iexact=nombre).exists():
+            EstadosTurno.objects.create(estado_turno=nombre)
+    if not CarasDiente.objects.exists():
+        CarasDiente.objects.bulk_create([
+            CarasDiente(nombre_cara=n, abreviatura=a) for n, a in CARAS
+        ])
+    existentes = set(Dientes.objects.values_list('id_diente', flat=True))
+    Dientes.objects.bulk_create([
+        Dientes(id_diente=d, nombre_diente=f'Diente {d}') for d in DIENTES if d not in existentes
+    ])
+    if not MetodosCobro.objects.exists():
+        for tipo in ('Efectivo', 'Transferencia', 'Tarjeta'):
+            MetodosCobro.objects.create(tipo_cobro=tipo)
+    if not Parentesco.objects.exists():
+        for tipo in ('Titular', 'Cónyuge', 'Hijo/a'):
+            Parentesco.objects.create(tipo_parentesco=tipo)
+    for nombre in OBRAS_SOCIALES:
+        if not ObrasSociales.objects.filter(nombre_os=nombre).exists():
+            ObrasSociales.objects.create(nombre_os=nombre)
+    if not Tratamientos.objects.exists():
+        for nombre, codigo, importe in TRATAMIENTOS:
+            Tratamientos.objects.create(
+                nombre_tratamiento=nombre, codigo=codigo, importe=Decimal(importe)
+            )
+
+    obras_sociales = list(ObrasSociales.objects.filter(eliminado__isnull=True))
+    tratamientos = list(Tratamientos.objects.filter(eliminado__isnull=True))
+    if not CoberturasOs.objects.exists():
+        rng = random.Random(0)
+        CoberturasOs.objects.bulk_create([
+            CoberturasOs(id_obra_social=os_, id_tratamiento=t, porcentaje=rng.choice((30, 50, 70, 100)))
+            for os_ in obras_sociales if os_.nombre_os != 'Particular'
+            for t in tratamientos
+        ])
+
+    return Catalogos(
+        empleado=_empleado_sintetico(),
+        obras_sociales=obras_sociales,
+        parentescos=list(Parentesco.objects.all()),
+        tratamientos=tratamientos,
+        caras=list(CarasDiente.objects.values_list('id_cara', flat=True)),
+        dientes=list(Dientes.objects.values_list('id_diente', flat=True)),
+        metodos_cobro=list(MetodosCobro.objects.values_list('id_metodo_cobro', flat=True)),
+        estados_pago={e.nombre_estado: e for e in EstadosPago.objects.all()},
+        estados_turno={e.estado_turno.lower(): e for e in EstadosTurno.objects.all()},
+    )
+
+
+def _empleado_sintetico():
+    user, _ = AuthUser.objects.get_or_create(
+        username='sintetico',
+        defaults={
+            'password': '!', 'is_superuser': 0, 'first_name': 'Usuario',
+            'last_name': 'Sintético', 'email': '', 'is_staff': 0,
+            'is_active': 1, 'date_joined': timezone.now(),
+        }
+    )
+    empleado, _ = Empleados.objects.get_or_create(
+        user=user, defaults={'rol': 'odontologo', 'fecha_creacion': timezone.now()}
+    )
+    return empleado
+
+
+def crear_pacientes(n, catalogos, seed=0):
+    """
+    Crea n pacientes, cada uno con su relación paciente-obra social y su
+    ficha patológica. Devuelve un LotePacientes con los ids creados.
+    """
+    rng = random.Random(seed)
+    id_paciente = siguiente_id(Pacientes)
+    id_paciente_os = siguiente_id(PacientesXOs)
+    id_ficha_patologica = siguiente_id(FichasPatologicas)
+
+    def pacientes():
+        for i in range(n):
+            yield Pacientes(
+                id_paciente=id_paciente + i,
+                dni_paciente=10_000_000 + rng.randrange(40_000_000),
+                nombre_paciente=rng.choice(NOMBRES),
+                apellido_paciente=rng.choice(APELLIDOS),
+                fecha_nacimiento=date(1940, 1, 1) + timedelta(days=rng.randrange(30_000)),
+                localidad=rng.choice(LOCALIDADES),
+                telefono=f'387{rng.randrange(10**7):07d}',
+            )
+
+    def pacientes_os():
+        for i in range(n):
+            yield PacientesXOs(
+                id_paciente_os=id_paciente_os + i,
+                id_paciente_id=id_paciente + i,
+                id_obra_social=rng.choice(catalogos.obras_sociales),
+                id_parentesco=catalogos.parentescos[0],
+                credencial_paciente=rng.randrange(10**9),
+            )
+
+    def fichas_patologicas():
+        for i in range(n):
+            yield FichasPatologicas(
+                id_ficha_patologica=id_ficha_patologica + i,
+                id_paciente_os_id=id_paciente_os + i,
+                alergias=rng.randrange(2),
+                diabetes=rng.randrange(2),
+                hipertension=rng.randrange(2),
+            )
+
+    insertar(Pacientes, pacientes())
+    insertar(PacientesXOs, pacientes_os())
+    insertar(FichasPatologicas, fichas_patologicas())
+    return LotePacientes(
+        pacientes=range(id_paciente, id_paciente + n),
+        pacientes_os=range(id_paciente_os, id_paciente_os + n),
+        fichas_patologicas=range(id_ficha_patologica, id_ficha_patologica + n),
+    )
+
+
+def crear_caja(catalogos, apertura=None, abierta=True):
+    caja = Cajas.objects.create(
+        id_empleado=catalogos.empleado,
+        fecha_hora_apertura=apertura or timezone.now(),
+        monto_apertura=Decimal('10000.00'),
+        estado_caja=1 if abierta else 0,
+    )
+    if abierta:
+        caja_abierta.fijar(caja)
+    return caja
+
+
+def crear_cajas(catalogos, desde, dias, seed=0, abierta_ultima=False):
+    """
+    Crea una caja por día desde `desde`, cerradas salvo la del último día si
+    abierta_ultima. Devuelve el rango de ids: la caja del día desde + i es la
+    i-ésima, que es lo que espera crear_fichas.
+    """
+    rng = random.Random(seed)
+    id_caja = siguiente_id(Cajas)
+
+    def cajas():
+        for i in range(dias):
+            fecha = desde + timedelta(days=i)
+            abierta = abierta_ultima and i == dias - 1
+            apertura = timezone.make_aware(datetime.combine(fecha, time(13, 30)))
+            yield Cajas(
+                id_caja=id_caja + i,
+                id_empleado=catalogos.empleado,
+                fecha_hora_apertura=apertura,
+                monto_apertura=Decimal('10000.00'),
+                fecha_hora_cierre=None if abierta else apertura + timedelta(hours=7, minutes=30),
+                monto_cierre=None if abierta else Decimal(10000 + rng.randrange(200_000)),
+                estado_caja=1 if abierta else 0,
+            )
+
+    insertar(Cajas, cajas())
+    if abierta_ultima:
+        caja_abierta.fijar(Cajas.objects.get(pk=id_caja + dias - 1))
+    return range(id_caja, id_caja + dias)
+
+
+def crear_movimientos(cajas, desde, seed=0, por_caja=(0, 3)):
+    """Ingresos y egresos manuales (entre por_caja[0] y por_caja[1] de cada uno) de cada caja"""
+    rng = random.Random(seed)
+
+    def movimientos(modelo, descripciones):
+        campo = 'ingreso' if modelo is Ingresos else 'egreso'
+        for i, id_caja in enumerate(cajas):
+            fecha = desde + timedelta(days=i)
+            for _ in range(rng.randint(*por_caja)):
+                momento = datetime.combine(fecha, time(14 + rng.randrange(7), rng.randrange(60)))
+                yield modelo(**{
+                    'id_caja_id': id_caja,
+                    f'fecha_hora_{campo}': timezone.make_aware(momento),
+                    f'descripcion_{campo}': rng.choice(descripciones),
+                    f'monto_{campo}': Decimal(500 + rng.randrange(20_000)),
+                })
+
+    return (
+        insertar(Ingresos, movimientos(Ingresos, INGRESOS)),
+        insertar(Egresos, movimientos(Egresos, EGRESOS)),
+    )
+
+
+def crear_fichas(n, catalogos, lote, caja, seed=0, detalles=(1, 4), desde=None):
+    """
+    Crea n fichas médicas repartidas entre los pacientes del LotePacientes,
+    cada una con su cobro (y los pagos del paciente y de la obra social, si
+    está pagado en parte o del todo) y entre detalles[0] y detalles[1]
+    detalles de consulta.
+    `caja` es una caja (todos los cobros van a ella, fichas del último año)
+    o el rango de crear_cajas (cada cobro va a la caja del día de la ficha).
+    """
+    rng = random.Random(seed)
+    desplazamiento_patologica = lote.fichas_patologicas.start - lote.pacientes_os.start
+    desde = desde or (timezone.localdate() - timedelta(days=365))
+    dias = 365 if isinstance(caja, Cajas) else len(caja)
+    id_ficha = siguiente_id(FichasMedicas)
+    id_cobro = siguiente_id(CobrosConsulta)
+    id_detalle = siguiente_id(DetallesConsulta)
+    estados = [catalogos.estados_pago[e] for e in ('pendiente', 'parcial', 'pagado')]
+
+    fichas, cobros, detalles_consulta, pagos = [], [], [], []
+    for i in range(n):
+        pac_os = rng.choice(lote.pacientes_os)
+        dia = rng.randrange(dias)
+        fecha = desde + timedelta(days=dia)
+        tratamientos = [
+            rng.choice(catalogos.tratamientos)
+            for _ in range(rng.randint(*detalles))
+        ]
+        total = sum((t.importe for t in tratamientos), Decimal('0'))
+        obra_social = (total * Decimal(rng.choice((0, 30, 50, 70))) / 100).quantize(Decimal('0.01'))
+        paciente = total - obra_social
+        estado = rng.choice(estados)
+        # Pagado por el paciente y por la obra social: en los parciales el
+        # paciente pagó la mitad de su parte y la obra social, a veces, la suya
+        por_pagador = {
+            'pendiente': (Decimal('0'), Decimal('0')),
+            'parcial': ((paciente / 2).quantize(Decimal('0.01')), rng.choice((Decimal('0'), obra_social))),
+            'pagado': (paciente, obra_social),
+        }[estado.nombre_estado]
+        pagado = sum(por_pagador)
+
+        fichas.append(FichasMedicas(
+            id_ficha_medica=id_ficha + i,
+            id_empleado=catalogos.empleado,
+            id_paciente_os_id=pac_os,
+            id_ficha_patologica_id=pac_os + desplazamiento_patologica,
+            fecha_creacion=fecha,
+            observaciones='Ficha sintética',
+        ))
+        cobros.append(CobrosConsulta(
+            id_cobro_consulta=id_cobro + i,
+            id_metodo_cobro=rng.choice(catalogos.metodos_cobro),
+            id_caja_id=caja.pk if isinstance(caja, Cajas) else caja[dia],
+            id_estado_pago=estado,
+            monto_total=total,
+            monto_obra_social=obra_social,
+            monto_paciente=paciente,
+            monto_pagado=pagado,
+            fecha_hora_cobro=timezone.make_aware(datetime.combine(fecha, time(15))) if pagado else None,
+        ))
+        for tratamiento in tratamientos:
+            detalles_consulta.append(DetallesConsulta(
+                id_detalle=id_detalle,
+                id_tratamiento=tratamiento,
+                id_cobro_consulta_id=id_cobro + i,
+                id_ficha_medica_id=id_ficha + i,
+                id_diente_id=rng.choice(catalogos.dientes),
+                id_cara=rng.choice(catalogos.caras),
+            ))
+            id_detalle += 1
+
+        for pagador, monto in zip(('paciente', 'obra_social'), por_pagador):
+            if monto:
+                pagos.append(Pagos(
+                    id_cobro_consulta_id=id_cobro + i,
+                    id_caja_id=cobros[-1].id_caja_id,
+                    pagador=pagador,
+                    id_metodo_cobro=cobros[-1].id_metodo_cobro,
+                    monto=monto,
+                    fecha_hora_pago=cobros[-1].fecha_hora_cobro,
+                ))
+
+        if len(detalles_consulta) >= LOTE:
+            _volcar_fichas(fichas, cobros, detalles_consulta, pagos)
+
+    _volcar_fichas(fichas, cobros, detalles_consulta, pagos)
+    return range(id_ficha, id_ficha + n)
+
+
+def _volcar_fichas(fichas, cobros, detalles, pagos):
+    FichasMedicas.objects.bulk_create(fichas, batch_size=LOTE)
+    CobrosConsulta.objects.bulk_create(cobros, batch_size=LOTE)
+    DetallesConsulta.objects.bulk_create(detalles, batch_size=LOTE)
+    Pagos.objects.bulk_create(pagos, batch_size=LOTE)
+    fichas.clear()
+    cobros.clear()
+    detalles.clear()
+    pagos.clear()
+
+
+def crear_turnos(n, catalogos, lote, seed=0, hasta=None, ocupacion=1.0):
+    """
+    Crea n turnos en los horarios de la agenda de los días hábiles, yendo
+    desde `hasta` (por defecto, el último día de la ventana de reservas)
+    hacia atrás; cada horario se ocupa con probabilidad `ocupacion`. Los
+    turnos futuros quedan pendientes o confirmados y los pasados atendidos
+    (algunos cancelados). bulk_create no dispara señales: después hay que
+    reconstruir el índice con turnos.agenda.reconstruir().
+    """
+    from turnos import agenda
+
+    rng = random.Random(seed)
+    hoy = timezone.localdate()
+    hasta = hasta or agenda.limite_reservas(hoy)
+    id_turno = siguiente_id(Turnos)
+    estados = catalogos.estados_turno
+    futuros = [estados['pendiente'], estados['confirmado']]
+
+    def turnos():
+        creados = 0
+        fecha = hasta
+        while creados < n:
+            if fecha.weekday() < 5:
+                for hora in agenda.HORARIOS:
+                    if creados == n:
+                        return
+                    if rng.random() >= ocupacion:
+                        continue
+                    if fecha >= hoy:
+                        estado = rng.choice(futuros)
+                    else:
+                        estado = estados['cancelado'] if rng.random() < 0.05 else estados['atendido']
+                    yield Turnos(
+                        id_turno=id_turno + creados,
+                        id_paciente_id=rng.choice(lote.pacientes),
+                        id_turno_estado=estado,
+                        asunto='Turno sintético',
+                        fecha_turno=fecha,
+                        hora_turno=hora,
+                    )
+                    creados += 1
+            fecha -= timedelta(days=1)
+
+    insertar(Turnos, turnos())
+    return range(id_turno, id_turno + n)
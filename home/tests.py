@@ -1,3 +1,59 @@
+import io
+from datetime import date, time, timedelta
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from home import estadisticas
+from home.models import EstadisticasDiarias, EstadosTurno, Pacientes, Turnos
+
+
+class PresupuestoConsultasTests(TestCase):
+    """Cada endpoint de /api/ dentro de su presupuesto de consultas (home/presupuesto_consultas.json)"""
+
+    def test_endpoints_dentro_del_presupuesto(self):
+        # Sin tiempos: la latencia depende de la máquina; el comando la
+        # controla cuando se corre a mano contra el mismo motor de base
+        salida = io.StringIO()
+        call_command('presupuesto_consultas', sin_tiempos=True, stdout=salida)
+        self.assertIn('endpoints dentro del presupuesto', salida.getvalue())
+
+
+class EstadisticasTests(TestCase):
+    """Los días consolidados se recalculan solo en las métricas que cambian"""
+
+    def setUp(self):
+        self.paciente = Pacientes.objects.create(
+            dni_paciente=30111333, nombre_paciente='Prueba', apellido_paciente='Estadisticas',
+            fecha_nacimiento=date(1990, 1, 1)
+        )
+        self.estado = EstadosTurno.objects.create(estado_turno='Pendiente')
+        hoy = timezone.localdate()
+        self.dia_a = hoy - timedelta(days=10)
+        self.dia_b = hoy - timedelta(days=5)
+        self.turno = Turnos.objects.create(
+            id_paciente=self.paciente, id_turno_estado=self.estado,
+            fecha_turno=self.dia_a, hora_turno=time(15, 0)
+        )
+        estadisticas.recalcular(self.dia_a, self.dia_b)
+
+    def _turnos(self, dia):
+        return estadisticas.suma('turnos', dia, dia)['cantidad']
+
+    def test_turno_reprogramado_recalcula_los_dos_dias(self):
+        self.assertEqual((self._turnos(self.dia_a), self._turnos(self.dia_b)), (1, 0))
+        otra = EstadisticasDiarias.objects.create(fecha=self.dia_a, metrica='egresos', clave='x', cantidad=7)
+
+        turno = Turnos.objects.get(pk=self.turno.pk)
+        turno.fecha_turno = self.dia_b
+        with self.captureOnCommitCallbacks(execute=True):
+            turno.save()
+
+        self.assertEqual((self._turnos(self.dia_a), self._turnos(self.dia_b)), (0, 1))
+        # Las demás métricas del día no se recalculan
+        self.assertTrue(EstadisticasDiarias.objects.filter(pk=otra.pk).exists())
+
+    def test_guardar_sin_cambios_no_recalcula(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Turnos.objects.get(pk=self.turno.pk).save()
+        self.assertEqual(callbacks, [])
 
-# Create your tests here.
@@ -3,9 +3,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
-from django.db.models import Q, Count, Sum
+from django.db.models import Q, Count
 from datetime import datetime, timedelta
-from home.models import Turnos, Cajas, CobrosConsulta, FichasMedicas
+from home.models import Turnos
+from caja import abierta
+from . import estadisticas
 from .serializers import TurnoDelDiaSerializer, EstadisticasHomeSerializer
 
 class HomeView(APIView):
@@ -14,7 +16,7 @@ class HomeView(APIView):
     def get(self, request):
         try:
             user_id = request.query_params.get('user_id')
-            hoy = timezone.now().date()
+            hoy = timezone.localdate()
             
             # Obtener turnos del día
             turnos_hoy = Turnos.objects.filter(
@@ -45,44 +47,30 @@ class HomeView(APIView):
     def _calcular_estadisticas(self, hoy):
         """Calcular estadísticas para el dashboard"""
         
-        # Turnos de hoy
+        # Turnos de hoy, por estado, en una sola consulta
         turnos_hoy = Turnos.objects.filter(
             Q(fecha_turno=hoy) &
             (Q(eliminado__isnull=True) | Q(eliminado=0))
+        ).aggregate(
+            total=Count('pk'),
+            pendientes=Count('pk', filter=Q(id_turno_estado__estado_turno='pendiente')),
+            atendidos=Count('pk', filter=Q(id_turno_estado__estado_turno='atendido'))
         )
         
-        # Turnos por estado
-        turnos_pendientes = turnos_hoy.filter(
-            id_turno_estado__estado_turno='pendiente'
-        ).count()
-        
-        turnos_atendidos = turnos_hoy.filter(
-            id_turno_estado__estado_turno='atendido'
-        ).count()
-        
-        # Pacientes atendidos este mes
+        # Pacientes atendidos e ingresos del mes: días cerrados desde las
+        # estadísticas diarias, el día de hoy desde los datos crudos
         inicio_mes = hoy.replace(day=1)
-        pacientes_mes = FichasMedicas.objects.filter(
-            Q(fecha_creacion__gte=inicio_mes) &
-            Q(fecha_creacion__lte=hoy) &
-            (Q(eliminado__isnull=True) | Q(eliminado=0))
-        ).values('id_paciente_os').distinct().count()
-        
-        # Ingresos del mes
-        ingresos_mes = CobrosConsulta.objects.filter(
-            Q(fecha_hora_cobro__gte=inicio_mes) &
-            Q(fecha_hora_cobro__lte=timezone.now()) &
-            (Q(eliminado__isnull=True) | Q(eliminado=0))
-        ).aggregate(Sum('monto_pagado'))['monto_pagado__sum'] or 0
+        pacientes_mes = len(estadisticas.totales('pacientes_atendidos', inicio_mes, hoy))
+        ingresos_mes = estadisticas.suma('cobros', inicio_mes, hoy)['monto']
         
         # Estado de la caja
-        caja_abierta = Cajas.objects.filter(estado_caja=1).exists()
+        caja_abierta = abierta.actual() is not None
         caja_estado = 'Abierta' if caja_abierta else 'Cerrada'
         
         return {
-            'turnos_hoy': turnos_hoy.count(),
-            'turnos_pendientes': turnos_pendientes,
-            'turnos_atendidos': turnos_atendidos,
+            'turnos_hoy': turnos_hoy['total'],
+            'turnos_pendientes': turnos_hoy['pendientes'],
+            'turnos_atendidos': turnos_hoy['atendidos'],
             'pacientes_atendidos_mes': pacientes_mes,
             'ingresos_mes': str(ingresos_mes),
             'caja_estado': caja_estado
@@ -134,10 +134,17 @@ class RecuperarContrasenaView(APIView):
                 }, status=status.HTTP_200_OK)
             
             # Verificar límite de intentos (máximo 3 códigos por hora)
+            # Cada código ocupa uno de 3 lugares con add, que fija su propio
+            # vencimiento (incr no: fuera de Redis es get + set y lo reinicia
+            # al de la caché). Con una compartida de add atómico (base de
+            # datos, Redis) dos pedidos simultáneos no toman el mismo lugar
             cache_key_attempts = f'recovery_attempts_{email}'
-            attempts = cache.get(cache_key_attempts, 0)
+            lugar_libre = any(
+                cache.add(f'{cache_key_attempts}:{n}', 1, timeout=3600)  # 1 hora
+                for n in range(3)
+            )
             
-            if attempts >= 3:
+            if not lugar_libre:
                 return Response({
                     'success': False,
                     'error': 'Demasiados intentos. Por favor espere 1 hora.'
@@ -150,9 +157,6 @@ class RecuperarContrasenaView(APIView):
             cache_key = f'recovery_code_{email}'
             cache.set(cache_key, codigo, timeout=900)  # 15 minutos
             
-            # Incrementar intentos
-            cache.set(cache_key_attempts, attempts + 1, timeout=3600)  # 1 hora
-            
             # Enviar email
             try:
                 send_mail(
@@ -317,7 +321,7 @@ class CambiarContrasenaView(APIView):
             # Eliminar código usado
             cache.delete(cache_key)
             cache_key_attempts = f'recovery_attempts_{email}'
-            cache.delete(cache_key_attempts)
+            cache.delete_many([f'{cache_key_attempts}:{n}' for n in range(3)])
 
             return Response({'success': True, 'message': 'Contraseña cambiada exitosamente'}, status=status.HTTP_200_OK)
 
@@ -0,0 +1,202 @@
+"""
+Búsqueda de pacientes por DNI, apellido y nombre.
+
+Cada paciente tiene una fila en PacienteBusqueda (DNI como texto y
+apellido + nombre normalizados) y sus trigramas en PacienteTrigrama. El
+índice se actualiza con las señales de Pacientes; los inserts masivos que
+no disparan señales deben llamar a indexar() o reindexar().
+
+- Si la búsqueda es solo numérica (se ignoran puntos y espacios) se busca
+  el DNI exacto y luego los que empiezan con esos dígitos.
+- Si tiene texto, cada palabra debe aparecer en el apellido o nombre
+  normalizados (como el icontains de antes, pero por palabra) y cada
+  número debe ser comienzo del DNI. Con alguna palabra de 3 o más letras
+  los candidatos salen de la lista de pacientes del trigrama menos
+  frecuente de esas palabras; con palabras más cortas se recorre la tabla
+  de búsqueda (angosta, sin JOIN), así "ez" sigue encontrando a todos los
+  Pérez y González. La verificación, el orden (primero los que tienen
+  palabras que empiezan con lo buscado, después alfabético) y el límite se
+  resuelven en la base; el total, en la misma consulta cuando hay
+  candidatos del trigrama.
+"""
+import unicodedata
+from django.db import connection, transaction
+from django.db.models import Case, Count, IntegerField, Q, Value, When, Window
+from django.db.models.signals import post_delete, post_save
+from home.models import Pacientes
+from .models import PacienteBusqueda, PacienteTrigrama
+
+LIMITE_RESULTADOS = 200
+LOTE = 2000
+
+# Relleno de los trigramas al inicio y fin de palabra. No se usa espacio
+# porque las colaciones PAD SPACE de MySQL ignoran los espacios finales.
+RELLENO = '_'
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos, y todo lo que no sea letra o dígito como espacio"""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).lower()
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in texto).split())
+
+
+def trigramas(texto):
+    """Trigramas de cada palabra, con dos caracteres de relleno al inicio y uno al final"""
+    resultado = set()
+    for palabra in normalizar(texto).split():
+        p = RELLENO * 2 + palabra + RELLENO
+        resultado.update(p[i:i + 3] for i in range(len(p) - 2))
+    return resultado
+
+
+def _fila(paciente):
+    return PacienteBusqueda(
+        id_paciente_id=paciente.pk,
+        dni=str(paciente.dni_paciente or ''),
+        texto=normalizar(f'{paciente.apellido_paciente} {paciente.nombre_paciente}')[:120],
+        activo=paciente.eliminado is None,
+    )
+
+
+def indexar(pacientes):
+    """Reemplaza las entradas del índice de los pacientes dados"""
+    pacientes = list(pacientes)
+    ids = [p.pk for p in pacientes]
+    with transaction.atomic():
+        PacienteTrigrama.objects.filter(id_paciente__in=ids).delete()
+        PacienteBusqueda.objects.filter(id_paciente__in=ids).delete()
+        PacienteBusqueda.objects.bulk_create([_fila(p) for p in pacientes], batch_size=LOTE)
+        PacienteTrigrama.objects.bulk_create([
+            PacienteTrigrama(id_paciente_id=p.pk, trigrama=t)
+            for p in pacientes if p.eliminado is None
+            for t in trigramas(f'{p.apellido_paciente} {p.nombre_paciente}')
+        ], batch_size=LOTE)
+
+
+def reindexar(pacientes=None):
+    """Reconstruye el índice (de todos los pacientes, o del queryset dado) en lotes"""
+    if pacientes is None:
+        pacientes = Pacientes.objects.all()
+    campos = ('id_paciente', 'dni_paciente', 'apellido_paciente', 'nombre_paciente', 'eliminado')
+    lote, total = [], 0
+    for paciente in pacientes.only(*campos).order_by('pk').iterator(chunk_size=LOTE):
+        lote.append(paciente)
+        if len(lote) >= LOTE:
+            indexar(lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        indexar(lote)
+        total += len(lote)
+    return total
+
+
+def _total(consulta, ids, limite):
+    """Total de coincidencias: si no se llegó al límite son las encontradas"""
+    return len(ids) if len(ids) < limite else consulta.count()
+
+
+def _buscar_dni(digitos, limite):
+    # Rango [digitos, digitos + ':') = DNI que empiezan con esos dígitos
+    # (':' sigue a '9' en ASCII); el exacto queda primero al ordenar
+    consulta = PacienteBusqueda.objects.filter(activo=True, dni__gte=digitos, dni__lt=digitos + ':')
+    ids = list(consulta.order_by('dni', 'id_paciente').values_list('id_paciente', flat=True)[:limite])
+    return ids, _total(consulta, ids, limite)
+
+
+def _candidatos(palabras):
+    """
+    Subconsulta con los pacientes que tienen el trigrama menos frecuente de
+    las palabras de 3 o más letras (None si no hay palabras así). Todos los
+    trigramas deben existir: si falta alguno no hay coincidencias (False).
+    """
+    requeridos = {p[i:i + 3] for p in palabras if len(p) >= 3 for i in range(len(p) - 2)}
+    if not requeridos:
+        return None
+    frecuencias = dict(
+        PacienteTrigrama.objects.filter(trigrama__in=requeridos)
+        .values('trigrama').annotate(cantidad=Count('pk')).order_by()
+        .values_list('trigrama', 'cantidad')
+    )
+    if len(frecuencias) < len(requeridos):
+        return False
+    trigrama = min(frecuencias, key=lambda t: (frecuencias[t], t))
+    return PacienteTrigrama.objects.filter(trigrama=trigrama).values('id_paciente')
+
+
+def _puntaje(palabras):
+    """Cantidad de palabras buscadas que son comienzo de una palabra del paciente"""
+    return sum(
+        (
+            Case(
+                When(Q(texto__startswith=p) | Q(texto__contains=' ' + p), then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField()
+            )
+            for p in palabras
+        ),
+        Value(0)
+    )
+
+
+def _buscar_texto(palabras, prefijos_dni, limite):
+    candidatos = _candidatos(palabras)
+    if candidatos is False:
+        return [], 0
+    consulta = PacienteBusqueda.objects.filter(activo=True)
+    if candidatos is not None:
+        consulta = consulta.filter(id_paciente__in=candidatos)
+    for palabra in palabras:
+        consulta = consulta.filter(texto__contains=palabra)
+    for digitos in prefijos_dni:
+        consulta = consulta.filter(dni__startswith=digitos)
+    ordenada = consulta.annotate(puntaje=_puntaje(palabras)).order_by('-puntaje', 'texto', 'id_paciente')
+
+    # Con los candidatos del trigrama el total sale en la misma consulta (la
+    # ventana se calcula antes del LIMIT). Sin ellos las coincidencias pueden
+    # ser media tabla y contar aparte es más barato que la ventana.
+    if candidatos is None or not connection.features.supports_over_clause:
+        ids = list(ordenada.values_list('id_paciente', flat=True)[:limite])
+        return ids, _total(consulta, ids, limite)
+    filas = list(ordenada.annotate(total=Window(Count('*'))).values_list('id_paciente', 'total')[:limite])
+    return [pk for pk, _ in filas], (filas[0][1] if filas else 0)
+
+
+def buscar(texto, limite=LIMITE_RESULTADOS):
+    """
+    (ids, total): los ids de hasta `limite` pacientes activos que coinciden
+    con la búsqueda, del más relevante al menos, y la cantidad total de
+    coincidencias.
+    """
+    palabras = normalizar(texto).split()
+    if not palabras:
+        return [], 0
+    numeros = [p for p in palabras if p.isdigit()]
+    letras = [p for p in palabras if not p.isdigit()]
+    if not letras:
+        return _buscar_dni(''.join(numeros), limite)
+    return _buscar_texto(letras, numeros, limite)
+
+
+def buscar_pacientes(texto, queryset=None, limite=LIMITE_RESULTADOS):
+    """Como buscar(), pero con las instancias de Pacientes en orden de relevancia"""
+    ids, total = buscar(texto, limite)
+    if queryset is None:
+        queryset = Pacientes.objects.all()
+    por_id = queryset.in_bulk(ids)
+    return [por_id[pk] for pk in ids if pk in por_id], total
+
+
+def _al_guardar(sender, instance, **kwargs):
+    indexar([instance])
+
+
+def _al_eliminar(sender, instance, **kwargs):
+    PacienteTrigrama.objects.filter(id_paciente=instance.pk).delete()
+    PacienteBusqueda.objects.filter(id_paciente=instance.pk).delete()
+
+
+def conectar_senales():
+    post_save.connect(_al_guardar, sender=Pacientes, dispatch_uid='pacientes_busqueda_save')
+    post_delete.connect(_al_eliminar, sender=Pacientes, dispatch_uid='pacientes_busqueda_delete')
@@ -0,0 +1,188 @@
+"""
+Cuentas a cobrar de los pacientes.
+
+Cada cobro con deuda del paciente tiene una fila en DeudasPaciente con el
+saldo (monto_paciente menos la suma de los pagos hechos por el paciente;
+lo que pague la obra social no cuenta), el estado ('pendiente' si el
+paciente no pagó nada, 'parcial' si no) y la fecha de la ficha.
+La fila se actualiza en la misma transacción que crea el cobro
+(ficha_medica) o le registra un pago (caja.pagos), y se borra cuando el
+cobro queda saldado o se elimina la ficha. Las cargas masivas que no pasan
+por ahí deben llamar a reconstruir().
+
+El informe de antigüedad agrupa todas las deudas de la clínica por tramo
+en una sola consulta; con id_paciente es el saldo de ese paciente, leído
+del índice (id_paciente, estado).
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, CharField, Count, Min, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from caja.models import Pagos
+from home.models import DetallesConsulta
+from .models import DeudasPaciente
+
+PENDIENTE = 'pendiente'
+PARCIAL = 'parcial'
+CERO = Decimal('0.00')
+LOTE = 2000
+
+# (tramo, días máximos de antigüedad); lo que supera el último es MAS_DE_90
+TRAMOS = (('0-30', 30), ('31-60', 60), ('61-90', 90))
+MAS_DE_90 = '90+'
+
+
+def saldo_de(cobro, pagado_paciente=CERO):
+    """Parte del paciente que falta pagar del cobro, dado lo que ya pagó el paciente"""
+    # Un cobro recién creado puede traer los montos como float o int
+    return max(Decimal(str(cobro.monto_paciente)) - Decimal(str(pagado_paciente)), CERO)
+
+
+def _estado(pagado_paciente):
+    return PENDIENTE if pagado_paciente == 0 else PARCIAL
+
+
+def registrar_cobro(cobro, ficha):
+    """Agrega la deuda de un cobro recién creado (sin pagos) para la ficha, si el paciente paga algo"""
+    saldo = saldo_de(cobro)
+    if saldo:
+        DeudasPaciente.objects.create(
+            id_cobro_consulta=cobro,
+            id_paciente_id=ficha.id_paciente_os.id_paciente_id,
+            fecha=ficha.fecha_creacion,
+            estado=PENDIENTE,
+            saldo=saldo
+        )
+
+
+def actualizar(cobro, pagado_paciente):
+    """
+    Actualiza la deuda después de un pago del cobro; `pagado_paciente` es el
+    total pagado por el paciente, ya con el pago nuevo. Debe llamarse en la
+    misma transacción que el pago.
+    """
+    saldo = saldo_de(cobro, pagado_paciente)
+    if not saldo:
+        DeudasPaciente.objects.filter(id_cobro_consulta=cobro.pk).delete()
+    elif not DeudasPaciente.objects.filter(id_cobro_consulta=cobro.pk).update(
+        estado=_estado(pagado_paciente), saldo=saldo
+    ):
+        # Cobro que no estaba en el índice (p. ej. cargado por SQL)
+        reconstruir(cobros=[cobro.pk])
+
+
+def descartar_ficha(ficha):
+    """Quita las deudas de los cobros de una ficha eliminada"""
+    DeudasPaciente.objects.filter(
+        id_cobro_consulta__in=DetallesConsulta.objects.filter(id_ficha_medica=ficha).values('id_cobro_consulta')
+    ).delete()
+
+
+def _pagado_paciente(cobros=None):
+    """{id_cobro: total pagado por el paciente}, en una consulta agrupada"""
+    pagos = Pagos.objects.filter(pagador=Pagos.PACIENTE)
+    if cobros is not None:
+        pagos = pagos.filter(id_cobro_consulta__in=cobros)
+    return dict(
+        pagos.values('id_cobro_consulta').annotate(total=Sum('monto')).order_by()
+        .values_list('id_cobro_consulta', 'total')
+    )
+
+
+def _calcular(cobros=None):
+    """Deudas calculadas desde los cobros y los pagos del paciente, con paciente y fecha de su ficha"""
+    pagado = _pagado_paciente(cobros)
+    detalles = DetallesConsulta.objects.filter(
+        Q(id_ficha_medica__eliminado__isnull=True) | Q(id_ficha_medica__eliminado=0),
+        Q(id_cobro_consulta__eliminado__isnull=True) | Q(id_cobro_consulta__eliminado=0),
+        id_cobro_consulta__monto_paciente__gt=0
+    )
+    if cobros is not None:
+        detalles = detalles.filter(id_cobro_consulta__in=cobros)
+    filas = (
+        detalles
+        .values('id_cobro_consulta', 'id_cobro_consulta__monto_paciente')
+        .annotate(
+            paciente=Min('id_ficha_medica__id_paciente_os__id_paciente'),
+            fecha=Min('id_ficha_medica__fecha_creacion')
+        )
+        .order_by()
+    )
+    for f in filas.iterator(chunk_size=LOTE):
+        pagado_paciente = pagado.get(f['id_cobro_consulta'], CERO)
+        saldo = f['id_cobro_consulta__monto_paciente'] - pagado_paciente
+        if saldo > 0:
+            yield DeudasPaciente(
+                id_cobro_consulta_id=f['id_cobro_consulta'],
+                id_paciente_id=f['paciente'],
+                fecha=f['fecha'],
+                estado=_estado(pagado_paciente),
+                saldo=saldo
+            )
+
+
+@transaction.atomic
+def reconstruir(cobros=None):
+    """Rehace el índice desde los cobros (todos o los ids de `cobros`). Devuelve la cantidad de filas"""
+    existentes = DeudasPaciente.objects.all()
+    if cobros is not None:
+        existentes = existentes.filter(id_cobro_consulta__in=cobros)
+    existentes.delete()
+    total = 0
+    lote = []
+    for deuda in _calcular(cobros):
+        lote.append(deuda)
+        if len(lote) >= LOTE:
+            DeudasPaciente.objects.bulk_create(lote)
+            total += len(lote)
+            lote.clear()
+    DeudasPaciente.objects.bulk_create(lote)
+    return total + len(lote)
+
+
+def tiene_deuda(paciente):
+    return DeudasPaciente.objects.filter(id_paciente=paciente).exists()
+
+
+def _tramo(hoy):
+    return Case(
+        *[When(fecha__gte=hoy - timedelta(days=dias), then=Value(nombre)) for nombre, dias in TRAMOS],
+        default=Value(MAS_DE_90),
+        output_field=CharField()
+    )
+
+
+def antiguedad(hoy=None, id_paciente=None):
+    """
+    Saldos a cobrar a pacientes por antigüedad (días desde la ficha), todos
+    los tramos en una consulta agrupada. Devuelve un dict por tramo, en orden
+    y con ceros en los tramos sin deudas.
+    """
+    hoy = hoy or timezone.localdate()
+    deudas = DeudasPaciente.objects.all()
+    if id_paciente:
+        deudas = deudas.filter(id_paciente=id_paciente)
+    filas = {
+        f['tramo']: f
+        for f in deudas.annotate(tramo=_tramo(hoy)).values('tramo').annotate(
+            cobros=Count('pk'),
+            pacientes=Count('id_paciente', distinct=True),
+            pendiente=Coalesce(Sum('saldo', filter=Q(estado=PENDIENTE)), Value(CERO)),
+            parcial=Coalesce(Sum('saldo', filter=Q(estado=PARCIAL)), Value(CERO)),
+        ).order_by()
+    }
+
+    resultado = []
+    for nombre in [t for t, _ in TRAMOS] + [MAS_DE_90]:
+        fila = filas.get(nombre, {'cobros': 0, 'pacientes': 0, 'pendiente': CERO, 'parcial': CERO})
+        resultado.append({
+            'tramo': nombre,
+            'cobros': fila['cobros'],
+            'pacientes': fila['pacientes'],
+            'pendiente': fila['pendiente'],
+            'parcial': fila['parcial'],
+            'total': fila['pendiente'] + fila['parcial'],
+        })
+    return resultado
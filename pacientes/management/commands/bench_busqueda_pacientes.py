@@ -0,0 +1,85 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from home import sintetico
+from home.models import Pacientes
+from pacientes import busqueda
+
+class ContadorConsultas:
+    """execute_wrapper que cuenta las consultas (no depende del log de 9000 de Django)"""
+    def __init__(self):
+        self.cantidad = 0
+
+    def __call__(self, ejecutar, sql, params, many, context):
+        self.cantidad += 1
+        return ejecutar(sql, params, many, context)
+
+
+CONSULTAS = ['gonzalez', 'maria', 'gomez jua', 'ez', 'rodrig', 'lopez m', '3012', '30123456', 'nuñez ines']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la búsqueda indexada de pacientes con el filtro icontains '
+        'sobre datos sintéticos. Los datos se crean dentro de una transacción '
+        'que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pacientes', type=int, default=200_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument(
+            '--max-ms', type=float, default=150,
+            help='Mediana máxima permitida por búsqueda indexada, en milisegundos'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            resultados = self._medir(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{"búsqueda":<14}{"índice ms":>11}{"consultas":>11}{"icontains ms":>14}{"resultados":>12}')
+        peor = 0
+        for consulta, ms, consultas, ms_icontains, cantidad in resultados:
+            peor = max(peor, ms)
+            self.stdout.write(f'{consulta:<14}{ms:>11.1f}{consultas:>11}{ms_icontains:>14.1f}{cantidad:>12}')
+
+        if peor > options['max_ms']:
+            raise CommandError(f'Presupuesto excedido: {peor:.1f} ms (máximo {options["max_ms"]:.0f} ms)')
+        self.stdout.write(self.style.SUCCESS('Dentro del presupuesto.'))
+
+    def _medir(self, options):
+        catalogos = sintetico.asegurar_catalogos()
+        lote = sintetico.crear_pacientes(options['pacientes'], catalogos, seed=options['seed'])
+        inicio = time.perf_counter()
+        busqueda.reindexar(Pacientes.objects.filter(id_paciente__in=lote.pacientes))
+        self.stdout.write(
+            f'{len(lote.pacientes)} pacientes indexados en {time.perf_counter() - inicio:.1f} s'
+        )
+
+        resultados = []
+        for consulta in CONSULTAS:
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                contador = ContadorConsultas()
+                with connection.execute_wrapper(contador):
+                    t0 = time.perf_counter()
+                    encontrados, _ = busqueda.buscar_pacientes(consulta)
+                    tiempos.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            list(Pacientes.objects.filter(eliminado__isnull=True).filter(
+                Q(dni_paciente__icontains=consulta) |
+                Q(nombre_paciente__icontains=consulta) |
+                Q(apellido_paciente__icontains=consulta)
+            ).order_by('apellido_paciente', 'nombre_paciente'))
+            ms_icontains = (time.perf_counter() - t0) * 1000
+
+            resultados.append((
+                consulta, statistics.median(tiempos), contador.cantidad,
+                ms_icontains, len(encontrados)
+            ))
+        return resultados
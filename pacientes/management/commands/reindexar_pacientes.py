@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from home.models import Pacientes
+from pacientes.busqueda import reindexar
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de pacientes (DNI, apellido y nombre).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde-id', type=int, help='Reindexar solo pacientes con id mayor o igual')
+
+    def handle(self, *args, **options):
+        pacientes = Pacientes.objects.all()
+        if options['desde_id']:
+            pacientes = pacientes.filter(id_paciente__gte=options['desde_id'])
+
+        inicio = time.perf_counter()
+        total = reindexar(pacientes)
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f'{total} pacientes indexados en {segundos:.1f} s.'))
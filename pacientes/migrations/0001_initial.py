@@ -0,0 +1,93 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:51
+
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LOTE = 2000
+RELLENO = '_'
+
+
+# Copias de pacientes.busqueda.normalizar y trigramas al crear el índice:
+# la migración no depende de cómo cambien después
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or '')).lower()
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in texto).split())
+
+
+def trigramas(texto):
+    resultado = set()
+    for palabra in normalizar(texto).split():
+        p = RELLENO * 2 + palabra + RELLENO
+        resultado.update(p[i:i + 3] for i in range(len(p) - 2))
+    return resultado
+
+
+def poblar_indice(apps, schema_editor):
+    Pacientes = apps.get_model('home', 'Pacientes')
+    PacienteBusqueda = apps.get_model('pacientes', 'PacienteBusqueda')
+    PacienteTrigrama = apps.get_model('pacientes', 'PacienteTrigrama')
+
+    def indexar(lote):
+        PacienteBusqueda.objects.bulk_create([
+            PacienteBusqueda(
+                id_paciente_id=p.pk,
+                dni=str(p.dni_paciente or ''),
+                texto=normalizar(f'{p.apellido_paciente} {p.nombre_paciente}')[:120],
+                activo=p.eliminado is None,
+            )
+            for p in lote
+        ], batch_size=LOTE)
+        PacienteTrigrama.objects.bulk_create([
+            PacienteTrigrama(id_paciente_id=p.pk, trigrama=t)
+            for p in lote if p.eliminado is None
+            for t in trigramas(f'{p.apellido_paciente} {p.nombre_paciente}')
+        ], batch_size=LOTE)
+
+    campos = ('id_paciente', 'dni_paciente', 'apellido_paciente', 'nombre_paciente', 'eliminado')
+    lote = []
+    for paciente in Pacientes.objects.only(*campos).order_by('pk').iterator(chunk_size=LOTE):
+        lote.append(paciente)
+        if len(lote) >= LOTE:
+            indexar(lote)
+            lote = []
+    indexar(lote)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('home', '0002_indices_listados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PacienteBusqueda',
+            fields=[
+                ('id_paciente', models.OneToOneField(db_column='id_paciente', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, serialize=False, to='home.pacientes')),
+                ('dni', models.CharField(db_index=True, max_length=20)),
+                ('texto', models.CharField(max_length=120)),
+                ('activo', models.BooleanField(default=True)),
+            ],
+            options={
+                'db_table': 'pacientes_busqueda',
+            },
+        ),
+        migrations.CreateModel(
+            name='PacienteTrigrama',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('id_paciente', models.ForeignKey(db_column='id_paciente', on_delete=django.db.models.deletion.DO_NOTHING, to='home.pacientes')),
+            ],
+            options={
+                'db_table': 'pacientes_trigramas',
+                'indexes': [models.Index(fields=['trigrama', 'id_paciente'], name='pacientes_trigrama_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Una fila por cobro con deuda del paciente, con el paciente y la fecha de
+# su ficha (un cobro es de una sola ficha). El saldo descuenta solo los
+# pagos del paciente (caja.Pagos con pagador 'paciente'). Los modelos
+# históricos de home no tienen las claves foráneas, por eso va en SQL.
+DEUDAS_EXISTENTES = """
+    INSERT INTO deudas_paciente (id_cobro_consulta, id_paciente, fecha, estado, saldo)
+    SELECT c.id_cobro_consulta, MIN(px.id_paciente), MIN(f.fecha_creacion),
+           CASE WHEN COALESCE(p.pagado, 0) = 0 THEN 'pendiente' ELSE 'parcial' END,
+           c.monto_paciente - COALESCE(p.pagado, 0)
+    FROM cobros_consulta c
+    JOIN detalles_consulta d ON d.id_cobro_consulta = c.id_cobro_consulta
+    JOIN fichas_medicas f ON f.id_ficha_medica = d.id_ficha_medica
+    JOIN pacientes_x_os px ON px.id_paciente_os = f.id_paciente_os
+    LEFT JOIN (
+        SELECT id_cobro_consulta, SUM(monto) AS pagado
+        FROM pagos
+        WHERE pagador = 'paciente'
+        GROUP BY id_cobro_consulta
+    ) p ON p.id_cobro_consulta = c.id_cobro_consulta
+    WHERE c.monto_paciente > COALESCE(p.pagado, 0)
+      AND (c.eliminado IS NULL OR c.eliminado = 0)
+      AND (f.eliminado IS NULL OR f.eliminado = 0)
+    GROUP BY c.id_cobro_consulta, c.monto_paciente, p.pagado
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0003_pagos'),
+        ('home', '0004_indices_movimientos'),
+        ('pacientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeudasPaciente',
+            fields=[
+                ('id_cobro_consulta', models.OneToOneField(db_column='id_cobro_consulta', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, serialize=False, to='home.cobrosconsulta')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(max_length=10)),
+                ('saldo', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('id_paciente', models.ForeignKey(db_column='id_paciente', on_delete=django.db.models.deletion.DO_NOTHING, to='home.pacientes')),
+            ],
+            options={
+                'db_table': 'deudas_paciente',
+                'indexes': [models.Index(fields=['id_paciente', 'estado'], name='deudas_paciente_idx'), models.Index(fields=['fecha'], name='deudas_fecha_idx')],
+            },
+        ),
+        migrations.RunSQL(DEUDAS_EXISTENTES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,51 @@
+from django.db import models
+
+
+class PacienteBusqueda(models.Model):
+    """
+    Datos normalizados de cada paciente para la búsqueda: DNI como texto
+    (para buscar por prefijo con el índice) y apellido + nombre en
+    minúsculas y sin acentos. Se mantiene desde pacientes.busqueda.
+    """
+    id_paciente = models.OneToOneField('home.Pacientes', models.DO_NOTHING, primary_key=True, db_column='id_paciente')
+    dni = models.CharField(max_length=20, db_index=True)
+    texto = models.CharField(max_length=120)
+    activo = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = 'pacientes_busqueda'
+
+
+class PacienteTrigrama(models.Model):
+    """Trigramas de las palabras de apellido y nombre de los pacientes activos"""
+    id_paciente = models.ForeignKey('home.Pacientes', models.DO_NOTHING, db_column='id_paciente')
+    trigrama = models.CharField(max_length=3)
+
+    class Meta:
+        db_table = 'pacientes_trigramas'
+        indexes = [
+            models.Index(fields=['trigrama', 'id_paciente'], name='pacientes_trigrama_idx'),
+        ]
+
+
+class DeudasPaciente(models.Model):
+    """
+    Saldo a cargo del paciente de cada cobro que todavía debe: monto_paciente
+    menos lo pagado de esa parte. Los cobros saldados no tienen fila. Se
+    mantiene desde pacientes.deudas en la misma transacción que el cobro.
+    """
+    id_cobro_consulta = models.OneToOneField(
+        'home.CobrosConsulta', models.DO_NOTHING, primary_key=True, db_column='id_cobro_consulta'
+    )
+    id_paciente = models.ForeignKey('home.Pacientes', models.DO_NOTHING, db_column='id_paciente')
+    # Fecha de la ficha, para la antigüedad de la deuda
+    fecha = models.DateField()
+    estado = models.CharField(max_length=10)
+    saldo = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        db_table = 'deudas_paciente'
+        indexes = [
+            models.Index(fields=['id_paciente', 'estado'], name='deudas_paciente_idx'),
+            models.Index(fields=['fecha'], name='deudas_fecha_idx'),
+        ]
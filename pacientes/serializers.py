@@ -3,6 +3,7 @@ from home.models import (
     Pacientes, PacientesXOs, ObrasSociales, 
     FichasPatologicas, Parentesco, FichasMedicas
 )
+from pacientes import deudas
 
 # --- LISTA PRINCIPAL ---
 class PacienteListSerializer(serializers.ModelSerializer):
@@ -158,8 +159,6 @@ class PacienteDetailSerializer(serializers.ModelSerializer):
             eliminado__isnull=True
         ).exists()
 
-        # Aquí podrías agregar chequeo de deudas si tienes un modelo de pagos
-        # ejemplo: tiene_deuda = Pagos.objects.filter(paciente=obj, estado='pendiente').exists()
-        tiene_deuda = False  # <- cambiar según tu modelo de pagos
+        tiene_deuda = deudas.tiene_deuda(obj)
 
         return not (tiene_fichas or tiene_obras or tiene_deuda)
@@ -1,3 +1,49 @@
+from datetime import date
 from django.test import TestCase
+from home.models import Pacientes
+from pacientes import busqueda
 
-# Create your tests here.
+
+class BusquedaPacientesTests(TestCase):
+    """La búsqueda indexada encuentra lo mismo que el icontains de antes, por palabra"""
+
+    def setUp(self):
+        datos = [
+            (30111222, 'Pérez', 'Juan'),
+            (30111333, 'González', 'María'),
+            (30222444, 'Gómez', 'Inés'),
+            (31555666, 'Ezeiza', 'Ana'),
+        ]
+        for dni, apellido, nombre in datos:
+            Pacientes.objects.create(
+                dni_paciente=dni, apellido_paciente=apellido, nombre_paciente=nombre,
+                fecha_nacimiento=date(1990, 1, 1)
+            )
+
+    def _apellidos(self, texto):
+        pacientes, total = busqueda.buscar_pacientes(texto)
+        self.assertEqual(total, len(pacientes))
+        return [p.apellido_paciente for p in pacientes]
+
+    def test_subcadena_corta_sin_trigramas(self):
+        # "ez" no llega a un trigrama: se recorre la tabla de búsqueda y los
+        # que tienen una palabra que empieza con "ez" van primero
+        self.assertEqual(self._apellidos('ez'), ['Ezeiza', 'Gómez', 'González', 'Pérez'])
+        self.assertEqual(self._apellidos('ma ez'), ['González'])
+
+    def test_palabras_con_trigramas_y_prefijo_de_dni(self):
+        self.assertEqual(self._apellidos('gonza'), ['González'])
+        self.assertEqual(self._apellidos('nez ines'), [])
+        self.assertEqual(self._apellidos('GOMEZ in'), ['Gómez'])
+        self.assertEqual(self._apellidos('perez 3011'), ['Pérez'])
+        self.assertEqual(self._apellidos('perez 3022'), [])
+
+    def test_solo_dni(self):
+        self.assertEqual(self._apellidos('30.111'), ['Pérez', 'González'])
+        self.assertEqual(self._apellidos('30111333'), ['González'])
+
+    def test_paciente_eliminado_no_aparece(self):
+        paciente = Pacientes.objects.get(dni_paciente=31555666)
+        paciente.eliminado = 1
+        paciente.save()
+        self.assertEqual(self._apellidos('ez'), ['Gómez', 'González', 'Pérez'])
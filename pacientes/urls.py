@@ -5,7 +5,8 @@ from .views import (
     PacienteDetailView,
     PacienteObraSocialView,
     ObrasSocialesListView,
-    PacienteFichaPatologicaView  # ← AGREGAR
+    PacienteFichaPatologicaView,  # ← AGREGAR
+    DeudasAntiguedadView
 )
 
 urlpatterns = [
@@ -24,4 +25,7 @@ urlpatterns = [
     
     # Lista de obras sociales disponibles
     path('obras-sociales/disponibles/', ObrasSocialesListView.as_view(), name='obras-sociales-list'),
+    
+    # Cuentas a cobrar por antigüedad
+    path('deudas/antiguedad/', DeudasAntiguedadView.as_view(), name='deudas-antiguedad'),
 ]
\ No newline at end of file
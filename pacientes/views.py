@@ -5,6 +5,9 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
 from home.models import Pacientes, PacientesXOs, ObrasSociales, FichasPatologicas, Parentesco
+from home import catalogos
+from home.paginacion import paginar, CursorInvalido
+from pacientes import busqueda, deudas
 from pacientes.serializers import (
     PacienteListSerializer,
     PacienteCreateUpdateSerializer,
@@ -24,22 +27,25 @@ class PacienteListCreateView(APIView):
             
             pacientes = Pacientes.objects.filter(eliminado__isnull=True)
             
-            # Búsqueda por DNI, nombre o apellido
-            if search:
-                pacientes = pacientes.filter(
-                    Q(dni_paciente__icontains=search) |
-                    Q(nombre_paciente__icontains=search) |
-                    Q(apellido_paciente__icontains=search)
-                )
-            
-            pacientes = pacientes.order_by('apellido_paciente', 'nombre_paciente')
+            # Búsqueda por DNI, nombre o apellido (índice de búsqueda, por relevancia)
+            if search.strip():
+                encontrados, total = busqueda.buscar_pacientes(search, pacientes)
+                data = PacienteListSerializer(encontrados, many=True).data
+                return Response({
+                    'success': True,
+                    'data': data,
+                    'total': total
+                })
             
-            serializer = PacienteListSerializer(pacientes, many=True)
+            return Response(paginar(
+                request, pacientes, ['apellido_paciente', 'nombre_paciente'],
+                lambda filas: PacienteListSerializer(filas, many=True).data
+            ))
+        except CursorInvalido as e:
             return Response({
-                'success': True,
-                'data': serializer.data,
-                'total': pacientes.count()
-            })
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 'success': False,
@@ -387,10 +393,10 @@ class PacienteFichaPatologicaView(APIView):
         )
         
         # Buscar parentesco "Titular"
-        parentesco_titular, created = Parentesco.objects.get_or_create(
-            tipo_parentesco='Titular',
-            defaults={'eliminado': None}
-        )
+        try:
+            parentesco_titular = catalogos.parentescos.obtener_por_nombre('Titular')
+        except Parentesco.DoesNotExist:
+            parentesco_titular = Parentesco.objects.create(tipo_parentesco='Titular', eliminado=None)
         
         # Crear relación automática
         pac_os = PacientesXOs.objects.create(
@@ -401,4 +407,31 @@ class PacienteFichaPatologicaView(APIView):
             titular=f"{paciente.nombre_paciente} {paciente.apellido_paciente}"
         )
         
-        return pac_os
\ No newline at end of file
+        return pac_os
+
+
+class DeudasAntiguedadView(APIView):
+    """
+    Saldos a cobrar a pacientes por antigüedad (0-30, 31-60, 61-90 y más de
+    90 días desde la ficha), separados en pendiente y parcial. Con
+    id_paciente, solo las deudas de ese paciente.
+    """
+
+    def get(self, request):
+        try:
+            tramos = deudas.antiguedad(id_paciente=request.query_params.get('id_paciente'))
+            return Response({
+                'success': True,
+                'data': tramos,
+                'resumen_total': {
+                    'cobros': sum(t['cobros'] for t in tramos),
+                    'pendiente': sum((t['pendiente'] for t in tramos), deudas.CERO),
+                    'parcial': sum((t['parcial'] for t in tramos), deudas.CERO),
+                    'total': sum((t['total'] for t in tramos), deudas.CERO),
+                }
+            })
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
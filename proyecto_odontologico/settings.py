@@ -62,6 +62,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'home.perfilado.PerfiladoConsultasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -195,11 +196,65 @@ SIMPLE_JWT = {
 }
 
 # Configuración de caché para códigos de recuperación
+# Caché en dos niveles (ver home/cache.py): un LRU en memoria de cada proceso
+# delante de la caché compartida entre procesos. Las claves de SOLO_COMPARTIDA
+# se leen siempre de la compartida (códigos de recuperación, versiones de los
+# catálogos, caja abierta), porque no toleran la demora de las copias locales.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
-        'LOCATION': 'cache_table',
-    }
+        'BACKEND': 'home.cache.CacheEscalonada',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'COMPARTIDA': 'compartida',
+            'MAX_LOCAL': 1000,
+            'SEGUNDOS_LOCAL': 5,
+            'SOLO_COMPARTIDA': ['recovery_', 'catalogos:version:', 'caja:abierta'],
+        },
+    },
+    # En archivos, add e incr no son atómicos entre procesos (dos pedidos
+    # simultáneos pueden pasar el límite de códigos de recuperación) y los
+    # archivos no se comparten entre servidores. Para que lo sean conviene
+    # la base de datos ('django.core.cache.backends.db.DatabaseCache', con
+    # manage.py createcachetable; atómico en add) o Redis (add e incr;
+    # requiere el paquete redis):
+    #     'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+    #     'LOCATION': 'redis://127.0.0.1:6379/1',
+    'compartida': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache_compartida',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Cada cuántos segundos un proceso revisa si otro modificó los catálogos
+# (caras, dientes, métodos de cobro, estados, parentescos, tratamientos)
+CATALOGOS_VERIFICACION_SEGUNDOS = 5
+
+# PDF de fichas médicas y odontogramas ya generados (ver ficha_medica/cache_pdf.py)
+PDF_CACHE_DIR = BASE_DIR / 'cache_pdf'
+# Procesos para dibujar las exportaciones por lote (None: hasta 4 según los CPU)
+PDF_EXPORTACION_PROCESOS = None
+
+# Crea las tablas de home (no administradas) en la base de pruebas (ver home/pruebas.py)
+TEST_RUNNER = 'home.pruebas.EjecutorPruebas'
+
+# Perfilado de consultas SQL por request (ver home/perfilado.py): siempre, o
+# solo los requests con la cabecera "X-Perfilar: 1" si PERFILADO_CABECERA
+PERFILADO_CONSULTAS = False
+PERFILADO_CABECERA = DEBUG
+# Una misma consulta repetida más veces que esto se informa como N+1
+PERFILADO_REPETICIONES_MAX = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'perfilado': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
 # Configuración de email para desarrollo (puedes usar Gmail, Outlook, etc)
@@ -0,0 +1,245 @@
+"""
+Índice de ocupación de la agenda de turnos.
+
+Cada día con turnos tiene una fila en OcupacionDia con un entero de 14 bits
+(un bit por horario de 14:00 a 20:30); los días sin fila no tienen horarios
+ocupados. Así la disponibilidad de un día, una semana o un mes se resuelve
+con una sola consulta de rango sobre una tabla chica, sin leer Turnos.
+
+La fila de un día se recalcula desde Turnos cada vez que se guarda o borra
+un turno de ese día (alta, edición, cambio de estado, baja), dentro de la
+misma transacción. La misma fila sirve de candado para las reservas del
+día (ver reservar()). Los cambios hechos con queryset.update() o por SQL no
+disparan señales: en ese caso hay que correr el comando
+reconstruir_ocupacion.
+"""
+from datetime import datetime, time, timedelta
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+from home.models import Turnos
+from .models import OcupacionDia
+
+# Horario de atención: cada 30 minutos de 14:00 a 20:30
+HORARIOS = [time(h, m) for h in range(14, 21) for m in (0, 30)]
+_INDICE = {hora: i for i, hora in enumerate(HORARIOS)}
+COMPLETO = (1 << len(HORARIOS)) - 1
+
+# Los turnos se pueden pedir hasta con esta anticipación
+MAX_DIAS_ANTICIPACION = 90
+
+
+def indice(hora):
+    """Posición del horario en HORARIOS (None si no es un horario de la agenda)"""
+    return _INDICE.get(hora)
+
+
+def horarios(bits):
+    """Horarios cuyos bits están en 1"""
+    return [hora for i, hora in enumerate(HORARIOS) if bits >> i & 1]
+
+
+def turnos_activos():
+    """Turnos que ocupan su horario: no eliminados y no cancelados"""
+    return (
+        Turnos.objects
+        .filter(Q(eliminado__isnull=True) | Q(eliminado=0))
+        .exclude(id_turno_estado__estado_turno__icontains='cancel')
+    )
+
+
+def calcular(desde, hasta):
+    """{fecha: bits} leído de Turnos para los días con turnos en [desde, hasta]"""
+    ocupacion = {}
+    filas = (
+        turnos_activos()
+        .filter(fecha_turno__gte=desde, fecha_turno__lte=hasta)
+        .values_list('fecha_turno', 'hora_turno')
+    )
+    for fecha, hora in filas:
+        i = indice(hora)
+        if i is not None:
+            ocupacion[fecha] = ocupacion.get(fecha, 0) | (1 << i)
+    return ocupacion
+
+
+def actualizar_dia(fecha):
+    """Recalcula la ocupación de un día desde Turnos"""
+    bits = calcular(fecha, fecha).get(fecha, 0)
+    OcupacionDia.objects.update_or_create(fecha=fecha, defaults={'ocupados': bits})
+    return bits
+
+
+def reconstruir(desde=None, hasta=None):
+    """Rehace el índice del rango (o de todos los turnos); devuelve los días con turnos"""
+    filas = OcupacionDia.objects.all()
+    turnos = turnos_activos()
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+        turnos = turnos.filter(fecha_turno__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+        turnos = turnos.filter(fecha_turno__lte=hasta)
+
+    ocupacion = {}
+    for fecha, hora in turnos.values_list('fecha_turno', 'hora_turno').iterator(chunk_size=5000):
+        i = indice(hora)
+        if i is not None:
+            ocupacion[fecha] = ocupacion.get(fecha, 0) | (1 << i)
+
+    filas.delete()
+    OcupacionDia.objects.bulk_create(
+        [OcupacionDia(fecha=fecha, ocupados=bits) for fecha, bits in ocupacion.items()],
+        batch_size=2000
+    )
+    return len(ocupacion)
+
+
+def ocupacion(desde, hasta):
+    """{fecha: bits} del índice para [desde, hasta]; los días que faltan valen 0"""
+    return dict(
+        OcupacionDia.objects
+        .filter(fecha__gte=desde, fecha__lte=hasta, ocupados__gt=0)
+        .values_list('fecha', 'ocupados')
+    )
+
+
+def limite_reservas(hoy=None):
+    return (hoy or timezone.localdate()) + timedelta(days=MAX_DIAS_ANTICIPACION)
+
+
+def es_reservable(fecha, hoy=None):
+    """Día hábil dentro de la ventana de reservas (de hoy a MAX_DIAS_ANTICIPACION)"""
+    hoy = hoy or timezone.localdate()
+    return hoy <= fecha <= limite_reservas(hoy) and fecha.weekday() < 5
+
+
+def libres(fecha, bits, ahora=None):
+    """
+    Horarios libres de un día dada su ocupación: ninguno si el día no es
+    reservable y, si es hoy, solo los que todavía no pasaron.
+    """
+    ahora = ahora or timezone.localtime()
+    hoy = ahora.date()
+    if not es_reservable(fecha, hoy):
+        return []
+    disponibles = horarios(~bits & COMPLETO)
+    if fecha == hoy:
+        disponibles = [
+            hora for hora in disponibles
+            if timezone.make_aware(datetime.combine(fecha, hora)) > ahora
+        ]
+    return disponibles
+
+
+def disponibilidad(desde, hasta, ahora=None):
+    """[(fecha, horarios libres)] de cada día de [desde, hasta] con una sola consulta"""
+    ahora = ahora or timezone.localtime()
+    ocupados = ocupacion(desde, hasta)
+    dias = []
+    fecha = desde
+    while fecha <= hasta:
+        dias.append((fecha, libres(fecha, ocupados.get(fecha, 0), ahora)))
+        fecha += timedelta(days=1)
+    return dias
+
+
+def proximos_libres(cantidad, desde=None, dias_semana=None, hora_desde=None, hora_hasta=None, ahora=None):
+    """
+    Los primeros `cantidad` horarios libres [(fecha, hora)] desde `desde`
+    (por defecto hoy) hasta el fin de la ventana de reservas, con una sola
+    consulta al índice. dias_semana: valores de weekday() permitidos
+    (0 = lunes); hora_desde/hora_hasta: rango de horarios, ambos incluidos.
+    """
+    ahora = ahora or timezone.localtime()
+    hoy = ahora.date()
+    desde = max(desde or hoy, hoy)
+    hasta = limite_reservas(hoy)
+    # Los horarios fuera del rango pedido se tratan como ocupados
+    fuera_de_rango = sum(
+        1 << i for i, hora in enumerate(HORARIOS)
+        if (hora_desde and hora < hora_desde) or (hora_hasta and hora > hora_hasta)
+    )
+    if desde > hasta or fuera_de_rango == COMPLETO or cantidad <= 0:
+        return []
+
+    ocupados = ocupacion(desde, hasta)
+    resultado = []
+    fecha = desde
+    while fecha <= hasta:
+        if dias_semana is None or fecha.weekday() in dias_semana:
+            for hora in libres(fecha, ocupados.get(fecha, 0) | fuera_de_rango, ahora):
+                resultado.append((fecha, hora))
+                if len(resultado) == cantidad:
+                    return resultado
+        fecha += timedelta(days=1)
+    return resultado
+
+
+# ---------- reservas ----------
+
+class HorarioOcupado(Exception):
+    """Otro turno activo ya tiene el horario"""
+
+
+def bloquear_dias(*fechas):
+    """
+    Bloquea (SELECT ... FOR UPDATE) las filas de ocupación de los días hasta
+    el fin de la transacción, creándolas si faltan. Así dos reservas del
+    mismo día se ejecutan una después de la otra y las de días distintos no
+    se esperan. Se bloquea siempre en orden de fecha para no cruzarse.
+
+    Las filas que faltan se insertan antes de bloquear: un FOR UPDATE sobre
+    una clave inexistente toma un candado de rango (gap lock en InnoDB) que
+    dos transacciones pueden tener a la vez, y el INSERT de cada una espera
+    al de la otra (deadlock).
+    """
+    fechas = sorted({f for f in fechas if f})
+    existentes = set(OcupacionDia.objects.filter(fecha__in=fechas).values_list('fecha', flat=True))
+    faltantes = [f for f in fechas if f not in existentes]
+    if faltantes:
+        # Primera reserva del día: si otra transacción la crea al mismo tiempo,
+        # ignore_conflicts evita el error y el SELECT siguiente espera su commit
+        OcupacionDia.objects.bulk_create(
+            [OcupacionDia(fecha=f, ocupados=0) for f in faltantes], ignore_conflicts=True
+        )
+    list(OcupacionDia.objects.select_for_update().filter(fecha__in=fechas).order_by('fecha').values_list('fecha'))
+
+
+def reservar(fecha, hora, turno=None):
+    """
+    Verifica con el día bloqueado que el horario siga libre; hay que llamarla
+    dentro de transaction.atomic() antes de guardar el turno, para que
+    ninguna otra reserva del día pueda colarse entre la verificación y el
+    guardado. `turno` es el turno que se edita (se bloquea también su día
+    actual y no cuenta como conflicto consigo mismo). Lanza HorarioOcupado.
+    """
+    bloquear_dias(fecha, turno.fecha_turno if turno and turno.pk else None)
+    conflicto = turnos_activos().filter(fecha_turno=fecha, hora_turno=hora)
+    if turno and turno.pk:
+        conflicto = conflicto.exclude(pk=turno.pk)
+    if conflicto.exists():
+        raise HorarioOcupado('Ya existe un turno programado para esa fecha y hora.')
+
+
+# ---------- sincronización con Turnos ----------
+
+def _al_cargar(sender, instance, **kwargs):
+    # Fecha al leer el turno, para actualizar también el día anterior si se
+    # reprograma. Se lee de __dict__ para no cargar el campo si vino diferido.
+    instance._fecha_ocupacion = instance.__dict__.get('fecha_turno')
+
+
+def _al_modificar(sender, instance, **kwargs):
+    fechas = {instance.fecha_turno, getattr(instance, '_fecha_ocupacion', None)}
+    for fecha in fechas:
+        if fecha:
+            actualizar_dia(fecha)
+    instance._fecha_ocupacion = instance.fecha_turno
+
+
+def conectar_senales():
+    post_init.connect(_al_cargar, sender=Turnos, dispatch_uid='turnos_ocupacion_init')
+    post_save.connect(_al_modificar, sender=Turnos, dispatch_uid='turnos_ocupacion_save')
+    post_delete.connect(_al_modificar, sender=Turnos, dispatch_uid='turnos_ocupacion_delete')
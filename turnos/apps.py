@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TurnosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'turnos'
+
+    def ready(self):
+        from . import agenda
+        agenda.conectar_senales()
@@ -0,0 +1,134 @@
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from home import sintetico
+from home.models import Turnos
+from turnos import agenda
+
+
+class ContadorConsultas:
+    """execute_wrapper que cuenta las consultas (no depende del log de 9000 de Django)"""
+    def __init__(self):
+        self.cantidad = 0
+
+    def __call__(self, ejecutar, sql, params, many, context):
+        self.cantidad += 1
+        return ejecutar(sql, params, many, context)
+
+
+# (descripción, argumentos de agenda.proximos_libres)
+ESCENARIOS = [
+    ('1 libre', {'cantidad': 1}),
+    ('10 libres', {'cantidad': 10}),
+    ('10 viernes', {'cantidad': 10, 'dias_semana': {4}}),
+    ('10 18-20:30', {'cantidad': 10, 'hora_desde': agenda.HORARIOS[8]}),
+    ('ventana', {'cantidad': 2000}),
+]
+
+
+def _por_dia(cantidad, dias_semana=None, hora_desde=None, hora_hasta=None):
+    """Lo que hace hoy la recepción: un horarios-disponibles por día hasta encontrar lugar"""
+    ahora = timezone.localtime()
+    hoy = ahora.date()
+    resultado = []
+    fecha = hoy
+    while fecha <= agenda.limite_reservas(hoy) and len(resultado) < cantidad:
+        if fecha.weekday() < 5 and (dias_semana is None or fecha.weekday() in dias_semana):
+            ocupados = set(
+                Turnos.objects.filter(fecha_turno=fecha)
+                .filter(Q(eliminado__isnull=True) | Q(eliminado=0))
+                .exclude(id_turno_estado__estado_turno__icontains='cancel')
+                .values_list('hora_turno', flat=True)
+            )
+            for hora in agenda.libres(fecha, 0, ahora):
+                if hora in ocupados or (hora_desde and hora < hora_desde) or (hora_hasta and hora > hora_hasta):
+                    continue
+                resultado.append((fecha, hora))
+        fecha += timedelta(days=1)
+    return resultado[:cantidad]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la búsqueda de próximos horarios libres con la agenda casi llena '
+        'y la compara con consultar día por día. Los datos se crean dentro de '
+        'una transacción que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turnos', type=int, default=50_000)
+        parser.add_argument('--pacientes', type=int, default=5_000)
+        parser.add_argument(
+            '--ocupacion', type=float, default=0.98,
+            help='Probabilidad de que cada horario esté ocupado (entre 0 y 1)'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument(
+            '--max-ms', type=float, default=50,
+            help='Mediana máxima permitida por búsqueda, en milisegundos'
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options['ocupacion'] <= 1:
+            raise CommandError('--ocupacion debe estar entre 0 (excluido) y 1')
+
+        with transaction.atomic():
+            resultados = self._medir(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'{"escenario":<14}{"índice ms":>11}{"consultas":>11}'
+            f'{"por día ms":>12}{"consultas":>11}{"libres":>8}'
+        )
+        peor = 0
+        for nombre, ms, consultas, ms_dia, consultas_dia, cantidad in resultados:
+            peor = max(peor, ms)
+            self.stdout.write(
+                f'{nombre:<14}{ms:>11.1f}{consultas:>11}{ms_dia:>12.1f}{consultas_dia:>11}{cantidad:>8}'
+            )
+
+        if peor > options['max_ms']:
+            raise CommandError(f'Presupuesto excedido: {peor:.1f} ms (máximo {options["max_ms"]:.0f} ms)')
+        self.stdout.write(self.style.SUCCESS('Dentro del presupuesto.'))
+
+    def _medir(self, options):
+        catalogos = sintetico.asegurar_catalogos()
+        lote = sintetico.crear_pacientes(options['pacientes'], catalogos, seed=options['seed'])
+        inicio = time.perf_counter()
+        sintetico.crear_turnos(
+            options['turnos'], catalogos, lote, seed=options['seed'], ocupacion=options['ocupacion']
+        )
+        dias = agenda.reconstruir()
+        self.stdout.write(
+            f'{options["turnos"]} turnos creados e indexados ({dias} días) '
+            f'en {time.perf_counter() - inicio:.1f} s'
+        )
+
+        resultados = []
+        for nombre, argumentos in ESCENARIOS:
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                contador = ContadorConsultas()
+                with connection.execute_wrapper(contador):
+                    t0 = time.perf_counter()
+                    libres = agenda.proximos_libres(**argumentos)
+                    tiempos.append((time.perf_counter() - t0) * 1000)
+
+            contador_dia = ContadorConsultas()
+            with connection.execute_wrapper(contador_dia):
+                t0 = time.perf_counter()
+                por_dia = _por_dia(**argumentos)
+                ms_dia = (time.perf_counter() - t0) * 1000
+
+            if por_dia != libres:
+                raise CommandError(f'{nombre}: el índice no coincide con la consulta por día')
+            resultados.append((
+                nombre, statistics.median(tiempos), contador.cantidad,
+                ms_dia, contador_dia.cantidad, len(libres)
+            ))
+        return resultados
@@ -0,0 +1,32 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from turnos import agenda
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor} (formato AAAA-MM-DD)') from None
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye el índice de ocupación de la agenda de turnos a partir de '
+        'la tabla de turnos. Necesario después de cambios masivos hechos con '
+        'update() o por SQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_fecha, help='Primer día (por defecto, todos)')
+        parser.add_argument('--hasta', type=_fecha, help='Último día (por defecto, todos)')
+
+    def handle(self, *args, **options):
+        desde, hasta = options['desde'], options['hasta']
+        if desde and hasta and desde > hasta:
+            raise CommandError('La fecha desde debe ser anterior a hasta')
+
+        with transaction.atomic():
+            dias = agenda.reconstruir(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'Índice de ocupación reconstruido: {dias} días con turnos.'))
@@ -0,0 +1,179 @@
+import random
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from rest_framework.test import APIRequestFactory
+from home import catalogos
+from home.models import Pacientes, Turnos
+from turnos import agenda
+from turnos.serializers import TurnoCreateUpdateSerializer
+from turnos.views import TurnoDetailView, TurnoEstadoUpdateView
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de concurrencia de reservas: varios hilos, cada uno con su '
+        'conexión, crean, reprograman, cancelan y eliminan turnos sobre unos '
+        'pocos horarios a la vez y al final se verifica que ningún horario '
+        'quedó con dos turnos activos y que el índice de ocupación coincide '
+        'con los turnos. Usa los últimos días hábiles de la ventana de reservas y '
+        'borra los turnos creados al terminar. Correr contra una base de '
+        'prueba: los turnos se confirman de verdad mientras dura la prueba.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--intentos', type=int, default=50, help='Intentos por hilo')
+        parser.add_argument('--dias', type=int, default=2, help='Días hábiles en disputa')
+        parser.add_argument(
+            '--reprogramar', type=float, default=0.3,
+            help='Proporción de intentos que mueven un turno propio en lugar de crear uno'
+        )
+        parser.add_argument(
+            '--cancelar', type=float, default=0.2,
+            help='Proporción de intentos que cancelan un turno propio (la mitad lo elimina después)'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        paciente = Pacientes.objects.filter(eliminado__isnull=True).order_by('pk').first()
+        if not paciente:
+            raise CommandError('Se necesita al menos un paciente para asignar los turnos')
+        estado = next(
+            (e for e in catalogos.estados_turno.activos() if e.estado_turno.lower().startswith('pend')),
+            None
+        )
+        if not estado:
+            raise CommandError('No existe el estado de turno "Pendiente"')
+        cancelado = next(
+            (e for e in catalogos.estados_turno.activos() if e.estado_turno.lower().startswith('cancel')),
+            None
+        )
+        if options['cancelar'] and not cancelado:
+            raise CommandError('No existe el estado de turno "Cancelado" (o usar --cancelar 0)')
+        factory = APIRequestFactory()
+        cambiar_estado = TurnoEstadoUpdateView.as_view()
+        detalle = TurnoDetailView.as_view()
+
+        dias = []
+        fecha = agenda.limite_reservas()
+        while len(dias) < options['dias']:
+            if fecha.weekday() < 5:
+                dias.append(fecha)
+            fecha -= timedelta(days=1)
+        horarios = [(d, h) for d in dias for h in agenda.HORARIOS]
+
+        resultados = Counter()
+        creados = []
+        bloqueo = threading.Lock()
+        barrera = threading.Barrier(options['hilos'])
+
+        def trabajar(numero):
+            rng = random.Random(options['seed'] * 1000 + numero)
+            propios = []
+            terminados = []
+            try:
+                barrera.wait()
+                for _ in range(options['intentos']):
+                    fecha, hora = rng.choice(horarios)
+                    datos = {'fecha_turno': fecha, 'hora_turno': hora}
+                    sorteo = rng.random()
+                    if propios and sorteo < options['cancelar']:
+                        # Por la API: la cancelación y la baja recalculan la
+                        # ocupación del día mientras otros hilos reservan
+                        pk = rng.choice(propios)
+                        accion = 'cancelar'
+                        try:
+                            respuesta = cambiar_estado(
+                                factory.patch(f'/api/turnos/{pk}/estado/', {'id_turno_estado': cancelado.pk}, format='json'),
+                                id_turno=pk
+                            )
+                            if respuesta.status_code == 200 and rng.random() < 0.5:
+                                accion = 'cancelar y eliminar'
+                                respuesta = detalle(factory.delete(f'/api/turnos/{pk}/'), id_turno=pk)
+                            if respuesta.status_code == 200:
+                                resultado = 'ok'
+                            elif respuesta.status_code >= 500:
+                                resultado = f'error: {respuesta.data.get("error")}'
+                            else:
+                                resultado = 'rechazado'
+                        except Exception as e:
+                            resultado = f'error: {type(e).__name__}'
+                        # Cancelado ya no se puede reprogramar
+                        propios.remove(pk)
+                        terminados.append(pk)
+                        with bloqueo:
+                            resultados[f'{accion}: {resultado}'] += 1
+                        continue
+                    if propios and sorteo < options['cancelar'] + options['reprogramar']:
+                        turno = Turnos.objects.get(pk=rng.choice(propios))
+                        serializer = TurnoCreateUpdateSerializer(turno, data=datos, partial=True)
+                        accion = 'reprogramar'
+                    else:
+                        datos.update(id_paciente=paciente.pk, id_turno_estado=estado.pk, asunto='Prueba')
+                        serializer = TurnoCreateUpdateSerializer(data=datos)
+                        accion = 'crear'
+                    try:
+                        if not serializer.is_valid():
+                            resultado = 'rechazado en validación'
+                        else:
+                            turno = serializer.save()
+                            if accion == 'crear':
+                                propios.append(turno.pk)
+                            resultado = 'ok'
+                    except agenda.HorarioOcupado:
+                        resultado = 'rechazado con el día bloqueado'
+                    except Exception as e:
+                        resultado = f'error: {type(e).__name__}'
+                    with bloqueo:
+                        resultados[f'{accion}: {resultado}'] += 1
+            finally:
+                with bloqueo:
+                    creados.extend(propios + terminados)
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajar, args=(i,)) for i in range(options['hilos'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+
+        try:
+            dobles = list(
+                agenda.turnos_activos()
+                .filter(fecha_turno__in=dias)
+                .values('fecha_turno', 'hora_turno')
+                .annotate(cantidad=Count('pk'))
+                .filter(cantidad__gt=1)
+                .order_by('fecha_turno', 'hora_turno')
+            )
+            ocupados = agenda.ocupacion(dias[-1], dias[0])
+            indice_ok = all(
+                ocupados.get(d, 0) == agenda.calcular(d, d).get(d, 0) for d in dias
+            )
+        finally:
+            Turnos.objects.filter(pk__in=creados).delete()
+
+        total = options['hilos'] * options['intentos']
+        self.stdout.write(
+            f'{total} intentos de {options["hilos"]} hilos sobre {len(horarios)} horarios '
+            f'en {segundos:.1f} s ({total / segundos:.0f} por segundo)'
+        )
+        for clave, cantidad in sorted(resultados.items()):
+            self.stdout.write(f'  {clave:<45}{cantidad:>6}')
+
+        if dobles:
+            for fila in dobles:
+                self.stdout.write(self.style.ERROR(
+                    f'  {fila["fecha_turno"]} {fila["hora_turno"]}: {fila["cantidad"]} turnos activos'
+                ))
+            raise CommandError(f'{len(dobles)} horarios con turnos duplicados')
+        if not indice_ok:
+            raise CommandError('El índice de ocupación no coincide con los turnos')
+        self.stdout.write(self.style.SUCCESS('Sin turnos duplicados; índice de ocupación consistente.'))
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:15
+
+from django.db import migrations, models
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# El modelo histórico de Turnos no tiene la clave del estado: los turnos
+# cancelados (como en turnos.agenda.turnos_activos) se buscan en SQL
+CANCELADOS = RawSQL(
+    'SELECT t.id_turno FROM turnos t '
+    'JOIN estados_turno e ON e.id_estado_turno = t.id_turno_estado '
+    'WHERE LOWER(e.estado_turno) LIKE %s',
+    ('%cancel%',)
+)
+
+
+def indice(hora):
+    """Bit del horario (cada 30 minutos de 14:00 a 20:30, como turnos.agenda.HORARIOS)"""
+    if 14 <= hora.hour <= 20 and hora.minute in (0, 30) and not hora.second:
+        return (hora.hour - 14) * 2 + hora.minute // 30
+    return None
+
+
+def poblar_indice(apps, schema_editor):
+    Turnos = apps.get_model('home', 'Turnos')
+    OcupacionDia = apps.get_model('turnos', 'OcupacionDia')
+    turnos = (
+        Turnos.objects
+        .filter(Q(eliminado__isnull=True) | Q(eliminado=0))
+        .exclude(pk__in=CANCELADOS)
+        .values_list('fecha_turno', 'hora_turno')
+    )
+    ocupacion = {}
+    for fecha, hora in turnos.iterator(chunk_size=5000):
+        i = indice(hora)
+        if i is not None:
+            ocupacion[fecha] = ocupacion.get(fecha, 0) | (1 << i)
+    OcupacionDia.objects.bulk_create(
+        [OcupacionDia(fecha=fecha, ocupados=bits) for fecha, bits in ocupacion.items()],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('home', '0003_estadisticas_diarias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacionDia',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False)),
+                ('ocupados', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'turnos_ocupacion_dia',
+            },
+        ),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,14 @@
 from django.db import models
 
-# Create your models here.
+
+class OcupacionDia(models.Model):
+    """
+    Horarios ocupados de un día como máscara de bits: el bit i corresponde
+    a turnos.agenda.HORARIOS[i] (14:00, 14:30, ... 20:30). Solo cuentan los
+    turnos no eliminados y no cancelados. Se mantiene desde turnos.agenda.
+    """
+    fecha = models.DateField(primary_key=True)
+    ocupados = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'turnos_ocupacion_dia'
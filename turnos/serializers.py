@@ -1,11 +1,14 @@
 # app/turnos/serializers.py
 from rest_framework import serializers
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
 from datetime import datetime, time, timedelta
 import re
 
 from home.models import Turnos, EstadosTurno, Pacientes
+from home import catalogos
+from . import agenda
 
 
 class EstadoTurnoSerializer(serializers.ModelSerializer):
@@ -169,10 +172,8 @@ class TurnoCreateUpdateSerializer(serializers.ModelSerializer):
         if self.instance:
             fecha = data.get('fecha_turno', self.instance.fecha_turno)
             hora = data.get('hora_turno', self.instance.hora_turno)
-            estado_actual = (
-                self.instance.id_turno_estado.estado_turno
-                if self.instance.id_turno_estado else None
-            )
+            estado = catalogos.estados_turno.get(self.instance.id_turno_estado_id)
+            estado_actual = estado.estado_turno if estado else None
         else:
             fecha = data.get('fecha_turno')
             hora = data.get('hora_turno')
@@ -228,9 +229,7 @@ class TurnoCreateUpdateSerializer(serializers.ModelSerializer):
                 )
 
             # 5.2 No turnos demasiado lejos en el futuro (ej: más de 90 días)
-            MAX_DIAS_ANTICIPACION = 90
-            limite_futuro = hoy + timedelta(days=MAX_DIAS_ANTICIPACION)
-            if fecha_obj > limite_futuro:
+            if fecha_obj > agenda.limite_reservas(hoy):
                 raise serializers.ValidationError(
                     "No se pueden agendar turnos con tanta anticipación."
                 )
@@ -294,7 +293,8 @@ class TurnoCreateUpdateSerializer(serializers.ModelSerializer):
                             "del horario actual."
                         )
 
-        # 8) Validación de conflicto de horario (mismo consultorio/agenda)
+        # 8) Validación de conflicto de horario (mismo consultorio/agenda).
+        #    Se vuelve a verificar con el día bloqueado al guardar (create/update)
         instance_id = getattr(self.instance, 'id_turno', None)
         if fecha_obj and hora_obj:
             conflicto = (
@@ -382,6 +382,11 @@ class TurnoCreateUpdateSerializer(serializers.ModelSerializer):
 
     # --------------------- create / update ---------------------
 
+    def _ocupa_horario(self, estado):
+        """Un turno cancelado no ocupa su horario (no hace falta reservarlo)"""
+        nombre = getattr(estado, 'estado_turno', None)
+        return self._normalize_estado(nombre) != 'cancelado'
+
     def create(self, validated_data):
         nombre = validated_data.pop('paciente_nombre', None)
         apellido = validated_data.pop('paciente_apellido', None)
@@ -393,7 +398,12 @@ class TurnoCreateUpdateSerializer(serializers.ModelSerializer):
             paciente = self._get_or_create_paciente(nombre, apellido)
             validated_data['id_paciente'] = paciente
 
-        turno = super().create(validated_data)
+        with transaction.atomic():
+            if self._ocupa_horario(validated_data.get('id_turno_estado')):
+                agenda.reservar(validated_data['fecha_turno'], validated_data['hora_turno'])
+            else:
+                agenda.bloquear_dias(validated_data['fecha_turno'])
+            turno = super().create(validated_data)
         return turno
 
     def update(self, instance, validated_data):
@@ -409,5 +419,17 @@ class TurnoCreateUpdateSerializer(serializers.ModelSerializer):
         if id_paciente is not None:
             instance.id_paciente = id_paciente
 
-        instance = super().update(instance, validated_data)
+        with transaction.atomic():
+            estado = validated_data.get('id_turno_estado') or catalogos.estados_turno.get(instance.id_turno_estado_id)
+            if self._ocupa_horario(estado):
+                agenda.reservar(
+                    validated_data.get('fecha_turno', instance.fecha_turno),
+                    validated_data.get('hora_turno', instance.hora_turno),
+                    turno=instance
+                )
+            else:
+                # Un turno cancelado no reserva, pero la ocupación de sus días
+                # se recalcula al guardarlo: se bloquean igual
+                agenda.bloquear_dias(validated_data.get('fecha_turno', instance.fecha_turno), instance.fecha_turno)
+            instance = super().update(instance, validated_data)
         return instance
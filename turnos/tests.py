@@ -1,3 +1,39 @@
-from django.test import TestCase
+import io
+import unittest
+from datetime import date
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+from home.models import EstadosTurno, Pacientes
+from turnos.models import OcupacionDia
 
-# Create your tests here.
+
+@unittest.skipUnless(connection.features.has_select_for_update, 'La base no bloquea filas (SELECT ... FOR UPDATE)')
+class ReservasConcurrentesTests(TransactionTestCase):
+    """Reservas simultáneas de varios hilos, cada uno con su conexión (stress_reservas_turnos)"""
+
+    def setUp(self):
+        # Las tablas de home no se vacían entre pruebas: se borra lo creado acá
+        self.paciente = Pacientes.objects.create(
+            dni_paciente=30111222, nombre_paciente='Prueba', apellido_paciente='Reservas',
+            fecha_nacimiento=date(1990, 1, 1)
+        )
+        self.estado = EstadosTurno.objects.create(estado_turno='Pendiente')
+        self.cancelado = EstadosTurno.objects.create(estado_turno='Cancelado')
+
+    def tearDown(self):
+        self.paciente.delete()
+        self.estado.delete()
+        self.cancelado.delete()
+
+    def test_sin_turnos_duplicados_ni_errores(self):
+        # Los días en disputa todavía no tienen fila de ocupación: las
+        # primeras reservas de cada día la crean al mismo tiempo
+        self.assertFalse(OcupacionDia.objects.exists())
+        salida = io.StringIO()
+        # CommandError si quedan horarios con dos turnos o el índice no coincide
+        call_command('stress_reservas_turnos', hilos=8, intentos=20, dias=2, stdout=salida)
+        # Un deadlock llega como error de la base en alguno de los intentos
+        self.assertNotIn('error:', salida.getvalue())
+        # Las cancelaciones y bajas corrieron junto con las reservas
+        self.assertIn('cancelar: ok', salida.getvalue())
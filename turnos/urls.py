@@ -4,7 +4,9 @@ from .views import (
     TurnoDetailView,
     TurnoEstadoUpdateView,
     EstadosTurnoListView,
-    HorariosDisponiblesView
+    HorariosDisponiblesView,
+    DisponibilidadView,
+    ProximosLibresView
 )
 
 urlpatterns = [
@@ -13,5 +15,7 @@ urlpatterns = [
     path('<int:id_turno>/estado/', TurnoEstadoUpdateView.as_view(), name='turno-estado'),
     path('estados/', EstadosTurnoListView.as_view(), name='estados-turno'),
     path('horarios-disponibles/', HorariosDisponiblesView.as_view(), name='horarios-disponibles'),
+    path('disponibilidad/', DisponibilidadView.as_view(), name='disponibilidad'),
+    path('proximos-libres/', ProximosLibresView.as_view(), name='proximos-libres'),
 ]
 
@@ -3,10 +3,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
-from datetime import timedelta, datetime, time
+from datetime import timedelta, datetime
 
 from home.models import Turnos, EstadosTurno, Pacientes
+from home import catalogos
+from home.paginacion import paginar, CursorInvalido
+from . import agenda
 from .serializers import (
     TurnoListSerializer,
     TurnoDetailSerializer,
@@ -56,13 +60,17 @@ class TurnoListCreateView(APIView):
                     fecha_turno__lte=fecha_limite
                 )
 
-            turnos = turnos.order_by('fecha_turno', 'hora_turno')
-            serializer = TurnoListSerializer(turnos, many=True)
-            return Response({
-                'success': True,
-                'data': serializer.data,
-                'total': turnos.count()
-            })
+            return Response(paginar(
+                request,
+                turnos.select_related('id_paciente', 'id_turno_estado'),
+                ['fecha_turno', 'hora_turno'],
+                lambda filas: TurnoListSerializer(filas, many=True).data
+            ))
+        except CursorInvalido as e:
+            return Response(
+                {'success': False, 'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {'success': False, 'error': str(e)},
@@ -85,6 +93,12 @@ class TurnoListCreateView(APIView):
                     {'success': False, 'errors': serializer.errors},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+        except agenda.HorarioOcupado as e:
+            # Otro turno tomó el horario entre la validación y el guardado
+            return Response(
+                {'success': False, 'errors': {'non_field_errors': [str(e)]}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {'success': False, 'error': str(e)},
@@ -135,6 +149,12 @@ class TurnoDetailView(APIView):
                     {'success': False, 'errors': serializer.errors},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+        except agenda.HorarioOcupado as e:
+            # Otro turno tomó el horario entre la validación y el guardado
+            return Response(
+                {'success': False, 'errors': {'non_field_errors': [str(e)]}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Turnos.DoesNotExist:
             return Response(
                 {'success': False, 'error': 'Turno no encontrado'},
@@ -172,7 +192,11 @@ class TurnoDetailView(APIView):
 
             turno.eliminado = 1
             turno.fecha_eliminacion = timezone.now()
-            turno.save()
+            # Con el día bloqueado, para que la ocupación que recalcula el
+            # guardado no pise la de una reserva simultánea del mismo día
+            with transaction.atomic():
+                agenda.bloquear_dias(turno.fecha_turno)
+                turno.save()
             return Response({
                 'success': True,
                 'message': 'Turno eliminado correctamente'
@@ -228,17 +252,15 @@ class TurnoEstadoUpdateView(APIView):
                 )
 
             try:
-                estado = EstadosTurno.objects.get(id_estado_turno=id_estado)
+                estado = catalogos.estados_turno.obtener(id_estado)
             except EstadosTurno.DoesNotExist:
                 return Response(
                     {'success': False, 'error': 'Estado no encontrado'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            estado_actual_nombre = (
-                turno.id_turno_estado.estado_turno
-                if turno.id_turno_estado else None
-            )
+            estado_actual = catalogos.estados_turno.get(turno.id_turno_estado_id)
+            estado_actual_nombre = estado_actual.estado_turno if estado_actual else None
             actual_norm = self._normalize_estado(estado_actual_nombre)
             nuevo_norm = self._normalize_estado(estado.estado_turno)
 
@@ -267,35 +289,33 @@ class TurnoEstadoUpdateView(APIView):
 
             nuevo_nombre = (estado.estado_turno or '').strip().lower()
 
-            # Si el nuevo estado NO es "cancelado", validar conflictos
-            if not nuevo_nombre.startswith('cancel'):
-                conflicto = (
-                    Turnos.objects
-                    .filter(
-                        fecha_turno=turno.fecha_turno,
-                        hora_turno=turno.hora_turno,
-                    )
-                    .filter(Q(eliminado__isnull=True) | Q(eliminado=0))
-                    .exclude(id_turno=turno.id_turno)
-                    .exclude(id_turno_estado__estado_turno__icontains='cancel')
-                )
-
-                if conflicto.exists():
-                    return Response(
-                        {
-                            'success': False,
-                            'error': (
-                                'No se puede confirmar este turno: '
-                                'ya existe otro turno activo reservado en '
-                                'esa fecha y horario.'
-                            )
-                        },
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+            # Si el nuevo estado NO es "cancelado", validar conflictos con el
+            # día bloqueado, para que otra reserva no tome el horario entre la
+            # verificación y el guardado
+            with transaction.atomic():
+                if nuevo_nombre.startswith('cancel'):
+                    # Libera el horario: igual se bloquea el día, para que la
+                    # ocupación recalculada no pise una reserva simultánea
+                    agenda.bloquear_dias(turno.fecha_turno)
+                else:
+                    try:
+                        agenda.reservar(turno.fecha_turno, turno.hora_turno, turno=turno)
+                    except agenda.HorarioOcupado:
+                        return Response(
+                            {
+                                'success': False,
+                                'error': (
+                                    'No se puede confirmar este turno: '
+                                    'ya existe otro turno activo reservado en '
+                                    'esa fecha y horario.'
+                                )
+                            },
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
 
-            # Guardar nuevo estado
-            turno.id_turno_estado = estado
-            turno.save()
+                # Guardar nuevo estado
+                turno.id_turno_estado = estado
+                turno.save()
 
             return Response({
                 'success': True,
@@ -319,9 +339,7 @@ class EstadosTurnoListView(APIView):
 
     def get(self, request):
         try:
-            estados = EstadosTurno.objects.filter(
-                Q(eliminado__isnull=True) | Q(eliminado=0)
-            )
+            estados = catalogos.estados_turno.activos()
             serializer = EstadoTurnoSerializer(estados, many=True)
             return Response({'success': True, 'data': serializer.data})
         except Exception as e:
@@ -371,9 +389,7 @@ class HorariosDisponiblesView(APIView):
                 )
 
             # ❌ No ofrecer horarios para fechas demasiado futuras (ej: más de 90 días)
-            MAX_DIAS_ANTICIPACION = 90
-            limite_futuro = hoy + timedelta(days=MAX_DIAS_ANTICIPACION)
-            if fecha_date > limite_futuro:
+            if fecha_date > agenda.limite_reservas(hoy):
                 return Response(
                     {
                         'success': False,
@@ -391,55 +407,163 @@ class HorariosDisponiblesView(APIView):
                     'total_disponibles': 0
                 })
 
-            # Generar todos los horarios entre 14:00 y 20:30 cada 30 minutos
-            horarios_totales = []
-            for h in range(14, 21):
-                horarios_totales.append(f"{h:02d}:00:00")
-                horarios_totales.append(f"{h:02d}:30:00")
-
-            # Solo turnos NO eliminados y NO cancelados
-            turnos_ocupados = (
-                Turnos.objects
-                .filter(fecha_turno=fecha)
-                .filter(Q(eliminado__isnull=True) | Q(eliminado=0))
-                .exclude(id_turno_estado__estado_turno__icontains='cancel')
-                .values_list('hora_turno', flat=True)
+            # Ocupación del día desde el índice (una fila) en lugar de leer Turnos
+            bits = agenda.ocupacion(fecha_date, fecha_date).get(fecha_date, 0)
+            horarios_disponibles = [str(h) for h in agenda.libres(fecha_date, bits)]
+
+            return Response({
+                'success': True,
+                'fecha': fecha,
+                'horarios_disponibles': horarios_disponibles,
+                'total_disponibles': len(horarios_disponibles)
+            })
+        except Exception as e:
+            return Response(
+                {'success': False, 'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-            ocupados_str = [str(h) for h in turnos_ocupados]
 
-            ahora = timezone.localtime()
-            horarios_disponibles = []
+class DisponibilidadView(APIView):
+    """
+    Horarios disponibles de varios días en una sola llamada (semana o mes del
+    calendario). Parámetros: desde y hasta (YYYY-MM-DD) o mes (YYYY-MM).
+    Los días pasados, fines de semana o fuera de la ventana de reservas se
+    devuelven sin horarios.
+    """
+    MAX_DIAS_RANGO = 62
 
-            for hstr in horarios_totales:
-                if hstr in ocupados_str:
-                    continue
+    def get(self, request):
+        try:
+            mes = request.query_params.get('mes')
+            desde = request.query_params.get('desde')
+            hasta = request.query_params.get('hasta')
 
-                # No devolver horarios que ya pasaron en la fecha actual
-                if fecha_date == hoy:
-                    try:
-                        hh, mm, ss = map(int, hstr.split(':'))
-                        dt_slot = datetime.combine(fecha_date, time(hh, mm, ss))
-                        try:
-                            dt_slot_aware = timezone.make_aware(
-                                dt_slot,
-                                timezone.get_current_timezone()
-                            )
-                        except Exception:
-                            dt_slot_aware = dt_slot
-                        if dt_slot_aware <= ahora:
-                            continue
-                    except ValueError:
-                        # Si por algún motivo el formato es raro, lo omitimos
-                        continue
+            try:
+                if mes:
+                    desde_date = datetime.strptime(mes, "%Y-%m").date()
+                    siguiente = (desde_date.replace(day=28) + timedelta(days=4)).replace(day=1)
+                    hasta_date = siguiente - timedelta(days=1)
+                elif desde and hasta:
+                    desde_date = datetime.strptime(desde, "%Y-%m-%d").date()
+                    hasta_date = datetime.strptime(hasta, "%Y-%m-%d").date()
+                else:
+                    return Response(
+                        {
+                            'success': False,
+                            'error': 'Parámetros requeridos: desde y hasta (YYYY-MM-DD) o mes (YYYY-MM)'
+                        },
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            except ValueError:
+                return Response(
+                    {
+                        'success': False,
+                        'error': 'Formato de fecha inválido. Use YYYY-MM-DD (o YYYY-MM para mes).'
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            if hasta_date < desde_date:
+                return Response(
+                    {'success': False, 'error': 'La fecha hasta debe ser posterior a desde.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if (hasta_date - desde_date).days + 1 > self.MAX_DIAS_RANGO:
+                return Response(
+                    {
+                        'success': False,
+                        'error': f'El rango no puede superar los {self.MAX_DIAS_RANGO} días.'
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-                horarios_disponibles.append(hstr)
+            dias = [
+                {
+                    'fecha': fecha.isoformat(),
+                    'horarios_disponibles': [str(h) for h in horarios],
+                    'total_disponibles': len(horarios)
+                }
+                for fecha, horarios in agenda.disponibilidad(desde_date, hasta_date)
+            ]
 
             return Response({
                 'success': True,
-                'fecha': fecha,
-                'horarios_disponibles': horarios_disponibles,
-                'total_disponibles': len(horarios_disponibles)
+                'desde': desde_date.isoformat(),
+                'hasta': hasta_date.isoformat(),
+                'data': dias,
+                'total_disponibles': sum(d['total_disponibles'] for d in dias)
+            })
+        except Exception as e:
+            return Response(
+                {'success': False, 'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ProximosLibresView(APIView):
+    """
+    Próximos horarios libres desde una fecha dentro de la ventana de reservas.
+    Parámetros (todos opcionales):
+        desde        YYYY-MM-DD (por defecto hoy)
+        cantidad     cuántos horarios devolver (por defecto 10, máximo 100)
+        dias         días de la semana separados por coma, 1 = lunes ... 5 = viernes
+        hora_desde   HH:MM, primer horario aceptado
+        hora_hasta   HH:MM, último horario aceptado
+    """
+    CANTIDAD_POR_DEFECTO = 10
+    CANTIDAD_MAXIMA = 100
+
+    def get(self, request):
+        try:
+            params = request.query_params
+            try:
+                desde = params.get('desde')
+                desde_date = datetime.strptime(desde, "%Y-%m-%d").date() if desde else None
+                hora_desde = params.get('hora_desde')
+                hora_desde = datetime.strptime(hora_desde[:5], "%H:%M").time() if hora_desde else None
+                hora_hasta = params.get('hora_hasta')
+                hora_hasta = datetime.strptime(hora_hasta[:5], "%H:%M").time() if hora_hasta else None
+                cantidad = int(params.get('cantidad') or self.CANTIDAD_POR_DEFECTO)
+                dias = params.get('dias')
+                dias_semana = {int(d) - 1 for d in dias.split(',') if d.strip()} if dias else None
+            except ValueError:
+                return Response(
+                    {
+                        'success': False,
+                        'error': 'Parámetros inválidos. Use desde=YYYY-MM-DD, hora_desde/hora_hasta=HH:MM, '
+                                 'cantidad numérica y dias=1,2,... (1 = lunes).'
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            if not 1 <= cantidad <= self.CANTIDAD_MAXIMA:
+                return Response(
+                    {
+                        'success': False,
+                        'error': f'La cantidad debe estar entre 1 y {self.CANTIDAD_MAXIMA}.'
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if dias_semana is not None and not dias_semana <= set(range(5)):
+                return Response(
+                    {'success': False, 'error': 'Los días deben estar entre 1 (lunes) y 5 (viernes).'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            libres = agenda.proximos_libres(
+                cantidad,
+                desde=desde_date,
+                dias_semana=dias_semana,
+                hora_desde=hora_desde,
+                hora_hasta=hora_hasta
+            )
+            data = [{'fecha': fecha.isoformat(), 'hora': str(hora)} for fecha, hora in libres]
+
+            return Response({
+                'success': True,
+                'data': data,
+                'total': len(data)
             })
         except Exception as e:
             return Response(